@@ -0,0 +1,236 @@
+"""
+A local stand-in for the OpenAI chat completions endpoint used by the benchmarks.
+
+The server answers `POST /v1/chat/completions` with generated filler text after a configurable latency, fails a
+configurable fraction of requests with retryable errors, and supports streamed responses, so that throughput can
+be measured offline and without cost.
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# filler vocabulary of the generated responses
+WORDS = (
+    "the", "model", "simulates", "regional", "water", "energy", "land", "dynamics", "under", "future",
+    "climate", "scenarios", "and", "finds", "that", "coupled", "feedbacks", "shift", "demand", "across",
+    "sectors", "which", "informs", "planning", "of", "resilient", "infrastructure", "systems",
+)
+
+
+def _count_tokens(text):
+    # close enough to a real tokenizer for the usage numbers of a fake response
+    return max(1, len(text) // 4)
+
+
+def _filler(n_words, rng):
+    return " ".join(rng.choice(WORDS) for _ in range(n_words)).capitalize() + "."
+
+
+class FakeChatCompletionsServer:
+    """
+    Serve fake chat completions from a background thread.
+
+    Each request waits `latency` seconds plus a uniform random jitter of up to `jitter` seconds in either direction.
+    A fraction `error_rate` of requests fail with a 429 or 500 response carrying a short `retry-after-ms` header.
+    Streamed requests send one chunk per word, `chunk_delay` seconds apart, followed by a usage chunk when the
+    request asks for one.  Requests with a JSON schema `response_format` receive a JSON object with a filler string
+    for every property of the schema.
+
+    Use it as a context manager, or call `start()` and `stop()`.
+
+    Args:
+        latency (float, optional): The mean delay of each response in seconds. Defaults to 0.05.
+        jitter (float, optional): The largest random deviation from `latency` in seconds. Defaults to 0.0.
+        error_rate (float, optional): The fraction of requests that fail. Defaults to 0.0.
+        chunk_delay (float, optional): The delay between streamed chunks in seconds. Defaults to 0.0.
+        max_words (int, optional): The most words in a response. Defaults to 80.
+        seed (int, optional): Seed of the random generator for reproducible runs. Defaults to None.
+        host (str, optional): The address to bind. Defaults to "127.0.0.1".
+        port (int, optional): The port to listen on; 0 picks a free port. Defaults to 0.
+    """
+
+    def __init__(
+        self,
+        latency=0.05,
+        jitter=0.0,
+        error_rate=0.0,
+        chunk_delay=0.0,
+        max_words=80,
+        seed=None,
+        host="127.0.0.1",
+        port=0
+    ):
+
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.chunk_delay = chunk_delay
+        self.max_words = max_words
+        self.host = host
+        self.port = port
+
+        self.requests = 0
+        self.errors = 0
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def base_url(self) -> str:
+        """The base URL to pass to `OpenAI(base_url=...)`."""
+
+        return f"http://{self.host}:{self._server.server_address[1]}/v1"
+
+    def start(self):
+        """Start serving from a daemon thread."""
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                server._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+        return self
+
+    def stop(self):
+        """Stop the server and close its socket."""
+
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _draw(self):
+        with self._lock:
+            self.requests += 1
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+            failed = self._rng.random() < self.error_rate
+            self.errors += failed
+            seed = self._rng.random()
+
+        return delay, failed, random.Random(seed)
+
+    def _handle(self, handler):
+        if not handler.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(handler, 404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+            return
+
+        length = int(handler.headers.get("Content-Length", 0))
+        request = json.loads(handler.rfile.read(length) or b"{}")
+
+        delay, failed, rng = self._draw()
+        time.sleep(delay)
+
+        if failed:
+            status = rng.choice((429, 500))
+            self._send_json(
+                handler,
+                status,
+                {"error": {"message": "Simulated failure", "type": "server_error", "code": str(status)}},
+                headers={"retry-after-ms": "10"}
+            )
+            return
+
+        content = self._content(request, rng)
+        prompt_tokens = sum(_count_tokens(message.get("content") or "") for message in request.get("messages", []))
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": _count_tokens(content),
+            "total_tokens": prompt_tokens + _count_tokens(content),
+            "prompt_tokens_details": {"cached_tokens": 0},
+        }
+
+        if request.get("stream"):
+            include_usage = (request.get("stream_options") or {}).get("include_usage", False)
+            self._send_stream(handler, request, content, usage if include_usage else None)
+        else:
+            self._send_json(handler, 200, {
+                "id": "chatcmpl-benchmark",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "gpt-4o"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+
+    def _content(self, request, rng):
+        n_words = max(1, min(self.max_words, (request.get("max_tokens") or 50) * 3 // 4))
+
+        response_format = request.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            properties = response_format["json_schema"]["schema"].get("properties", {})
+            return json.dumps({name: _filler(min(n_words, 40), rng) for name in properties})
+
+        if response_format.get("type") == "json_object":
+            return json.dumps({"response": _filler(n_words, rng)})
+
+        return _filler(n_words, rng)
+
+    def _send_json(self, handler, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def _send_stream(self, handler, request, content, usage):
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+
+        def send(choices, usage=None):
+            chunk = {
+                "id": "chatcmpl-benchmark",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "gpt-4o"),
+                "choices": choices,
+            }
+            if usage is not None:
+                chunk["usage"] = usage
+
+            handler.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            handler.wfile.flush()
+
+        for i, word in enumerate(content.split(" ")):
+            if i and self.chunk_delay:
+                time.sleep(self.chunk_delay)
+
+            piece = word if i == 0 else f" {word}"
+            send([{"index": 0, "delta": {"content": piece}, "finish_reason": None}])
+
+        send([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+
+        if usage is not None:
+            send([], usage=usage)
+
+        handler.wfile.write(b"data: [DONE]\n\n")
+        handler.wfile.flush()
+        handler.close_connection = True
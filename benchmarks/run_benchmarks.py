@@ -0,0 +1,361 @@
+"""
+Offline benchmarks of the highlight pipeline.
+
+Measures PDF extraction, tokenization, full-highlight generation against a local fake chat completions server
+(serially and concurrently, plus streamed time to first token), and Word/PowerPoint export.  No API key or
+network access is needed.
+
+Run as a script to print a report, optionally saving it and comparing it with an earlier report:
+
+    python benchmarks/run_benchmarks.py --output baseline.json
+    python benchmarks/run_benchmarks.py --baseline baseline.json --tolerance 0.25
+
+The same workloads run under pytest-benchmark with `pytest benchmarks`.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import highlight as hlt
+from fake_openai import WORDS, FakeChatCompletionsServer
+
+
+def make_pdf(n_pages: int = 50, lines_per_page: int = 40, words_per_line: int = 12, seed: int = 0) -> bytes:
+    """
+    Build a synthetic text PDF in memory.
+
+    Args:
+        n_pages (int, optional): The number of pages. Defaults to 50.
+        lines_per_page (int, optional): The number of text lines on each page. Defaults to 40.
+        words_per_line (int, optional): The number of words in each line. Defaults to 12.
+        seed (int, optional): Seed of the random text. Defaults to 0.
+
+    Returns:
+        bytes: The PDF file.
+    """
+
+    from pypdf import PdfWriter
+    from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+    rng = random.Random(seed)
+    writer = PdfWriter()
+
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+
+    for _ in range(n_pages):
+        page = writer.add_blank_page(width=612, height=792)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})
+        })
+
+        lines = [" ".join(rng.choice(WORDS) for _ in range(words_per_line)) for _ in range(lines_per_page)]
+        operators = " 0 -14 Td ".join(f"({line}) Tj" for line in lines)
+
+        stream = DecodedStreamObject()
+        stream.set_data(f"BT /F1 12 Tf 72 760 Td {operators} ET".encode("latin-1"))
+        page[NameObject("/Contents")] = writer._add_object(stream)
+
+    buffer = BytesIO()
+    writer.write(buffer)
+
+    return buffer.getvalue()
+
+
+def sample_text(n_words: int = 5000, seed: int = 0) -> str:
+    """
+    Build random document text.
+
+    Args:
+        n_words (int, optional): The number of words. Defaults to 5000.
+        seed (int, optional): Seed of the random text. Defaults to 0.
+
+    Returns:
+        str: The text, in sentences of twelve words.
+    """
+
+    rng = random.Random(seed)
+    words = [rng.choice(WORDS) for _ in range(n_words)]
+
+    return " ".join(
+        " ".join(words[i:i + 12]).capitalize() + "." for i in range(0, n_words, 12)
+    )
+
+
+def timed(function, repeat: int = 3) -> dict:
+    """
+    Time repeated calls of a function.
+
+    Args:
+        function (callable): Called with no arguments.
+        repeat (int, optional): The number of calls. Defaults to 3.
+
+    Returns:
+        dict: The fastest and mean wall time in seconds and the result of the last call.
+    """
+
+    times = []
+    result = None
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+
+    return {"best": min(times), "mean": statistics.mean(times), "result": result}
+
+
+def read_pdf_workload(pdf_bytes: bytes, max_workers: int = 1):
+    """Extract a PDF without the extraction cache."""
+
+    return lambda: hlt.read_pdf(BytesIO(pdf_bytes), max_workers=max_workers)
+
+
+def tokenize_workload(texts: list):
+    """Count the tokens of every text."""
+
+    return lambda: hlt.get_token_counts(texts)
+
+
+def highlight_workload(base_url: str, content: str, max_concurrency: int = 1, max_retries: int = 5):
+    """Generate every section against the server at `base_url` without the response cache."""
+
+    from openai import AsyncOpenAI
+
+    def run():
+        client = hlt.AsyncRetryingClient(
+            AsyncOpenAI(base_url=base_url, api_key="benchmark", max_retries=0),
+            max_retries=max_retries,
+            base_delay=0.01
+        )
+
+        return asyncio.run(hlt.agenerate_all(client, content, max_concurrency=max_concurrency, cache=False))
+
+    return run
+
+
+def streamed_workload(base_url: str, content: str, prompt_names=("title", "science", "impact", "summary")):
+    """Stream several section prompts one after the other, as the app does."""
+
+    from openai import OpenAI
+
+    client = hlt.RetryingClient(OpenAI(base_url=base_url, api_key="benchmark", max_retries=0), base_delay=0.01)
+
+    def run():
+        for prompt_name in prompt_names:
+            for _ in hlt.stream_prompt(client, content, prompt_name=prompt_name, max_tokens=200, cache=False):
+                pass
+
+    return run
+
+
+def export_workloads(sections: dict):
+    """
+    Render the Word and PowerPoint outputs of a set of sections.
+
+    The title changes on every call because `render_docx` memoizes unchanged parameters.
+    """
+
+    counter = iter(range(sys.maxsize))
+
+    def docx():
+        parameters = hlt.build_word_parameters(dict(sections, title=f"{sections['title']} {next(counter)}"))
+        return hlt.render_docx(parameters)
+
+    def pptx():
+        return hlt.render_pptx(
+            title=sections["title"],
+            citation=sections["citation"],
+            objective=sections["objective"],
+            approach=sections["approach"],
+            ppt_impact=sections["ppt_impact"]
+        )
+
+    return docx, pptx
+
+
+def run_benchmarks(
+    n_pages: int = 50,
+    n_words: int = 5000,
+    latency: float = 0.05,
+    jitter: float = 0.02,
+    error_rate: float = 0.0,
+    chunk_delay: float = 0.002,
+    max_concurrency: int = 8,
+    repeat: int = 3,
+    seed: int = 0
+) -> dict:
+    """
+    Run every benchmark.
+
+    Args:
+        n_pages (int, optional): Pages of the synthetic PDF. Defaults to 50.
+        n_words (int, optional): Words of the synthetic document. Defaults to 5000.
+        latency (float, optional): Mean latency of the fake server in seconds. Defaults to 0.05.
+        jitter (float, optional): Latency jitter of the fake server in seconds. Defaults to 0.02.
+        error_rate (float, optional): Fraction of requests the fake server fails. Defaults to 0.0.
+        chunk_delay (float, optional): Delay between streamed chunks in seconds. Defaults to 0.002.
+        max_concurrency (int, optional): Requests in flight in the concurrent run. Defaults to 8.
+        repeat (int, optional): Repetitions of each measurement. Defaults to 3.
+        seed (int, optional): Seed of the synthetic inputs and the fake server. Defaults to 0.
+
+    Returns:
+        dict: Metric name to value.  Rates are per second and times are the best of `repeat` runs in seconds.
+    """
+
+    results = {}
+
+    pdf_bytes = make_pdf(n_pages, seed=seed)
+    for max_workers in (1, 4):
+        timing = timed(read_pdf_workload(pdf_bytes, max_workers), repeat)
+        results[f"read_pdf_pages_per_sec_workers_{max_workers}"] = n_pages / timing["best"]
+
+    content = sample_text(n_words, seed=seed)
+    texts = [content[i:i + 2000] for i in range(0, len(content), 2000)]
+    hlt.get_token_count("warm up the encoder")
+    timing = timed(tokenize_workload(texts), repeat)
+    results["tokenize_chars_per_sec"] = len(content) / timing["best"]
+    results["tokenize_tokens_per_sec"] = sum(timing["result"]) / timing["best"]
+
+    server = FakeChatCompletionsServer(
+        latency=latency,
+        jitter=jitter,
+        error_rate=error_rate,
+        chunk_delay=chunk_delay,
+        seed=seed
+    )
+
+    with server:
+        timing = timed(highlight_workload(server.base_url, content, max_concurrency=1), repeat)
+        results["highlight_serial_sec"] = timing["best"]
+
+        timing = timed(highlight_workload(server.base_url, content, max_concurrency=max_concurrency), repeat)
+        results["highlight_concurrent_sec"] = timing["best"]
+        results["highlight_speedup"] = results["highlight_serial_sec"] / results["highlight_concurrent_sec"]
+        sections = timing["result"]
+
+        metrics = hlt.MetricsAggregator()
+        hlt.add_sink(metrics)
+        try:
+            timing = timed(streamed_workload(server.base_url, content), repeat)
+        finally:
+            hlt.remove_sink(metrics)
+
+        results["streamed_sections_sec"] = timing["best"]
+        streamed = [row for row in metrics.by_prompt() if row["mean_time_to_first_token"] is not None]
+        results["streamed_mean_ttft_sec"] = statistics.mean(row["mean_time_to_first_token"] for row in streamed)
+
+        results["server_requests"] = server.requests
+        results["server_errors"] = server.errors
+
+    # the first render loads and indexes the templates
+    docx, pptx = export_workloads(sections)
+    docx()
+    pptx()
+    results["render_docx_sec"] = timed(docx, repeat)["best"]
+    results["render_pptx_sec"] = timed(pptx, repeat)["best"]
+
+    return results
+
+
+# metrics where a bigger value is better; for the others, such as wall times, smaller is better
+HIGHER_IS_BETTER = ("per_sec", "speedup")
+
+# counts that describe the run rather than its performance
+INFORMATIONAL = ("server_requests", "server_errors")
+
+
+def find_regressions(results: dict, baseline: dict, tolerance: float = 0.25) -> list:
+    """
+    Compare results with a baseline.
+
+    Args:
+        results (dict): The current results from `run_benchmarks`.
+        baseline (dict): Earlier results.
+        tolerance (float, optional): The allowed relative change for the worse. Defaults to 0.25.
+
+    Returns:
+        list: Messages describing each metric that is worse than the baseline by more than `tolerance`.
+    """
+
+    regressions = []
+
+    for name, value in results.items():
+        previous = baseline.get(name)
+        if previous is None or not previous or name in INFORMATIONAL:
+            continue
+
+        if any(marker in name for marker in HIGHER_IS_BETTER):
+            change = (previous - value) / previous
+        else:
+            change = (value - previous) / previous
+
+        if change > tolerance:
+            regressions.append(f"{name}: {value:.4g} vs {previous:.4g} in the baseline ({change:.0%} worse)")
+
+    return regressions
+
+
+def main(argv=None) -> int:
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=50, help="Pages of the synthetic PDF")
+    parser.add_argument("--words", type=int, default=5000, help="Words of the synthetic document")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mean latency of the fake server in seconds")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Latency jitter of the fake server in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests the fake server fails")
+    parser.add_argument("--chunk-delay", type=float, default=0.002, help="Delay between streamed chunks in seconds")
+    parser.add_argument("--max-concurrency", type=int, default=8, help="Requests in flight in the concurrent run")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions of each measurement")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic inputs and the fake server")
+    parser.add_argument("--output", default=None, help="Write the results to this JSON file")
+    parser.add_argument("--baseline", default=None, help="Compare with the results in this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        n_pages=args.pages,
+        n_words=args.words,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        chunk_delay=args.chunk_delay,
+        max_concurrency=args.max_concurrency,
+        repeat=args.repeat,
+        seed=args.seed
+    )
+
+    width = max(len(name) for name in results)
+    for name, value in results.items():
+        print(f"{name:<{width}}  {value:,.4g}")
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline, "r", encoding="utf-8") as baseline_file:
+            regressions = find_regressions(results, json.load(baseline_file), args.tolerance)
+
+        for regression in regressions:
+            print(f"Regression:  {regression}")
+
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from fake_openai import FakeChatCompletionsServer
+from run_benchmarks import (
+    export_workloads,
+    highlight_workload,
+    make_pdf,
+    read_pdf_workload,
+    sample_text,
+    streamed_workload,
+    tokenize_workload
+)
+
+
+@pytest.fixture(scope="module")
+def server():
+    with FakeChatCompletionsServer(latency=0.05, jitter=0.02, error_rate=0.05, chunk_delay=0.002, seed=0) as server:
+        yield server
+
+
+@pytest.fixture(scope="module")
+def content():
+    return sample_text(5000)
+
+
+@pytest.fixture(scope="module")
+def sections(server, content):
+    return highlight_workload(server.base_url, content, max_concurrency=8)()
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_read_pdf(benchmark, max_workers):
+    n_pages = 50
+    result = benchmark(read_pdf_workload(make_pdf(n_pages), max_workers))
+
+    benchmark.extra_info["pages_per_sec"] = n_pages / benchmark.stats.stats.min
+    assert result["n_pages"] == n_pages
+
+
+def test_tokenize(benchmark, content):
+    texts = [content[i:i + 2000] for i in range(0, len(content), 2000)]
+    counts = benchmark(tokenize_workload(texts))
+
+    benchmark.extra_info["tokens_per_sec"] = sum(counts) / benchmark.stats.stats.min
+
+
+@pytest.mark.parametrize("max_concurrency", [1, 8])
+def test_highlight(benchmark, server, content, max_concurrency):
+    result = benchmark.pedantic(highlight_workload(server.base_url, content, max_concurrency), rounds=3)
+
+    assert result["title"]
+
+
+def test_streamed_sections(benchmark, server, content):
+    benchmark.pedantic(streamed_workload(server.base_url, content), rounds=3)
+
+
+def test_render_docx(benchmark, sections):
+    docx, _ = export_workloads(sections)
+    docx()
+
+    assert benchmark(docx)
+
+
+def test_render_pptx(benchmark, sections):
+    _, pptx = export_workloads(sections)
+    pptx()
+
+    assert benchmark(pptx)
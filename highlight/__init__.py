@@ -1,5 +1,57 @@
+import importlib
+
 from highlight.prompts import prompt_queue
 from highlight.utils import *
+from highlight.cache import ExtractionCache, ResponseCache
+from highlight.metrics import (
+    CallRecord,
+    CallTimer,
+    JsonlSink,
+    MetricsAggregator,
+    PrometheusSink,
+    add_sink,
+    get_metrics,
+    remove_sink,
+    track_calls
+)
+from highlight.models import DEFAULT_MODEL, MODELS, ModelInfo, context_window, estimate_cost, get_model_info
+from highlight.profiling import RerunProfiler, get_active_profiler, profile_mode, profile_phase
+from highlight.ratelimit import ModelRateLimiter, RateLimiter
+from highlight.routing import DEFAULT_ROUTING_RULES, ModelRouter, RoutingRule
+from highlight.client import AsyncRetryingClient, RetryingClient
+from highlight.engine import SECTIONS, STRUCTURED_SECTIONS, agenerate_all, generate_all
+from highlight.jobs import JOB_SERVICE_ENV, JOB_STATUSES, Job, JobService, JobStore, get_job_service
 
 
 __version__ = "0.1.0"
+
+
+# names provided by modules with heavy dependencies (Streamlit, docxtpl, python-pptx) which are only imported
+# when first accessed so that `import highlight` stays fast in workers and on the command line
+_LAZY_ATTRIBUTES = {
+    "generate_content": "highlight.ui",
+    "show_profile": "highlight.ui",
+    "DOCX_MIME_TYPE": "highlight.export",
+    "PPTX_MIME_TYPE": "highlight.export",
+    "TemplateManager": "highlight.export",
+    "get_template_manager": "highlight.export",
+    "build_word_parameters": "highlight.export",
+    "render_docx": "highlight.export",
+    "render_pptx": "highlight.export",
+    "build_deck": "highlight.export",
+    "deck_file_path": "highlight.export",
+    "pptx_fields": "highlight.export",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+        globals()[name] = value
+        return value
+
+    raise AttributeError(f"module 'highlight' has no attribute '{name}'")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
@@ -0,0 +1,375 @@
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+
+
+# environment variables controlling the default response cache
+CACHE_DIR_ENV = "HIGHLIGHT_CACHE_DIR"
+CACHE_DISABLE_ENV = "HIGHLIGHT_DISABLE_CACHE"
+
+
+def default_cache_dir() -> str:
+    """
+    Return the directory used for on-disk caches.
+
+    Returns:
+        str: The value of the `HIGHLIGHT_CACHE_DIR` environment variable if set, else `~/.cache/highlight`.
+    """
+
+    return os.getenv(CACHE_DIR_ENV, os.path.join(os.path.expanduser("~"), ".cache", "highlight"))
+
+
+def make_cache_key(system_scope: str, prompt: str, model: str, max_tokens: int, temperature: float) -> str:
+    """
+    Build the content-addressed key for a completion request.
+
+    Args:
+        system_scope (str): The system scope or context for the prompt.
+        prompt (str or list): The fully formatted user prompt, or the prefix and prompt messages.
+        model (str): The model used for the completion.
+        max_tokens (int): The maximum number of tokens requested.
+        temperature (float): The sampling temperature.
+
+    Returns:
+        str: A SHA-256 hex digest of the request parameters.
+    """
+
+    payload = json.dumps(
+        [system_scope, prompt, model, int(max_tokens), float(temperature)],
+        ensure_ascii=False,
+        separators=(",", ":")
+    )
+
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    SQLite-backed store of completion responses keyed by `make_cache_key`.
+
+    Entries older than `max_age_seconds` are treated as misses and removed.  When the number of entries or their
+    total size exceeds the limits, the least recently used entries are evicted.  Each operation opens its own
+    connection so one cache can be shared across threads.
+
+    Args:
+        path (str): Path to the SQLite database file.  Parent directories are created as needed.
+        max_entries (int, optional): The maximum number of responses kept. Defaults to 10000.
+        max_bytes (int, optional): The maximum total size in bytes of stored responses. Defaults to 100 MB.
+        max_age_seconds (float, optional): The maximum age of an entry in seconds.  None keeps entries until
+                                           they are evicted for size. Defaults to 30 days.
+    """
+
+    def __init__(self, path, max_entries=10000, max_bytes=100 * 1024 ** 2, max_age_seconds=30 * 24 * 3600):
+
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    model TEXT,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL,
+                    size INTEGER NOT NULL
+                )"""
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, key):
+        """
+        Look up a response.
+
+        Args:
+            key (str): The cache key from `make_cache_key`.
+
+        Returns:
+            str: The cached response, or None on a miss.
+        """
+
+        now = time.time()
+
+        with closing(self._connect()) as connection, connection:
+            row = connection.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+
+            if row is None:
+                return None
+
+            response, created = row
+
+            if self.max_age_seconds is not None and now - created > self.max_age_seconds:
+                connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+
+            connection.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+
+        return response
+
+    def set(self, key, response, model=None):
+        """
+        Store a response and evict entries that exceed the age and size limits.
+
+        Args:
+            key (str): The cache key from `make_cache_key`.
+            response (str): The response content to store.
+            model (str, optional): The model that produced the response. Defaults to None.
+        """
+
+        now = time.time()
+
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, response, model, now, now, len(response.encode("utf-8")))
+            )
+            self._evict(connection, now)
+
+    def _evict(self, connection, now):
+
+        if self.max_age_seconds is not None:
+            connection.execute("DELETE FROM responses WHERE created < ?", (now - self.max_age_seconds,))
+
+        n_entries, n_bytes = connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+
+        if n_entries <= self.max_entries and n_bytes <= self.max_bytes:
+            return
+
+        # walk from the least recently used entry until both limits are met
+        evict_keys = []
+        for key, size in connection.execute("SELECT key, size FROM responses ORDER BY accessed ASC"):
+            if n_entries <= self.max_entries and n_bytes <= self.max_bytes:
+                break
+            evict_keys.append((key,))
+            n_entries -= 1
+            n_bytes -= size
+
+        connection.executemany("DELETE FROM responses WHERE key = ?", evict_keys)
+
+    def clear(self):
+        """Remove all cached responses."""
+
+        with closing(self._connect()) as connection, connection:
+            connection.execute("DELETE FROM responses")
+
+    def __len__(self):
+        with closing(self._connect()) as connection:
+            return connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+_DEFAULT_CACHE = None
+_DEFAULT_CACHE_LOCK = threading.Lock()
+
+
+def get_default_cache() -> ResponseCache:
+    """
+    Return the process-wide response cache stored in `default_cache_dir()`, creating it on first use.
+
+    Returns:
+        ResponseCache: The default response cache.
+    """
+
+    global _DEFAULT_CACHE
+
+    with _DEFAULT_CACHE_LOCK:
+        if _DEFAULT_CACHE is None:
+            _DEFAULT_CACHE = ResponseCache(os.path.join(default_cache_dir(), "responses.sqlite3"))
+
+    return _DEFAULT_CACHE
+
+
+def resolve_cache(cache, temperature):
+    """
+    Choose the response cache to use for a request.
+
+    Args:
+        cache (ResponseCache, bool, or None): An explicit cache to use, False to bypass caching, True to use the
+                                              default cache, or None to use the default cache only for
+                                              deterministic (temperature 0.0) requests.
+        temperature (float): The sampling temperature of the request.
+
+    Returns:
+        ResponseCache: The cache to use, or None if the request should not be cached.
+    """
+
+    if cache is False:
+        return None
+
+    if cache is None or cache is True:
+        if cache is None and temperature != 0.0:
+            return None
+
+        if os.getenv(CACHE_DISABLE_ENV, "").lower() in ("1", "true", "yes"):
+            return None
+
+        return get_default_cache()
+
+    return cache
+
+
+def file_digest(file_object) -> str:
+    """
+    Compute the SHA-256 digest of a file object's bytes without changing its read position.
+
+    Args:
+        file_object (object): A binary file object, such as an uploaded Streamlit file or `BytesIO`.
+
+    Returns:
+        str: The hex digest of the file contents.
+    """
+
+    position = file_object.tell()
+    file_object.seek(0)
+
+    digest = hashlib.sha256()
+    for block in iter(lambda: file_object.read(1024 ** 2), b""):
+        digest.update(block)
+
+    file_object.seek(position)
+
+    return digest.hexdigest()
+
+
+def extraction_cache_key(file_object, *parts) -> str:
+    """
+    Build the key for an extraction result from the file digest and any options that change the result.
+
+    Args:
+        file_object (object): A binary file object.
+        *parts: Additional values, such as the reference indicator, that change the extraction result.
+
+    Returns:
+        str: A SHA-256 hex digest.
+    """
+
+    payload = json.dumps([file_digest(file_object), *parts], ensure_ascii=False)
+
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ExtractionCache:
+    """
+    Least recently used cache of document extraction results with an optional on-disk tier.
+
+    Results are kept in memory up to `max_items`.  When `disk_dir` is provided every result is also written there
+    as JSON so that it survives restarts, and memory misses fall back to disk.
+
+    Args:
+        max_items (int, optional): The maximum number of results kept in memory. Defaults to 32.
+        disk_dir (str, optional): Directory for the on-disk tier.  None keeps results in memory only.
+                                  Defaults to None.
+    """
+
+    def __init__(self, max_items=32, disk_dir=None):
+
+        self.max_items = max_items
+        self.disk_dir = disk_dir
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+        if disk_dir is not None:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def get(self, key):
+        """
+        Look up an extraction result.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            dict: A copy of the cached result, or None on a miss.
+        """
+
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+
+        if value is None and self.disk_dir is not None:
+            try:
+                with open(self._disk_path(key), "r", encoding="utf-8") as disk_file:
+                    value = json.load(disk_file)
+            except (OSError, ValueError):
+                return None
+
+            self._remember(key, value)
+
+        # a deep copy, so a caller modifying the pages cannot change the result other callers get
+        return None if value is None else copy.deepcopy(value)
+
+    def set(self, key, value):
+        """
+        Store an extraction result.
+
+        Args:
+            key (str): The cache key.
+            value (dict): The JSON serializable extraction result.
+        """
+
+        self._remember(key, copy.deepcopy(value))
+
+        if self.disk_dir is not None:
+            temp_path = f"{self._disk_path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as disk_file:
+                json.dump(value, disk_file)
+            os.replace(temp_path, self._disk_path(key))
+
+    def clear(self):
+        """Remove all results from memory and disk."""
+
+        with self._lock:
+            self._items.clear()
+
+        if self.disk_dir is not None:
+            for file_name in os.listdir(self.disk_dir):
+                if file_name.endswith(".json"):
+                    os.remove(os.path.join(self.disk_dir, file_name))
+
+    def __len__(self):
+        return len(self._items)
+
+
+_DEFAULT_EXTRACTION_CACHE = None
+
+
+def get_default_extraction_cache() -> ExtractionCache:
+    """
+    Return the process-wide in-memory extraction cache, creating it on first use.
+
+    Returns:
+        ExtractionCache: The default extraction cache.
+    """
+
+    global _DEFAULT_EXTRACTION_CACHE
+
+    with _DEFAULT_CACHE_LOCK:
+        if _DEFAULT_EXTRACTION_CACHE is None:
+            _DEFAULT_EXTRACTION_CACHE = ExtractionCache()
+
+    return _DEFAULT_EXTRACTION_CACHE
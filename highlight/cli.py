@@ -0,0 +1,483 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from tqdm import tqdm
+
+from highlight.client import AsyncRetryingClient
+from highlight.engine import agenerate_all
+from highlight.export import build_deck, deck_file_path, build_word_parameters, render_docx, render_pptx
+from highlight.metrics import JsonlSink, PrometheusSink, add_sink, get_metrics
+from highlight.models import context_window
+from highlight.ratelimit import RateLimiter
+from highlight.routing import ModelRouter
+from highlight.utils import read_pdf, read_text
+
+
+# file types the batch command processes
+SUPPORTED_EXTENSIONS = (".pdf", ".txt")
+
+
+def discover_documents(source: str) -> list:
+    """
+    List the documents to process from a directory or a manifest file.
+
+    A manifest is a text file with one document path per line.  Relative paths are resolved against the
+    manifest's directory and blank lines or lines starting with "#" are ignored.
+
+    Args:
+        source (str): A directory containing PDF and text files, or a manifest file.
+
+    Returns:
+        list: Sorted document paths.
+
+    Raises:
+        FileNotFoundError: If `source` does not exist.
+    """
+
+    if os.path.isdir(source):
+        return sorted(
+            os.path.join(source, file_name)
+            for file_name in os.listdir(source)
+            if file_name.lower().endswith(SUPPORTED_EXTENSIONS)
+        )
+
+    if not os.path.isfile(source):
+        raise FileNotFoundError(f"No directory or manifest found at '{source}'")
+
+    manifest_dir = os.path.dirname(os.path.abspath(source))
+
+    with open(source, "r", encoding="utf-8") as manifest:
+        lines = [line.strip() for line in manifest]
+
+    return [
+        os.path.join(manifest_dir, line)
+        for line in lines
+        if line and not line.startswith("#")
+    ]
+
+
+def output_paths(document_path: str, output_dir: str) -> dict:
+    """
+    Return the output file paths for a document.
+
+    Args:
+        document_path (str): The path to the input document.
+        output_dir (str): The directory outputs are written to.
+
+    Returns:
+        dict: Paths keyed by "docx", "pptx", and "sections".  The sections JSON file is written last and marks
+              the document as complete.
+    """
+
+    stem = os.path.splitext(os.path.basename(document_path))[0]
+
+    return {
+        "docx": os.path.join(output_dir, f"{stem}.docx"),
+        "pptx": os.path.join(output_dir, f"{stem}.pptx"),
+        "sections": os.path.join(output_dir, f"{stem}.json"),
+    }
+
+
+def _write_atomic(path, data):
+    """Write bytes to a temporary file next to `path` and move it into place."""
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as output_file:
+        output_file.write(data)
+    os.replace(temp_path, path)
+
+
+def read_document(document_path: str) -> dict:
+    """
+    Read a PDF or text document from disk.
+
+    Args:
+        document_path (str): The path to the document.
+
+    Returns:
+        dict: The content dictionary from `read_pdf` or `read_text`.
+    """
+
+    with open(document_path, "rb") as file_object:
+        if document_path.lower().endswith(".pdf"):
+            return read_pdf(file_object)
+
+        return read_text(file_object)
+
+
+def process_document(
+    document_path: str,
+    output_dir: str,
+    client_factory,
+    model: str = "gpt-4o",
+    max_concurrency: int = 4,
+    max_allowable_tokens: int = None,
+    point_of_contact: str = None,
+    router=None,
+    prompt_layout: str = "inline",
+    structured: bool = False
+) -> dict:
+    """
+    Generate every section for one document and write its Word and PowerPoint outputs.
+
+    Args:
+        document_path (str): The path to the document.
+        output_dir (str): The directory outputs are written to.
+        client_factory (callable): Called with no arguments to create the asynchronous OpenAI client.
+        model (str, optional): The model to use for content generation. Defaults to "gpt-4o".
+        max_concurrency (int, optional): The maximum number of requests in flight for this document. Defaults to 4.
+        max_allowable_tokens (int, optional): The maximum allowable tokens for the content.
+                                              Defaults to the context window of `model`.
+        point_of_contact (str, optional): The point of contact block written to the Word document. Defaults to None.
+        router (ModelRouter, optional): Chooses the model of each section instead of `model`.  See
+                                        `agenerate_all`. Defaults to None.
+        prompt_layout (str, optional): How each request is assembled.  See `agenerate_all`.
+                                       Defaults to "inline".
+        structured (bool, optional): Request the main sections together in structured requests.  See
+                                     `agenerate_all`. Defaults to False.
+
+    Returns:
+        dict: The generated sections keyed by section name.
+    """
+
+    content_dict = read_document(document_path)
+
+    if max_allowable_tokens is None:
+        max_allowable_tokens = context_window(model)
+
+    if router is None and content_dict["n_tokens"] > max_allowable_tokens:
+        raise RuntimeError((
+            f"Document has {content_dict['n_tokens']} tokens which exceeds the maximum allowable "
+            f"{max_allowable_tokens} tokens for model '{model}'."
+        ))
+
+    async def generate():
+        return await agenerate_all(
+            client_factory(),
+            content_dict["content"],
+            max_concurrency=max_concurrency,
+            max_allowable_tokens=max_allowable_tokens,
+            model=model,
+            router=router,
+            prompt_layout=prompt_layout,
+            structured=structured
+        )
+
+    sections = asyncio.run(generate())
+
+    paths = output_paths(document_path, output_dir)
+
+    _write_atomic(paths["docx"], render_docx(build_word_parameters(sections, point_of_contact=point_of_contact)))
+
+    _write_atomic(paths["pptx"], render_pptx(
+        title=sections["title"],
+        citation=sections["citation"],
+        objective=sections["objective"],
+        approach=sections["approach"],
+        ppt_impact=sections["ppt_impact"]
+    ))
+
+    # written last so an interrupted document is regenerated on the next run
+    record = {"document": os.path.abspath(document_path), "model": model, "sections": sections}
+    _write_atomic(paths["sections"], json.dumps(record, indent=2).encode("utf-8"))
+
+    return sections
+
+
+def run_batch(
+    source: str,
+    output_dir: str,
+    client_factory=None,
+    model: str = "gpt-4o",
+    max_documents: int = 2,
+    max_concurrency: int = 4,
+    max_allowable_tokens: int = None,
+    point_of_contact: str = None,
+    overwrite: bool = False,
+    rate_limiter=None,
+    max_retries: int = 5,
+    timeout: float = None,
+    router=None,
+    prompt_layout: str = "inline",
+    structured: bool = False
+) -> dict:
+    """
+    Generate highlights for every document in a directory or manifest.
+
+    Documents whose outputs already exist are skipped unless `overwrite` is set, so a crashed run can be resumed
+    by running it again.  A failure on one document is reported and does not stop the others.
+
+    Args:
+        source (str): A directory containing PDF and text files, or a manifest file.
+        output_dir (str): The directory outputs are written to.
+        client_factory (callable, optional): Called with no arguments to create an asynchronous OpenAI client
+                                             for each document. Defaults to an `AsyncRetryingClient` around
+                                             `openai.AsyncOpenAI`.
+        model (str, optional): The model to use for content generation. Defaults to "gpt-4o".
+        max_documents (int, optional): The maximum number of documents processed at once. Defaults to 2.
+        max_concurrency (int, optional): The maximum number of requests in flight per document. Defaults to 4.
+        max_allowable_tokens (int, optional): The maximum allowable tokens for the content.
+                                              Defaults to the context window of `model`.
+        point_of_contact (str, optional): The point of contact block written to the Word documents. Defaults to None.
+        overwrite (bool, optional): Regenerate documents that already have outputs. Defaults to False.
+        rate_limiter (RateLimiter, optional): A request/token budget shared by every document when the default
+                                              client is used. Defaults to None.
+        max_retries (int, optional): Retries of each failed request when the default client is used.
+                                     Defaults to 5.
+        timeout (float, optional): The timeout in seconds of each request when the default client is used.
+                                   Defaults to None.
+        router (ModelRouter, optional): Chooses the model of each section instead of `model`.  See
+                                        `agenerate_all`. Defaults to None.
+        prompt_layout (str, optional): How each request is assembled.  See `agenerate_all`.
+                                       Defaults to "inline".
+        structured (bool, optional): Request the main sections together in structured requests.  See
+                                     `agenerate_all`. Defaults to False.
+
+    Returns:
+        dict: A status of "done", "skipped", or the error message keyed by document path.
+
+    Raises:
+        ValueError: If documents from different directories, or with different extensions, share a file name
+                    and would write the same outputs.
+    """
+
+    if client_factory is None:
+        from openai import AsyncOpenAI
+
+        def client_factory():
+            return AsyncRetryingClient(
+                AsyncOpenAI(max_retries=0),
+                max_retries=max_retries,
+                timeout=timeout,
+                rate_limiter=rate_limiter
+            )
+
+    documents = discover_documents(source)
+
+    # outputs are named after the document's file name, so documents sharing one would overwrite each other and
+    # the second would be skipped as done on the next run
+    documents_by_output = {}
+    for document_path in documents:
+        sections_path = os.path.normcase(output_paths(document_path, output_dir)["sections"])
+        documents_by_output.setdefault(sections_path, []).append(document_path)
+
+    duplicates = [paths for paths in documents_by_output.values() if len(paths) > 1]
+    if duplicates:
+        raise ValueError((
+            "Documents with the same file name would overwrite each other's outputs:  "
+            + "; ".join(", ".join(paths) for paths in duplicates)
+        ))
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    statuses = {}
+    pending = []
+
+    for document_path in documents:
+        if not overwrite and os.path.exists(output_paths(document_path, output_dir)["sections"]):
+            statuses[document_path] = "skipped"
+        else:
+            pending.append(document_path)
+
+    with ThreadPoolExecutor(max_workers=max_documents) as executor:
+        futures = {
+            executor.submit(
+                process_document,
+                document_path,
+                output_dir,
+                client_factory,
+                model=model,
+                max_concurrency=max_concurrency,
+                max_allowable_tokens=max_allowable_tokens,
+                point_of_contact=point_of_contact,
+                router=router,
+                prompt_layout=prompt_layout,
+                structured=structured
+            ): document_path
+            for document_path in pending
+        }
+
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Documents"):
+            document_path = futures[future]
+
+            try:
+                future.result()
+                statuses[document_path] = "done"
+            except Exception as error:
+                statuses[document_path] = f"error: {error}"
+                tqdm.write(f"Failed to process '{document_path}':  {error}", file=sys.stderr)
+
+    return statuses
+
+
+def iter_section_records(source: str):
+    """
+    Yield the generated sections written by `run_batch`, one document at a time.
+
+    Args:
+        source (str): A `run_batch` output directory, or a manifest listing sections JSON files.
+
+    Yields:
+        dict: The generated sections of one document keyed by section name.
+    """
+
+    if os.path.isdir(source):
+        paths = sorted(
+            os.path.join(source, file_name) for file_name in os.listdir(source) if file_name.endswith(".json")
+        )
+    else:
+        paths = discover_documents(source)
+
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as record_file:
+            yield json.load(record_file)["sections"]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the command line parser for the `highlight` command.
+
+    Returns:
+        argparse.ArgumentParser: The parser.
+    """
+
+    parser = argparse.ArgumentParser(prog="highlight", description="Generate publication highlights using AI")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    batch = subparsers.add_parser(
+        "batch",
+        help="Generate highlights for a directory or manifest of PDF and text files"
+    )
+    batch.add_argument("source", help="Directory of PDF/TXT files or a manifest with one path per line")
+    batch.add_argument("-o", "--output-dir", default="highlights", help="Directory to write outputs to")
+    batch.add_argument("-m", "--model", default="gpt-4o", help="Model to use for content generation")
+    batch.add_argument("--max-documents", type=int, default=2, help="Documents processed at once")
+    batch.add_argument("--max-concurrency", type=int, default=4, help="Requests in flight per document")
+    batch.add_argument("--max-allowable-tokens", type=int, default=None,
+                       help="Maximum tokens per request.  Defaults to the model's context window")
+    batch.add_argument("--point-of-contact", default=None, help="Point of contact block for the Word document")
+    batch.add_argument("--overwrite", action="store_true", help="Regenerate documents that already have outputs")
+    batch.add_argument("--requests-per-minute", type=int, default=None, help="Request rate limit of the account")
+    batch.add_argument("--tokens-per-minute", type=int, default=None, help="Token rate limit of the account")
+    batch.add_argument("--max-retries", type=int, default=5, help="Retries of each failed request")
+    batch.add_argument("--timeout", type=float, default=None, help="Timeout in seconds of each request")
+    batch.add_argument(
+        "--auto-route",
+        action="store_true",
+        help="Send short extraction sections to a cheaper model and long documents to a bigger context window"
+    )
+    batch.add_argument(
+        "--shared-prefix",
+        action="store_true",
+        help="Send each document ahead of the section instructions so the provider can cache it across sections"
+    )
+    batch.add_argument(
+        "--structured",
+        action="store_true",
+        help=(
+            "Request the main sections that share a temperature together in one JSON response, falling back to "
+            "one request per section"
+        )
+    )
+    batch.add_argument("--metrics-file", default=None, help="JSON Lines file to append a record of each call to")
+    batch.add_argument("--metrics-port", type=int, default=None,
+                       help="Serve call metrics in the Prometheus text format on this port while the batch runs")
+
+    deck = subparsers.add_parser("deck", help="Build one PowerPoint deck from the outputs of the batch command")
+    deck.add_argument("source", help="Batch output directory or a manifest of sections JSON files")
+    deck.add_argument("-o", "--output", default="highlights.pptx", help="Path to write the deck to")
+    deck.add_argument("--template", default=None, help="PowerPoint template to clone for each slide")
+    deck.add_argument("--slides-per-file", type=int, default=None,
+                      help="Split the deck into numbered files of at most this many slides to bound memory")
+
+    return parser
+
+
+def main(argv=None) -> int:
+    """
+    Entry point for the `highlight` command.
+
+    Args:
+        argv (list, optional): Command line arguments. Defaults to `sys.argv[1:]`.
+
+    Returns:
+        int: The exit code; 1 if any document failed.
+    """
+
+    args = build_parser().parse_args(argv)
+
+    if args.command == "batch":
+        if args.metrics_file is not None:
+            add_sink(JsonlSink(args.metrics_file))
+
+        metrics_server = None
+        if args.metrics_port is not None:
+            prometheus_sink = PrometheusSink()
+            add_sink(prometheus_sink)
+            metrics_server = prometheus_sink.serve(args.metrics_port)
+
+        try:
+            statuses = run_batch(
+                source=args.source,
+                output_dir=args.output_dir,
+                model=args.model,
+                max_documents=args.max_documents,
+                max_concurrency=args.max_concurrency,
+                max_allowable_tokens=args.max_allowable_tokens,
+                point_of_contact=args.point_of_contact,
+                overwrite=args.overwrite,
+                rate_limiter=RateLimiter(args.requests_per_minute, args.tokens_per_minute),
+                max_retries=args.max_retries,
+                timeout=args.timeout,
+                router=ModelRouter(default_model=args.model) if args.auto_route else None,
+                prompt_layout="shared_prefix" if args.shared_prefix else "inline",
+                structured=args.structured
+            )
+
+        finally:
+            if metrics_server is not None:
+                metrics_server.shutdown()
+                metrics_server.server_close()
+
+        n_done = sum(status == "done" for status in statuses.values())
+        n_skipped = sum(status == "skipped" for status in statuses.values())
+        n_failed = len(statuses) - n_done - n_skipped
+
+        print(f"Processed {n_done}, skipped {n_skipped}, failed {n_failed} of {len(statuses)} documents.")
+
+        usage = get_metrics().summary()
+        n_requests = usage["calls"] - usage["response_cache_hits"]
+        if n_requests:
+            print((
+                f"Used {usage['input_tokens']} prompt tokens ({usage['cached_fraction']:.0%} cached) and "
+                f"{usage['output_tokens']} completion tokens in {n_requests} requests "
+                f"(about ${usage['cost']:.2f})."
+            ))
+        if usage["errors"] or usage["retries"]:
+            print(f"{usage['errors']} requests failed; {usage['retries']} failed attempts were retried.")
+
+        return 1 if n_failed else 0
+
+    if args.command == "deck":
+        n_slides = build_deck(
+            iter_section_records(args.source),
+            args.output,
+            template=args.template,
+            slides_per_file=args.slides_per_file
+        )
+
+        if args.slides_per_file is None:
+            print(f"Wrote {n_slides} slides to '{args.output}'.")
+        else:
+            n_files = max(1, -(-n_slides // args.slides_per_file))
+            print(f"Wrote {n_slides} slides to {n_files} files named like '{deck_file_path(args.output, 1)}'.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,285 @@
+import asyncio
+import email.utils
+import random
+import threading
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+
+from highlight.metrics import record_retry
+from highlight.utils import get_token_count
+
+
+# HTTP status codes that indicate a transient failure worth retrying
+RETRY_STATUS_CODES = (408, 409, 429, 500, 502, 503, 504)
+
+
+def is_retryable(error) -> bool:
+    """
+    Decide whether a failed API request should be retried.
+
+    Args:
+        error (Exception): The error raised by the request.
+
+    Returns:
+        bool: True for connection errors, timeouts, rate limits, and server errors.
+    """
+
+    from openai import APIConnectionError
+
+    if isinstance(error, APIConnectionError):
+        return True
+
+    return getattr(error, "status_code", None) in RETRY_STATUS_CODES
+
+
+def retry_after_seconds(error):
+    """
+    Read the delay requested by the server from the `Retry-After` headers of a failed request.
+
+    Args:
+        error (Exception): The error raised by the request.
+
+    Returns:
+        float: The requested delay in seconds, or None if the server did not request one.
+    """
+
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms is not None:
+        try:
+            return float(retry_after_ms) / 1000.0
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if retry_after is None:
+        return None
+
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+
+    # the header may also be an HTTP date
+    try:
+        retry_date = email.utils.parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+
+    return max(0.0, retry_date.timestamp() - time.time())
+
+
+def backoff_delay(attempt: int, base_delay: float = 1.0, max_delay: float = 60.0, jitter=random.random) -> float:
+    """
+    Compute the wait before a retry using exponential backoff with full jitter.
+
+    Args:
+        attempt (int): The number of failed attempts so far, starting at 0.
+        base_delay (float, optional): The delay cap of the first retry in seconds. Defaults to 1.0.
+        max_delay (float, optional): The largest delay in seconds. Defaults to 60.0.
+        jitter (callable, optional): Returns a random number in [0, 1). Defaults to random.random.
+
+    Returns:
+        float: The number of seconds to wait.
+    """
+
+    return jitter() * min(max_delay, base_delay * 2 ** attempt)
+
+
+# token counts of recent message contents, so a document sent with every section is tokenized once
+_MESSAGE_TOKEN_COUNTS = OrderedDict()
+_MESSAGE_TOKEN_COUNTS_LOCK = threading.Lock()
+_MESSAGE_TOKEN_COUNTS_SIZE = 64
+
+
+def _message_token_count(content: str, model: str) -> int:
+    key = (model, content)
+
+    with _MESSAGE_TOKEN_COUNTS_LOCK:
+        n_tokens = _MESSAGE_TOKEN_COUNTS.get(key)
+        if n_tokens is not None:
+            _MESSAGE_TOKEN_COUNTS.move_to_end(key)
+            return n_tokens
+
+    n_tokens = get_token_count(content, model=model)
+
+    with _MESSAGE_TOKEN_COUNTS_LOCK:
+        _MESSAGE_TOKEN_COUNTS[key] = n_tokens
+        while len(_MESSAGE_TOKEN_COUNTS) > _MESSAGE_TOKEN_COUNTS_SIZE:
+            _MESSAGE_TOKEN_COUNTS.popitem(last=False)
+
+    return n_tokens
+
+
+def estimate_request_tokens(messages, max_tokens=0, model="gpt-4o") -> int:
+    """
+    Estimate the tokens a chat completion request counts against a tokens-per-minute limit.
+
+    The token counts of recent message contents are remembered, so the document repeated in every section
+    request is only tokenized once.
+
+    Args:
+        messages (list): The chat messages.
+        max_tokens (int, optional): The maximum number of completion tokens. Defaults to 0.
+        model (str, optional): The model whose tokenizer is used. Defaults to "gpt-4o".
+
+    Returns:
+        int: The prompt tokens plus `max_tokens`.
+    """
+
+    prompt_tokens = sum(_message_token_count(message.get("content") or "", model) for message in messages)
+
+    return prompt_tokens + (max_tokens or 0)
+
+
+class RetryingClient:
+    """
+    Wrap an OpenAI client so that chat completions are rate limited and transient failures are retried.
+
+    Requests wait on the shared `rate_limiter` before each attempt.  Connection errors, timeouts, rate limits,
+    and server errors are retried with exponential backoff and jitter, or after the delay the server asks for in
+    its `Retry-After` header, and counted on the `CallTimer` of the call.  Other attributes are passed through
+    to the wrapped client, so the wrapper can be used wherever the client is.  Create the wrapped client with
+    `max_retries=0` to avoid retrying twice.
+
+    Args:
+        client (OpenAI): The OpenAI client to wrap.
+        max_retries (int, optional): The number of retries after the first attempt. Defaults to 5.
+        base_delay (float, optional): The backoff delay cap of the first retry in seconds. Defaults to 1.0.
+        max_delay (float, optional): The largest backoff delay in seconds. Defaults to 60.0.
+        timeout (float, optional): The timeout of each request in seconds.  None uses the client's timeout.
+                                   Defaults to None.
+        rate_limiter (RateLimiter or ModelRateLimiter, optional): A request/token budget shared with other
+                                                                  clients, or one budget per model.
+                                                                  Defaults to None.
+        sleep (callable, optional): Function used to wait between attempts. Defaults to time.sleep.
+        jitter (callable, optional): Returns a random number in [0, 1). Defaults to random.random.
+    """
+
+    def __init__(
+        self,
+        client,
+        max_retries=5,
+        base_delay=1.0,
+        max_delay=60.0,
+        timeout=None,
+        rate_limiter=None,
+        sleep=time.sleep,
+        jitter=random.random
+    ):
+
+        self.client = client
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self._sleep = sleep
+        self._jitter = jitter
+
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def __getattr__(self, name):
+        # only reached for attributes the wrapper does not define, e.g., `api_key`
+        if name == "client":
+            raise AttributeError(name)
+
+        return getattr(self.client, name)
+
+    def _request_options(self, kwargs):
+        model = kwargs.get("model", "gpt-4o")
+        rate_limiter = None if self.rate_limiter is None else self.rate_limiter.for_model(model)
+
+        tokens = 0
+        if rate_limiter is not None and rate_limiter.tokens_per_minute:
+            tokens = estimate_request_tokens(
+                kwargs.get("messages", []),
+                max_tokens=kwargs.get("max_tokens"),
+                model=model
+            )
+
+        if self.timeout is not None:
+            kwargs = dict(kwargs, timeout=self.timeout)
+
+        return rate_limiter, tokens, kwargs
+
+    def _retry_delay(self, error, attempt):
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+
+        delay = retry_after_seconds(error)
+        if delay is None:
+            delay = backoff_delay(attempt, self.base_delay, self.max_delay, self._jitter)
+
+        return delay
+
+    def create(self, **kwargs):
+        """
+        Create a chat completion, see `openai.OpenAI().chat.completions.create`.
+
+        Returns:
+            ChatCompletion: The completion, or the stream when `stream=True`.
+        """
+
+        rate_limiter, tokens, kwargs = self._request_options(kwargs)
+
+        attempt = 0
+        while True:
+            if rate_limiter is not None:
+                rate_limiter.acquire(tokens)
+
+            try:
+                return self.client.chat.completions.create(**kwargs)
+            except Exception as error:
+                delay = self._retry_delay(error, attempt)
+                if delay is None:
+                    raise
+
+            record_retry()
+            self._sleep(delay)
+            attempt += 1
+
+
+class AsyncRetryingClient(RetryingClient):
+    """
+    Asynchronous counterpart of `RetryingClient` for `AsyncOpenAI` clients.
+
+    Waiting for the rate limiter and between attempts does not block the event loop.  Arguments are the same as
+    `RetryingClient` except that `sleep` must be a coroutine function and defaults to `asyncio.sleep`.
+    """
+
+    def __init__(self, client, sleep=asyncio.sleep, **kwargs):
+
+        super().__init__(client, sleep=sleep, **kwargs)
+
+    async def create(self, **kwargs):
+        """
+        Create a chat completion, see `openai.AsyncOpenAI().chat.completions.create`.
+
+        Returns:
+            ChatCompletion: The completion, or the stream when `stream=True`.
+        """
+
+        rate_limiter, tokens, kwargs = self._request_options(kwargs)
+
+        attempt = 0
+        while True:
+            if rate_limiter is not None:
+                await rate_limiter.aacquire(tokens)
+
+            try:
+                return await self.client.chat.completions.create(**kwargs)
+            except Exception as error:
+                delay = self._retry_delay(error, attempt)
+                if delay is None:
+                    raise
+
+            record_retry()
+            await self._sleep(delay)
+            attempt += 1
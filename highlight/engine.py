@@ -0,0 +1,741 @@
+import asyncio
+import json
+import time
+
+import highlight.prompts as prompts
+from highlight.cache import make_cache_key, resolve_cache
+from highlight.metrics import CallTimer
+from highlight.models import get_model_info
+from highlight.utils import (
+    build_messages,
+    build_prompt_parts,
+    check_prompt_tokens,
+    get_token_count,
+    hit_token_limit,
+    tokens_per_word,
+    trim_to_word_count,
+    word_budget_tokens
+)
+
+
+# generation settings for each highlight section, matching the defaults used in the app.  `content_from` names
+# the section whose response replaces the document as the prompt content and `additional_content_from` names the
+# section whose response is passed as additional content.  Sections with `word_budget` request only the tokens
+# their maximum word count needs.
+SECTIONS = {
+    "title": {
+        "prompt_name": "title",
+        "state_key": "title_response",
+        "max_tokens": 50,
+        "temperature": 0.2,
+    },
+    "subtitle": {
+        "prompt_name": "subtitle",
+        "state_key": "subtitle_response",
+        "max_tokens": 100,
+        "temperature": 0.5,
+        "additional_content_from": "title",
+    },
+    "science": {
+        "prompt_name": "science",
+        "state_key": "science_response",
+        "max_tokens": 200,
+        "temperature": 0.3,
+        "word_budget": True,
+    },
+    "impact": {
+        "prompt_name": "impact",
+        "state_key": "impact_response",
+        "max_tokens": 700,
+        "temperature": 0.0,
+        "word_budget": True,
+    },
+    "summary": {
+        "prompt_name": "summary",
+        "state_key": "summary_response",
+        "max_tokens": 700,
+        "temperature": 0.3,
+        "max_word_count": 200,
+        "min_word_count": 100,
+        "word_budget": True,
+    },
+    "figure": {
+        "prompt_name": "figure",
+        "state_key": "figure_response",
+        "max_tokens": 200,
+        "temperature": 0.9,
+        "content_from": "summary",
+    },
+    "figure_caption": {
+        "prompt_name": "figure_caption",
+        "state_key": "figure_caption",
+        "max_tokens": 300,
+        "temperature": 0.1,
+        "content_from": "summary",
+        "strip_quotes": True,
+    },
+    "citation": {
+        "prompt_name": "citation",
+        "state_key": "citation",
+        "max_tokens": 300,
+        "temperature": 0.0,
+        "strip_quotes": True,
+    },
+    "funding": {
+        "prompt_name": "funding",
+        "state_key": "funding",
+        "max_tokens": 300,
+        "temperature": 0.0,
+        "strip_quotes": True,
+    },
+    "objective": {
+        "prompt_name": "objective",
+        "state_key": "objective_response",
+        "max_tokens": 300,
+        "temperature": 0.3,
+    },
+    "approach": {
+        "prompt_name": "approach",
+        "state_key": "approach_response",
+        "max_tokens": 300,
+        "temperature": 0.1,
+        "additional_content_from": "objective",
+    },
+    "ppt_impact": {
+        "prompt_name": "ppt_impact",
+        "state_key": "ppt_impact_response",
+        "max_tokens": 300,
+        "temperature": 0.1,
+    },
+    "figure_choice": {
+        "prompt_name": "figure_choice",
+        "state_key": "figure_recommendation",
+        "max_tokens": 300,
+        "temperature": 0.2,
+    },
+}
+
+
+def section_dependencies(section_name: str) -> list:
+    """
+    List the sections whose responses are needed before the provided section can be generated.
+
+    Args:
+        section_name (str): The name of the section from `SECTIONS`.
+
+    Returns:
+        list: The names of the sections the provided section depends on.
+    """
+
+    spec = SECTIONS[section_name]
+
+    return [
+        spec[key] for key in ("content_from", "additional_content_from") if spec.get(key) is not None
+    ]
+
+
+def resolve_sections(sections=None, results=None) -> list:
+    """
+    Expand the requested sections with any dependencies that have not already been generated.
+
+    Args:
+        sections (list, optional): The names of the sections to generate. Defaults to all of `SECTIONS`.
+        results (dict, optional): Responses that already exist keyed by section name. Defaults to None.
+
+    Returns:
+        list: The section names to generate, in `SECTIONS` order.
+
+    Raises:
+        KeyError: If a requested section is not in `SECTIONS`.
+    """
+
+    results = results or {}
+    requested = list(SECTIONS) if sections is None else list(sections)
+
+    selected = set()
+    while requested:
+        section_name = requested.pop()
+
+        if section_name not in SECTIONS:
+            raise KeyError(f"Unknown section name:  '{section_name}'")
+
+        if section_name in selected:
+            continue
+
+        selected.add(section_name)
+
+        for dependency in section_dependencies(section_name):
+            if results.get(dependency) is None:
+                requested.append(dependency)
+
+    return [section_name for section_name in SECTIONS if section_name in selected]
+
+
+async def agenerate_prompt_content(
+    client,
+    system_scope,
+    prompt,
+    max_tokens=50,
+    temperature=0.0,
+    max_allowable_tokens=None,
+    model="gpt-4o",
+    cache=None,
+    prefix=None,
+    response_format=None,
+    prompt_name=None,
+    fallback_max_tokens=None
+):
+    """
+    Asynchronously generate content using the OpenAI API based on the provided prompt and parameters.
+
+    Args:
+        client (AsyncOpenAI): The asynchronous OpenAI client instance.
+        system_scope (str): The system scope or context for the prompt.
+        prompt (str): The user prompt to generate content from.
+        max_tokens (int, optional): The maximum number of tokens to generate. Defaults to 50.
+        temperature (float, optional): The sampling temperature. Defaults to 0.0.
+        max_allowable_tokens (int, optional): The maximum allowable tokens for the prompt and response.
+                                              Defaults to the context window of `model`.
+        model (str, optional): The model to use for content generation. Defaults to "gpt-4o".
+        cache (ResponseCache or bool, optional): The response cache to use.  See `generate_prompt_content`.
+                                                 Defaults to None.
+        prefix (str, optional): A user message sent before `prompt`.  See `generate_prompt_content`.
+                                Defaults to None.
+        response_format (dict, optional): The `response_format` of the request, e.g., a JSON schema.
+                                          Defaults to None.
+        prompt_name (str, optional): The name the call is recorded under in the metrics.  Defaults to None.
+        fallback_max_tokens (int, optional): A larger limit to request the response again with when it is cut
+                                             off at `max_tokens`.  See `generate_prompt_content`.
+                                             Defaults to None.
+
+    Returns:
+        str: The generated content.
+
+    Raises:
+        RuntimeError: If the total number of tokens in the prompt and response exceeds max_allowable_tokens.
+    """
+
+    full_prompt = prompt if prefix is None else f"{prefix}\n{prompt}"
+    check_prompt_tokens(full_prompt, max_tokens, max_allowable_tokens, model=model)
+
+    timer = CallTimer(prompt_name, model)
+    response_cache = resolve_cache(cache, temperature)
+
+    if response_cache is not None:
+        key_prompt = prompt if prefix is None else [prefix, prompt]
+        if response_format is not None:
+            key_prompt = [key_prompt, response_format]
+        cache_key = make_cache_key(system_scope, key_prompt, model, max_tokens, temperature)
+        cached_content = response_cache.get(cache_key)
+        if cached_content is not None:
+            timer.finish(response_cache_hit=True)
+            return cached_content
+
+    messages = build_messages(system_scope, prompt, prefix=prefix)
+
+    options = {} if response_format is None else {"response_format": response_format}
+
+    with timer.request():
+        response = await client.chat.completions.create(
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            messages=messages,
+            **options
+        )
+
+    timer.finish(response)
+
+    content = response.choices[0].message.content
+
+    if fallback_max_tokens is not None and fallback_max_tokens > max_tokens and hit_token_limit(response.choices[0]):
+        content = await agenerate_prompt_content(
+            client,
+            system_scope,
+            prompt,
+            max_tokens=fallback_max_tokens,
+            temperature=temperature,
+            max_allowable_tokens=max_allowable_tokens,
+            model=model,
+            cache=cache,
+            prefix=prefix,
+            response_format=response_format,
+            prompt_name=prompt_name
+        )
+
+    if response_cache is not None:
+        response_cache.set(cache_key, content, model=model)
+
+    return content
+
+
+async def agenerate_section(
+    client,
+    content: str,
+    section_name: str,
+    additional_content: str = None,
+    temperature: float = None,
+    max_allowable_tokens: int = None,
+    model: str = "gpt-4o",
+    cache=None,
+    rewrite_model: str = None,
+    prompt_layout: str = "inline"
+) -> str:
+    """
+    Asynchronously generate a single section, including the word count reduction follow-up when needed.
+
+    Args:
+        client (AsyncOpenAI): The asynchronous OpenAI client instance.
+        content (str): The text content to be used for generating the prompt.
+        section_name (str): The name of the section from `SECTIONS`.
+        additional_content (str, optional): Additional content to include in the prompt. Defaults to None.
+        temperature (float, optional): The sampling temperature. Defaults to the section default.
+        max_allowable_tokens (int, optional): The maximum allowable tokens for the content.
+                                              Defaults to the context window of `model`.
+        model (str, optional): The model to use for content generation. Defaults to "gpt-4o".
+        cache (ResponseCache or bool, optional): The response cache to use.  See `generate_prompt_content`.
+                                                 Defaults to None.
+        rewrite_model (str, optional): The model used to rewrite a response that is too long to trim locally.
+                                       Defaults to `model`.
+        prompt_layout (str, optional): How the request is assembled.  See `build_prompt_parts`.
+                                       Defaults to "inline".
+
+    Returns:
+        str: The generated content.
+    """
+
+    spec = SECTIONS[section_name]
+
+    if temperature is None:
+        temperature = spec["temperature"]
+
+    max_word_count = spec.get("max_word_count", 100)
+    min_word_count = spec.get("min_word_count", 75)
+
+    max_tokens = spec["max_tokens"]
+    fallback_max_tokens = None
+    if spec.get("word_budget", False):
+        fallback_max_tokens = max_tokens
+        max_tokens = min(max_tokens, word_budget_tokens(max_word_count, tokens_per_word(content, model=model)))
+
+    prefix, prompt = build_prompt_parts(
+        content,
+        prompt_name=spec["prompt_name"],
+        additional_content=additional_content,
+        prompt_layout=prompt_layout
+    )
+
+    response = await agenerate_prompt_content(
+        client,
+        system_scope=prompts.SYSTEM_SCOPE,
+        prompt=prompt,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        max_allowable_tokens=max_allowable_tokens,
+        model=model,
+        cache=cache,
+        prefix=prefix,
+        prompt_name=spec["prompt_name"],
+        fallback_max_tokens=fallback_max_tokens
+    )
+
+    if len(response.split()) > max_word_count:
+        trimmed = trim_to_word_count(response, max_word_count, min_word_count)
+
+        if trimmed is not None:
+            response = trimmed
+        else:
+            response = await agenerate_prompt_content(
+                client,
+                system_scope=prompts.prompt_queue["system"],
+                prompt=prompts.prompt_queue["reduce_wordcount"].format(min_word_count, max_word_count, response),
+                max_tokens=max_tokens,
+                temperature=temperature,
+                max_allowable_tokens=max_allowable_tokens,
+                model=rewrite_model or model,
+                cache=cache,
+                prompt_name="reduce_wordcount"
+            )
+
+    if spec.get("strip_quotes", False):
+        response = response.replace('"', "")
+
+    return response
+
+
+# sections that can be requested together in one structured request; the others build on another response
+STRUCTURED_SECTIONS = ("title", "science", "impact", "summary", "citation", "funding", "objective", "ppt_impact")
+
+
+def build_structured_request(content: str, sections=STRUCTURED_SECTIONS, json_schema: bool = True) -> tuple:
+    """
+    Assemble a single request for several sections that answers with a JSON object.
+
+    The document is sent once in the shared prefix layout (see `build_prompt_parts`) followed by the instructions
+    of every requested section.
+
+    Args:
+        content (str): The document text content.
+        sections (iterable, optional): Section names from `STRUCTURED_SECTIONS`. Defaults to all of them.
+        json_schema (bool, optional): Constrain the response with a JSON schema.  Otherwise only a JSON object
+                                      is requested, for models without structured outputs. Defaults to True.
+
+    Returns:
+        tuple: The prefix message, the prompt, and the `response_format` of the request.
+
+    Raises:
+        KeyError: If a section cannot be requested in a structured request.
+    """
+
+    sections = list(sections)
+
+    for section_name in sections:
+        if section_name not in STRUCTURED_SECTIONS:
+            raise KeyError(f"Section '{section_name}' cannot be generated in a structured request")
+
+    instructions = []
+    for section_name in sections:
+        _, section_prompt = build_prompt_parts(
+            content,
+            prompt_name=SECTIONS[section_name]["prompt_name"],
+            prompt_layout="shared_prefix"
+        )
+        instructions.append(f"### {section_name}\n{section_prompt.strip()}")
+
+    prompt = prompts.STRUCTURED_PROMPT.format(", ".join(sections), "\n\n".join(instructions))
+
+    if json_schema:
+        response_format = {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "highlight_sections",
+                "strict": True,
+                "schema": {
+                    "type": "object",
+                    "properties": {section_name: {"type": "string"} for section_name in sections},
+                    "required": sections,
+                    "additionalProperties": False,
+                },
+            },
+        }
+    else:
+        response_format = {"type": "json_object"}
+
+    return prompts.DOCUMENT_PREFIX.format(content), prompt, response_format
+
+
+def parse_structured_response(response: str, sections=STRUCTURED_SECTIONS) -> tuple:
+    """
+    Validate the sections of a structured response.
+
+    A section is valid when it is a non-empty string within its maximum word count, or can be trimmed to it
+    locally (see `trim_to_word_count`).  Quotes are stripped from the sections that strip them when generated
+    on their own.
+
+    Args:
+        response (str): The JSON response.
+        sections (iterable, optional): The section names that were requested. Defaults to `STRUCTURED_SECTIONS`.
+
+    Returns:
+        tuple: The valid responses keyed by section name and a list of the section names that failed.
+    """
+
+    try:
+        data = json.loads(response)
+    except (TypeError, ValueError):
+        data = None
+
+    if not isinstance(data, dict):
+        return {}, list(sections)
+
+    results = {}
+    failed = []
+
+    for section_name in sections:
+        spec = SECTIONS[section_name]
+        value = data.get(section_name)
+
+        if isinstance(value, str) and value.strip():
+            value = trim_to_word_count(
+                value.strip(),
+                spec.get("max_word_count", 100),
+                spec.get("min_word_count", 75)
+            )
+
+        if not isinstance(value, str) or not value:
+            failed.append(section_name)
+            continue
+
+        if spec.get("strip_quotes", False):
+            value = value.replace('"', "")
+
+        results[section_name] = value
+
+    return results, failed
+
+
+async def agenerate_structured(
+    client,
+    content: str,
+    sections=STRUCTURED_SECTIONS,
+    temperature: float = None,
+    max_allowable_tokens: int = None,
+    model: str = "gpt-4o",
+    cache=None
+) -> tuple:
+    """
+    Asynchronously generate several sections in a single structured request.
+
+    Args:
+        client (AsyncOpenAI): The asynchronous OpenAI client instance.
+        content (str): The document text content.
+        sections (iterable, optional): Section names from `STRUCTURED_SECTIONS`. Defaults to all of them.
+        temperature (float, optional): The sampling temperature of the request.  Defaults to the lowest default
+                                       temperature of the sections, so sections tuned to a higher temperature
+                                       lose it; `agenerate_all` requests each temperature separately.
+        max_allowable_tokens (int, optional): The maximum allowable tokens for the content.
+                                              Defaults to the context window of `model`.
+        model (str, optional): The model to use for content generation. Defaults to "gpt-4o".
+        cache (ResponseCache or bool, optional): The response cache to use.  See `generate_prompt_content`.
+                                                 Defaults to None.
+
+    Returns:
+        tuple: The valid responses keyed by section name and a list of the section names that failed
+               validation, see `parse_structured_response`.
+    """
+
+    sections = list(sections)
+
+    if temperature is None:
+        temperature = min(SECTIONS[section_name]["temperature"] for section_name in sections)
+
+    try:
+        json_schema = get_model_info(model).json_schema
+    except KeyError:
+        json_schema = False
+
+    prefix, prompt, response_format = build_structured_request(content, sections, json_schema=json_schema)
+
+    response = await agenerate_prompt_content(
+        client,
+        system_scope=prompts.SYSTEM_SCOPE,
+        prompt=prompt,
+        max_tokens=sum(SECTIONS[section_name]["max_tokens"] for section_name in sections),
+        temperature=temperature,
+        max_allowable_tokens=max_allowable_tokens,
+        model=model,
+        cache=cache,
+        prefix=prefix,
+        response_format=response_format,
+        prompt_name="structured"
+    )
+
+    return parse_structured_response(response, sections)
+
+
+async def agenerate_all(
+    client,
+    content: str,
+    sections=None,
+    results=None,
+    temperatures=None,
+    max_concurrency: int = 4,
+    max_allowable_tokens: int = None,
+    model: str = "gpt-4o",
+    on_complete=None,
+    cache=None,
+    rewrite_model: str = None,
+    router=None,
+    prompt_layout: str = "inline",
+    structured: bool = False
+) -> dict:
+    """
+    Asynchronously generate highlight sections, running independent sections concurrently.
+
+    Each section waits only on the sections it depends on (e.g., the subtitle waits on the title) so the total
+    wall-clock time is bound by the longest dependency chain rather than the sum of all requests.
+
+    Args:
+        client (AsyncOpenAI): The asynchronous OpenAI client instance.
+        content (str): The document text content.
+        sections (list, optional): The names of the sections to generate. Defaults to all of `SECTIONS`.
+        results (dict, optional): Responses that already exist keyed by section name.  These are used to
+                                  satisfy dependencies and are not regenerated. Defaults to None.
+        temperatures (dict, optional): Sampling temperature overrides keyed by section name. Defaults to None.
+        max_concurrency (int, optional): The maximum number of requests in flight at once. Defaults to 4.
+        max_allowable_tokens (int, optional): The maximum allowable tokens for the content.
+                                              Defaults to the context window of `model`.
+        model (str, optional): The model to use for content generation. Defaults to "gpt-4o".
+        on_complete (callable, optional): Called as `on_complete(section_name, response, elapsed_seconds)` as
+                                          each section finishes. Defaults to None.
+        cache (ResponseCache or bool, optional): The response cache to use.  See `generate_prompt_content`.
+                                                 Defaults to None.
+        rewrite_model (str, optional): The model used to rewrite responses that are too long to trim locally.
+                                       Defaults to `model`.
+        router (ModelRouter, optional): Chooses the model of each section from its prompt name and the size of
+                                        its content instead of using `model`.  Each section is then limited by
+                                        its model's context window rather than `max_allowable_tokens`.
+                                        Defaults to None.
+        prompt_layout (str, optional): How each request is assembled.  "shared_prefix" sends the document
+                                       ahead of the section instructions so that the provider's prompt cache can
+                                       reuse it across sections.  Sections with `content_from` are always inline.
+                                       See `build_prompt_parts`. Defaults to "inline".
+        structured (bool, optional): Request the `STRUCTURED_SECTIONS` that share a sampling temperature together
+                                     in one request that answers with JSON (see `agenerate_structured`).
+                                     Sections missing from or invalid in that response, or all of them if the
+                                     request fails, are generated on their own, as are the other sections, which
+                                     do not wait for the structured requests unless they depend on one of their
+                                     sections. Defaults to False.
+
+    Returns:
+        dict: The generated responses keyed by section name, in `SECTIONS` order.
+    """
+
+    results = dict(results or {})
+    temperatures = temperatures or {}
+    section_names = resolve_sections(sections, results)
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    tasks = {}
+
+    n_content_tokens = get_token_count(content) if router is not None else None
+
+    # one structured request per sampling temperature, so every section keeps its own; a section alone at its
+    # temperature is requested on its own
+    structured_groups = {}
+    for section_name in section_names:
+        if structured and section_name in STRUCTURED_SECTIONS:
+            temperature = temperatures.get(section_name)
+            if temperature is None:
+                temperature = SECTIONS[section_name]["temperature"]
+            structured_groups.setdefault(temperature, []).append(section_name)
+
+    structured_groups = {
+        temperature: names for temperature, names in structured_groups.items() if len(names) > 1
+    }
+    structured_tasks = {}
+
+    async def run_structured(names, temperature):
+        structured_model = model
+        structured_max_allowable_tokens = max_allowable_tokens
+
+        if router is not None:
+            max_tokens = sum(SECTIONS[name]["max_tokens"] for name in names)
+            structured_model = router.route("structured", n_content_tokens, max_tokens)
+            structured_max_allowable_tokens = None
+
+        async with semaphore:
+            start_time = time.perf_counter()
+            try:
+                structured_results, _ = await agenerate_structured(
+                    client,
+                    content,
+                    sections=names,
+                    temperature=temperature,
+                    max_allowable_tokens=structured_max_allowable_tokens,
+                    model=structured_model,
+                    cache=cache
+                )
+            except Exception:
+                # a failed structured request, e.g., a prompt too long for the model or an API error that
+                # outlasted the retries, leaves every section of the group to be generated on its own
+                structured_results = {}
+
+        if on_complete is not None:
+            elapsed = time.perf_counter() - start_time
+            for section_name, response in structured_results.items():
+                on_complete(section_name, response, elapsed)
+
+        return structured_results
+
+    async def run_structured_section(section_name):
+        structured_results = await structured_tasks[section_name]
+
+        if section_name in structured_results:
+            return structured_results[section_name]
+
+        # sections missing from or invalid in the structured response are generated on their own
+        return await run_section(section_name)
+
+    async def run_section(section_name):
+        spec = SECTIONS[section_name]
+
+        # wait on upstream sections outside of the semaphore so waiting does not hold a slot
+        dependency_responses = {}
+        for dependency in section_dependencies(section_name):
+            if dependency in tasks:
+                dependency_responses[dependency] = await tasks[dependency]
+            else:
+                dependency_responses[dependency] = results[dependency]
+
+        section_content = dependency_responses.get(spec.get("content_from"), content)
+        additional_content = dependency_responses.get(spec.get("additional_content_from"))
+
+        section_model = model
+        section_max_allowable_tokens = max_allowable_tokens
+        section_rewrite_model = rewrite_model
+
+        if router is not None:
+            n_tokens = n_content_tokens if section_content is content else get_token_count(section_content)
+
+            section_model = router.route(spec["prompt_name"], n_tokens, spec["max_tokens"])
+            section_max_allowable_tokens = None
+            section_rewrite_model = rewrite_model or router.route("reduce_wordcount", 0, spec["max_tokens"])
+
+        async with semaphore:
+            start_time = time.perf_counter()
+            response = await agenerate_section(
+                client,
+                content=section_content,
+                section_name=section_name,
+                additional_content=additional_content,
+                temperature=temperatures.get(section_name),
+                max_allowable_tokens=section_max_allowable_tokens,
+                model=section_model,
+                cache=cache,
+                rewrite_model=section_rewrite_model,
+                # sections generated from another section's response do not share the document prefix
+                prompt_layout=prompt_layout if spec.get("content_from") is None else "inline"
+            )
+
+        if on_complete is not None:
+            on_complete(section_name, response, time.perf_counter() - start_time)
+
+        return response
+
+    for temperature, names in structured_groups.items():
+        structured_task = asyncio.ensure_future(run_structured(names, temperature))
+        structured_tasks.update((name, structured_task) for name in names)
+
+    for section_name in section_names:
+        if section_name in structured_tasks:
+            tasks[section_name] = asyncio.ensure_future(run_structured_section(section_name))
+        else:
+            tasks[section_name] = asyncio.ensure_future(run_section(section_name))
+
+    try:
+        responses = await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in list(tasks.values()) + list(structured_tasks.values()):
+            task.cancel()
+        raise
+
+    generated = dict(zip(tasks, responses))
+
+    return {section_name: generated[section_name] for section_name in SECTIONS if section_name in generated}
+
+
+def generate_all(client, content: str, **kwargs) -> dict:
+    """
+    Generate highlight sections concurrently from synchronous code.
+
+    Args:
+        client (AsyncOpenAI): The asynchronous OpenAI client instance.
+        content (str): The document text content.
+        **kwargs: Additional keyword arguments passed to `agenerate_all`.
+
+    Returns:
+        dict: The generated responses keyed by section name.
+    """
+
+    return asyncio.run(agenerate_all(client, content, **kwargs))
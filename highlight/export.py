@@ -0,0 +1,564 @@
+import copy
+import hashlib
+import importlib.resources
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from docxtpl import DocxTemplate
+from pptx import Presentation
+from pptx.enum.text import PP_ALIGN
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.util import Pt
+
+from highlight.profiling import profile_phase
+
+
+# mime types used when exporting documents
+DOCX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+PPTX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+
+# namespace of relationship id attributes, e.g. r:embed on pictures
+_RELATIONSHIP_NAMESPACE = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+# text box placeholders in the PowerPoint template and how each is filled
+PPTX_PLACEHOLDERS = {
+    "title": "heading",
+    "citation": "citation",
+    "objective_0": "paragraph",
+    "approach_0": "bullets",
+    "impact_0": "bullets",
+}
+
+
+def template_file(file_name: str):
+    """
+    Return the path to a template packaged in `highlight.data`.
+
+    Args:
+        file_name (str): The template file name, e.g., "highlight_template.docx".
+
+    Returns:
+        Traversable: The path to the packaged template.
+    """
+
+    return importlib.resources.files("highlight.data").joinpath(file_name)
+
+
+def build_shape_index(prs) -> dict:
+    """
+    Locate the placeholder text boxes of a PowerPoint template.
+
+    Args:
+        prs (pptx.presentation.Presentation): The template presentation.
+
+    Returns:
+        dict: The (slide index, shape index) position of each placeholder in `PPTX_PLACEHOLDERS` keyed by
+              placeholder name.
+    """
+
+    index = {}
+
+    for slide_index, slide in enumerate(prs.slides):
+        for shape_index, shape in enumerate(slide.shapes):
+            if shape.has_text_frame:
+                text = shape.text_frame.text.strip()
+
+                if text in PPTX_PLACEHOLDERS and text not in index:
+                    index[text] = (slide_index, shape_index)
+
+    return index
+
+
+def _fill_shape(shape, style, value):
+    """Write a value into a placeholder text box using the formatting for its style."""
+
+    text_frame = shape.text_frame
+
+    if style == "bullets":
+        text_frame.clear()
+
+        # Split the response into bullet points and only take the first 3 points
+        for point in (value or "").split("\n")[:3]:
+            p = text_frame.add_paragraph()
+            p.text = point
+            p.level = 0
+            p.font.size = Pt(13)
+            p.alignment = PP_ALIGN.LEFT
+
+    elif style == "paragraph":
+        text_frame.text = value or ""
+
+        for paragraph in text_frame.paragraphs:
+            paragraph.font.size = Pt(13)
+            paragraph.alignment = PP_ALIGN.LEFT
+
+    else:
+        text_frame.text = value or ""
+
+        # maintain font size and bold for the title and citation
+        for paragraph in text_frame.paragraphs:
+            for run in paragraph.runs:
+                run.font.size = Pt(24) if style == "heading" else Pt(11)
+                run.font.bold = style == "heading"
+                run.alignment = PP_ALIGN.LEFT
+
+
+def fill_slide(slide, shape_index: dict, fields: dict, slide_index: int = 0):
+    """
+    Fill the placeholders of one slide from a precomputed shape index.
+
+    Args:
+        slide (pptx.slide.Slide): The slide to fill.
+        shape_index (dict): Placeholder positions from `build_shape_index`.
+        fields (dict): Values keyed by placeholder name (see `PPTX_PLACEHOLDERS`).  Missing fields are left as is.
+        slide_index (int, optional): The index of the template slide `slide` was made from. Defaults to 0.
+    """
+
+    shapes = None
+
+    for name, value in fields.items():
+        position = shape_index.get(name)
+
+        if position is None or position[0] != slide_index:
+            continue
+
+        if shapes is None:
+            shapes = list(slide.shapes)
+
+        _fill_shape(shapes[position[1]], PPTX_PLACEHOLDERS[name], value)
+
+
+def pptx_fields(title: str, citation: str, objective: str, approach: str, ppt_impact: str) -> dict:
+    """
+    Map generated responses to the PowerPoint template placeholders.
+
+    Args:
+        title (str): The title response.
+        citation (str): The citation response.
+        objective (str): The objective response.
+        approach (str): The approach response.
+        ppt_impact (str): The impact points response.
+
+    Returns:
+        dict: Values keyed by placeholder name.
+    """
+
+    return {
+        "title": title,
+        "citation": citation,
+        "objective_0": objective,
+        "approach_0": approach,
+        "impact_0": ppt_impact,
+    }
+
+
+class TemplateManager:
+    """
+    Parse each template once and hand out independent copies for rendering.
+
+    The template bytes and the pristine parsed template are kept in memory.  Word renders work on a deep copy of
+    the parsed document and PowerPoint copies are opened from the in-memory bytes, which avoids reading the
+    template file each time.  Rendered Word documents are also memoized on their
+    parameters so that rendering with unchanged parameters returns the previous result.
+
+    Args:
+        max_renders (int, optional): The maximum number of rendered Word documents kept. Defaults to 16.
+    """
+
+    def __init__(self, max_renders=16):
+
+        self.max_renders = max_renders
+        self._templates = {}
+        self._renders = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _pristine(self, kind, template):
+        key = (kind, str(template))
+
+        with self._lock:
+            pristine = self._templates.get(key)
+
+            if pristine is None:
+                with open(template, "rb") as template_file_object:
+                    template_bytes = template_file_object.read()
+
+                if kind == "docx":
+                    parsed = DocxTemplate(io.BytesIO(template_bytes))
+                    parsed.init_docx()
+                    parsed = parsed.docx
+                else:
+                    parsed = Presentation(io.BytesIO(template_bytes))
+
+                pristine = (template_bytes, parsed, build_shape_index(parsed) if kind == "pptx" else None)
+                self._templates[key] = pristine
+
+        return pristine
+
+    def docx_template(self, template=None) -> DocxTemplate:
+        """
+        Return a fresh copy of a Word template ready to render.
+
+        Args:
+            template (str, optional): Path to a Word template. Defaults to the packaged highlight template.
+
+        Returns:
+            DocxTemplate: A template that can be rendered without affecting the pristine copy.
+        """
+
+        if template is None:
+            template = template_file("highlight_template.docx")
+
+        template_bytes, document, _ = self._pristine("docx", template)
+
+        clone = DocxTemplate(io.BytesIO(template_bytes))
+        clone.docx = copy.deepcopy(document)
+
+        return clone
+
+    def presentation(self, template=None) -> Presentation:
+        """
+        Return a fresh copy of a PowerPoint template.
+
+        Args:
+            template (str, optional): Path to a PowerPoint template. Defaults to the packaged highlight template.
+
+        Returns:
+            pptx.presentation.Presentation: A presentation that can be modified without affecting the pristine copy.
+        """
+
+        if template is None:
+            template = template_file("highlight_template.pptx")
+
+        # a deep copy of a presentation whose slides have been accessed saves the original slide XML, so copies
+        # are opened from the in-memory template bytes instead
+        return Presentation(io.BytesIO(self._pristine("pptx", template)[0]))
+
+    def shape_index(self, template=None) -> dict:
+        """
+        Return the placeholder positions of a PowerPoint template, computed once when the template is parsed.
+
+        Args:
+            template (str, optional): Path to a PowerPoint template. Defaults to the packaged highlight template.
+
+        Returns:
+            dict: Placeholder positions from `build_shape_index`.
+        """
+
+        if template is None:
+            template = template_file("highlight_template.pptx")
+
+        return self._pristine("pptx", template)[2]
+
+    def render_docx(self, word_parameters: dict, template=None) -> bytes:
+        """
+        Render a Word template, reusing the previous result when the parameters have not changed.
+
+        Args:
+            word_parameters (dict): The template parameters, see `build_word_parameters`.
+            template (str, optional): Path to a Word template. Defaults to the packaged highlight template.
+
+        Returns:
+            bytes: The rendered .docx file.
+        """
+
+        payload = json.dumps([str(template), word_parameters], sort_keys=True, default=str)
+        key = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+        with self._lock:
+            rendered = self._renders.get(key)
+            if rendered is not None:
+                self._renders.move_to_end(key)
+                return rendered
+
+        document = self.docx_template(template)
+        document.render(word_parameters)
+
+        bio = io.BytesIO()
+        document.save(bio)
+        rendered = bio.getvalue()
+
+        with self._lock:
+            self._renders[key] = rendered
+            while len(self._renders) > self.max_renders:
+                self._renders.popitem(last=False)
+
+        return rendered
+
+
+_TEMPLATE_MANAGER = None
+_TEMPLATE_MANAGER_LOCK = threading.Lock()
+
+
+def get_template_manager() -> TemplateManager:
+    """
+    Return the process-wide template manager, creating it on first use.
+
+    Returns:
+        TemplateManager: The shared template manager.
+    """
+
+    global _TEMPLATE_MANAGER
+
+    with _TEMPLATE_MANAGER_LOCK:
+        if _TEMPLATE_MANAGER is None:
+            _TEMPLATE_MANAGER = TemplateManager()
+
+    return _TEMPLATE_MANAGER
+
+
+# relationships a cloned slide gets from `add_slide` rather than from the template slide
+_SLIDE_OWN_RELTYPES = (RT.SLIDE_LAYOUT, RT.NOTES_SLIDE)
+
+
+def _clone_slide(prs, template_slide, shape_elements):
+    """Append a slide with the layout of `template_slide` holding copies of `shape_elements`."""
+
+    slide = prs.slides.add_slide(template_slide.slide_layout)
+    tree = slide.shapes._spTree
+
+    # drop the layout placeholders so shape positions match the template slide
+    for shape in list(slide.shapes):
+        tree.remove(shape._element)
+
+    # images and links on the template slide are shared by relating the new slide to the same parts
+    rid_map = {}
+    for rid, rel in template_slide.part.rels.items():
+        if rel.reltype in _SLIDE_OWN_RELTYPES:
+            continue
+        if rel.is_external:
+            rid_map[rid] = slide.part.relate_to(rel.target_ref, rel.reltype, is_external=True)
+        else:
+            rid_map[rid] = slide.part.relate_to(rel.target_part, rel.reltype)
+
+    for element in shape_elements:
+        element = copy.deepcopy(element)
+
+        if rid_map:
+            for node in element.iter():
+                for attribute, value in node.attrib.items():
+                    if attribute.startswith(_RELATIONSHIP_NAMESPACE) and value in rid_map:
+                        node.set(attribute, rid_map[value])
+
+        tree.append(element)
+
+    return slide
+
+
+def deck_file_path(output, number: int) -> str:
+    """
+    Return the path of one file of a deck split by `build_deck`.
+
+    Args:
+        output (str): The path passed to `build_deck`.
+        number (int): The file number, starting at 1.
+
+    Returns:
+        str: The path with the zero-padded file number added before the extension.
+    """
+
+    stem, extension = os.path.splitext(os.fspath(output))
+
+    return f"{stem}-{number:03d}{extension or '.pptx'}"
+
+
+def _save_deck(prs, n_slides: int, output):
+    # remove the template slides so the deck only holds the generated slides
+    slide_ids = prs.slides._sldIdLst
+    for slide_id in list(slide_ids)[:len(slide_ids) - n_slides]:
+        prs.part.drop_rel(slide_id.rId)
+        slide_ids.remove(slide_id)
+
+    prs.save(output)
+
+
+def build_deck(
+    records,
+    output,
+    template=None,
+    template_slide: int = 0,
+    progress_callback=None,
+    slides_per_file: int = None
+) -> int:
+    """
+    Build a PowerPoint deck with one highlight slide per record.
+
+    The template slide is cloned for each record and filled with the same fields as `render_pptx`.  Records are
+    consumed one at a time, so a generator can be passed to avoid holding every record in memory.  The slides of
+    a deck, however, stay in memory until the deck is saved, so memory grows with the number of slides in one
+    file.  Set `slides_per_file` to bound it:  the deck is then split into numbered files, e.g.,
+    `highlights-001.pptx`, each saved and released once it is full.
+
+    Args:
+        records (iterable): Generated responses keyed by section name (see `highlight.engine.SECTIONS`).  Only
+                            "title", "citation", "objective", "approach", and "ppt_impact" are used.
+        output (str or file object): The path or binary file object the deck is saved to.  A path is required
+                                     with `slides_per_file`; the file number is added before its extension.
+        template (str, optional): Path to a PowerPoint template. Defaults to the packaged highlight template.
+        template_slide (int, optional): The index of the template slide to clone. Defaults to 0.
+        progress_callback (callable, optional): Called with the number of slides built after each slide.
+                                                Defaults to None.
+        slides_per_file (int, optional): The most slides saved in one file.  None saves every slide in a single
+                                         deck. Defaults to None.
+
+    Returns:
+        int: The number of slides built.
+
+    Raises:
+        ValueError: If `slides_per_file` is given with a file object or is less than one.
+    """
+
+    if slides_per_file is not None:
+        if slides_per_file < 1:
+            raise ValueError("slides_per_file must be at least 1")
+
+        if not isinstance(output, (str, os.PathLike)):
+            raise ValueError("slides_per_file needs an output path to number the files")
+
+    manager = get_template_manager()
+    shape_index = manager.shape_index(template)
+
+    prs = None
+    n_slides = 0
+    n_deck_slides = 0
+    n_files = 0
+
+    for record in records:
+        if prs is None:
+            prs = manager.presentation(template)
+            source = prs.slides[template_slide]
+            shape_elements = [shape._element for shape in source.shapes]
+            n_deck_slides = 0
+
+        slide = _clone_slide(prs, source, shape_elements)
+
+        fields = pptx_fields(
+            title=record.get("title"),
+            citation=record.get("citation"),
+            objective=record.get("objective"),
+            approach=record.get("approach"),
+            ppt_impact=record.get("ppt_impact")
+        )
+        fill_slide(slide, shape_index, fields, slide_index=template_slide)
+
+        n_slides += 1
+        n_deck_slides += 1
+        if progress_callback is not None:
+            progress_callback(n_slides)
+
+        if slides_per_file is not None and n_deck_slides == slides_per_file:
+            n_files += 1
+            _save_deck(prs, n_deck_slides, deck_file_path(output, n_files))
+            prs = None
+
+    # the last, partly filled deck; an empty deck is still written when there are no records
+    if prs is not None or n_files == 0:
+        if prs is None:
+            prs = manager.presentation(template)
+            n_deck_slides = 0
+
+        _save_deck(prs, n_deck_slides, output if slides_per_file is None else deck_file_path(output, n_files + 1))
+
+    return n_slides
+
+
+def build_word_parameters(
+    sections: dict,
+    point_of_contact: str = None,
+    photo: str = None,
+    photo_link: str = None,
+    photo_site_name: str = None,
+    related_links: str = None
+) -> dict:
+    """
+    Map generated section responses to the variables used in the Word template.
+
+    Args:
+        sections (dict): Generated responses keyed by section name (see `highlight.engine.SECTIONS`).
+        point_of_contact (str, optional): The point of contact block. Defaults to None.
+        photo (str, optional): The photo to reference. Defaults to None.
+        photo_link (str, optional): The link to the photo. Defaults to None.
+        photo_site_name (str, optional): The name of the site hosting the photo. Defaults to None.
+        related_links (str, optional): Related links for the publication. Defaults to None.
+
+    Returns:
+        dict: The Word template parameters.
+    """
+
+    return {
+        'title': sections.get("title"),
+        'subtitle': sections.get("subtitle"),
+        'photo': photo,
+        'photo_link': photo_link,
+        'photo_site_name': photo_site_name,
+        'image_caption': sections.get("figure_caption"),
+        'science': sections.get("science"),
+        'impact': sections.get("impact"),
+        'summary': sections.get("summary"),
+        'funding': sections.get("funding"),
+        'citation': sections.get("citation"),
+        'related_links': related_links,
+        'point_of_contact': point_of_contact,
+    }
+
+
+def render_docx(word_parameters: dict, template=None) -> bytes:
+    """
+    Render the Word highlight template using the shared `TemplateManager`, so unchanged parameters are not
+    rendered again.
+
+    Args:
+        word_parameters (dict): The template parameters, see `build_word_parameters`.
+        template (str, optional): Path to a Word template. Defaults to the packaged highlight template.
+
+    Returns:
+        bytes: The rendered .docx file.
+    """
+
+    with profile_phase("docx render"):
+        return get_template_manager().render_docx(word_parameters, template=template)
+
+
+def render_pptx(
+    title: str,
+    citation: str,
+    objective: str,
+    approach: str,
+    ppt_impact: str,
+    template=None
+) -> bytes:
+    """
+    Fill the PowerPoint highlight template.
+
+    Text boxes in the template are identified by their placeholder text:  "title", "citation", "objective_0",
+    "approach_0", and "impact_0".  Their positions are indexed once per template so filling a copy does not
+    scan or read every shape.  Approach and impact responses are split on new lines and the first three points
+    are written as bullets.
+
+    Args:
+        title (str): The title response.
+        citation (str): The citation response.
+        objective (str): The objective response.
+        approach (str): The approach response.
+        ppt_impact (str): The impact points response.
+        template (str, optional): Path to a PowerPoint template. Defaults to the packaged highlight template.
+
+    Returns:
+        bytes: The filled .pptx file.
+    """
+
+    with profile_phase("pptx build"):
+        manager = get_template_manager()
+        prs = manager.presentation(template)
+        shape_index = manager.shape_index(template)
+        fields = pptx_fields(title, citation, objective, approach, ppt_impact)
+
+        for slide_index, slide in enumerate(prs.slides):
+            fill_slide(slide, shape_index, fields, slide_index=slide_index)
+
+        ppt_io = io.BytesIO()
+        prs.save(ppt_io)
+
+        return ppt_io.getvalue()
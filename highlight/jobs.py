@@ -0,0 +1,848 @@
+import hashlib
+import json
+import logging
+import os
+import queue
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+from typing import NamedTuple
+
+from highlight.cache import default_cache_dir
+
+
+logger = logging.getLogger(__name__)
+
+# environment variable that turns on the shared job service in the app
+JOB_SERVICE_ENV = "HIGHLIGHT_JOB_SERVICE"
+
+# statuses a job moves through; the last three are final
+JOB_STATUSES = ("queued", "running", "done", "failed", "cancelled")
+FINAL_STATUSES = ("done", "failed", "cancelled")
+
+
+class Job(NamedTuple):
+    """
+    The state of a job.
+
+    `result` is the JSON-decoded return value of the handler once the job is done and `error` the message of the
+    exception that failed it.  `progress` runs from 0 to 1.  Times are UNIX timestamps.  `shared_id` is the id of
+    the job whose execution this job follows when an identical job was submitted first, or None when the job runs
+    itself.
+    """
+
+    id: str
+    kind: str
+    status: str
+    owner: str = None
+    tag: str = None
+    progress: float = 0.0
+    message: str = None
+    result: object = None
+    error: str = None
+    created: float = None
+    started: float = None
+    finished: float = None
+    shared_id: str = None
+
+
+_JOB_COLUMNS = "id, kind, status, owner, tag, progress, message, result, error, created, started, finished, shared_id"
+
+
+def job_dedup_key(kind: str, payload: dict) -> str:
+    """
+    Build the key that identifies identical jobs.
+
+    Args:
+        kind (str): The job kind, e.g., "section".
+        payload (dict): The JSON-serializable job arguments.
+
+    Returns:
+        str: A SHA-256 hex digest of the kind and payload.
+    """
+
+    serialized = json.dumps([kind, payload], sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+class JobStore:
+    """
+    SQLite-backed store of jobs, their arguments, and their results.
+
+    Jobs outlive the sessions that submitted them and, since the store is on disk, the server process.  Each
+    operation opens its own connection so one store can be shared across threads and processes.  A job linked to
+    another with `link` is not run; it follows the status, progress, and result of the job it shares.  Running
+    jobs record the worker that claimed them and a heartbeat, so a job is only queued again once its worker
+    has stopped beating.
+
+    Args:
+        path (str): Path to the SQLite database file.  Parent directories are created as needed.
+    """
+
+    def __init__(self, path):
+
+        self.path = path
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    owner TEXT,
+                    tag TEXT,
+                    progress REAL NOT NULL DEFAULT 0,
+                    message TEXT,
+                    result TEXT,
+                    error TEXT,
+                    created REAL NOT NULL,
+                    started REAL,
+                    finished REAL,
+                    payload TEXT NOT NULL,
+                    dedup_key TEXT NOT NULL,
+                    shared_id TEXT,
+                    worker TEXT,
+                    heartbeat REAL
+                )"""
+            )
+
+            # stores created before jobs recorded their worker
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(jobs)")}
+            for column, column_type in (("worker", "TEXT"), ("heartbeat", "REAL")):
+                if column not in columns:
+                    connection.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+
+            connection.execute("CREATE INDEX IF NOT EXISTS jobs_dedup_key ON jobs (dedup_key, status)")
+            connection.execute("CREATE INDEX IF NOT EXISTS jobs_owner ON jobs (owner, tag, created)")
+            connection.execute("CREATE INDEX IF NOT EXISTS jobs_shared_id ON jobs (shared_id)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def _job(row):
+        if row is None:
+            return None
+
+        job = Job(*row)
+
+        return job._replace(result=json.loads(job.result)) if job.result is not None else job
+
+    def create(self, kind: str, payload: dict, owner: str = None, tag: str = None) -> str:
+        """
+        Add a queued job.
+
+        Args:
+            kind (str): The job kind, e.g., "section".
+            payload (dict): The JSON-serializable job arguments.
+            owner (str, optional): Identifies who submitted the job, e.g., a browser session. Defaults to None.
+            tag (str, optional): A label for finding the job again, e.g., the session state key of its result.
+                                 Defaults to None.
+
+        Returns:
+            str: The job id.
+        """
+
+        job_id = uuid.uuid4().hex
+
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                """INSERT INTO jobs (id, kind, status, owner, tag, created, payload, dedup_key)
+                VALUES (?, ?, 'queued', ?, ?, ?, ?, ?)""",
+                (job_id, kind, owner, tag, time.time(), json.dumps(payload), job_dedup_key(kind, payload))
+            )
+
+        return job_id
+
+    def link(self, shared_id: str, owner: str = None, tag: str = None) -> str:
+        """
+        Add a job for another owner that follows the execution of an existing job instead of running again.
+
+        Args:
+            shared_id (str): The id of the job that runs.
+            owner (str, optional): Identifies who submitted the job. Defaults to None.
+            tag (str, optional): A label for finding the job again. Defaults to None.
+
+        Returns:
+            str: The id of the linked job.
+        """
+
+        job_id = uuid.uuid4().hex
+
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                """INSERT INTO jobs (id, kind, status, owner, tag, progress, message, result, error, created, started,
+                    finished, payload, dedup_key, shared_id)
+                SELECT ?, kind, status, ?, ?, progress, message, result, error, ?, started, finished, payload,
+                    dedup_key, id
+                FROM jobs WHERE id = ?""",
+                (job_id, owner, tag, time.time(), shared_id)
+            )
+
+        return job_id
+
+    def get(self, job_id: str) -> Job:
+        """
+        Look up a job.
+
+        Args:
+            job_id (str): The job id.
+
+        Returns:
+            Job: The job, or None if there is no job with this id.
+        """
+
+        with closing(self._connect()) as connection:
+            return self._job(connection.execute(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def payload(self, job_id: str) -> dict:
+        """
+        Return the arguments of a job.
+
+        Args:
+            job_id (str): The job id.
+
+        Returns:
+            dict: The payload the job was created with.
+        """
+
+        with closing(self._connect()) as connection:
+            return json.loads(connection.execute("SELECT payload FROM jobs WHERE id = ?", (job_id,)).fetchone()[0])
+
+    def find(self, kind: str, payload: dict, statuses=("queued", "running"), owner: str = None) -> Job:
+        """
+        Find the most recent job with the same kind and payload.
+
+        Args:
+            kind (str): The job kind.
+            payload (dict): The job arguments.
+            statuses (iterable, optional): The statuses to match. Defaults to queued and running jobs.
+            owner (str, optional): Only jobs of this owner, including linked jobs.  Defaults to the jobs that run
+                                   themselves, whoever submitted them.
+
+        Returns:
+            Job: The matching job, or None.
+        """
+
+        statuses = tuple(statuses)
+        placeholders = ", ".join("?" for _ in statuses)
+
+        condition, parameters = "shared_id IS NULL", ()
+        if owner is not None:
+            condition, parameters = "owner = ?", (owner,)
+
+        with closing(self._connect()) as connection:
+            return self._job(connection.execute(
+                f"""SELECT {_JOB_COLUMNS} FROM jobs WHERE dedup_key = ? AND status IN ({placeholders}) AND {condition}
+                ORDER BY created DESC LIMIT 1""",
+                (job_dedup_key(kind, payload),) + statuses + parameters
+            ).fetchone())
+
+    def list(self, owner: str = None, status: str = None) -> list:
+        """
+        List jobs, most recent first.
+
+        Args:
+            owner (str, optional): Only jobs submitted by this owner. Defaults to all owners.
+            status (str, optional): Only jobs with this status. Defaults to all statuses.
+
+        Returns:
+            list: The matching jobs.
+        """
+
+        conditions, parameters = [], []
+
+        if owner is not None:
+            conditions.append("owner = ?")
+            parameters.append(owner)
+
+        if status is not None:
+            conditions.append("status = ?")
+            parameters.append(status)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                f"SELECT {_JOB_COLUMNS} FROM jobs {where} ORDER BY created DESC",
+                parameters
+            ).fetchall()
+
+        return [self._job(row) for row in rows]
+
+    def claim(self, job_id: str, worker: str = None) -> bool:
+        """
+        Mark a queued job, and the queued jobs linked to it, as running.
+
+        Args:
+            job_id (str): The job id.
+            worker (str, optional): Identifies the worker running the job, see `heartbeat`. Defaults to None.
+
+        Returns:
+            bool: True if the job was queued and is now claimed by the caller.
+        """
+
+        started = time.time()
+
+        with closing(self._connect()) as connection, connection:
+            cursor = connection.execute(
+                """UPDATE jobs SET status = 'running', started = ?, worker = ?, heartbeat = ?
+                WHERE id = ? AND status = 'queued'""",
+                (started, worker, started, job_id)
+            )
+
+            if cursor.rowcount == 1:
+                connection.execute(
+                    "UPDATE jobs SET status = 'running', started = ? WHERE shared_id = ? AND status = 'queued'",
+                    (started, job_id)
+                )
+
+        return cursor.rowcount == 1
+
+    def update(self, job_id: str, progress: float = None, message: str = None):
+        """
+        Report the progress of a running job and the jobs linked to it.
+
+        Args:
+            job_id (str): The job id.
+            progress (float, optional): The fraction of the job completed. Defaults to None.
+            message (str, optional): A short status message. Defaults to None.
+        """
+
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                """UPDATE jobs SET progress = COALESCE(?, progress), message = COALESCE(?, message)
+                WHERE id = ? OR shared_id = ?""",
+                (progress, message, job_id, job_id)
+            )
+
+    def finish(self, job_id: str, result=None, error: str = None):
+        """
+        Record the outcome of a running job and the running jobs linked to it.
+
+        Args:
+            job_id (str): The job id.
+            result (object, optional): The JSON-serializable result. Defaults to None.
+            error (str, optional): The error message of a failed job. Defaults to None.
+        """
+
+        status = "failed" if error is not None else "done"
+
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                """UPDATE jobs SET status = ?, result = ?, error = ?, progress = 1, finished = ?
+                WHERE (id = ? OR shared_id = ?) AND status = 'running'""",
+                (status, json.dumps(result) if error is None else None, error, time.time(), job_id, job_id)
+            )
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a job that has not started.
+
+        A job that queued jobs of other owners are linked to keeps its place in the queue for them.
+
+        Args:
+            job_id (str): The job id.
+
+        Returns:
+            bool: True if the job was queued and is now cancelled.
+        """
+
+        with closing(self._connect()) as connection, connection:
+            cursor = connection.execute(
+                """UPDATE jobs SET status = 'cancelled', finished = ? WHERE id = ? AND status = 'queued'
+                AND NOT EXISTS (
+                    SELECT 1 FROM jobs AS linked WHERE linked.shared_id = ? AND linked.status = 'queued'
+                )""",
+                (time.time(), job_id, job_id)
+            )
+
+        return cursor.rowcount == 1
+
+    def heartbeat(self, job_ids):
+        """
+        Record that running jobs are still being worked on.
+
+        Args:
+            job_ids (iterable): The ids of the jobs.
+        """
+
+        job_ids = tuple(job_ids)
+        if not job_ids:
+            return
+
+        placeholders = ", ".join("?" for _ in job_ids)
+
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                f"UPDATE jobs SET heartbeat = ? WHERE id IN ({placeholders}) AND status = 'running'",
+                (time.time(),) + job_ids
+            )
+
+    def requeue_interrupted(self, stale_after: float = 60.0) -> list:
+        """
+        Queue again the running jobs whose worker stopped, e.g., with the server process that ran it.
+
+        Jobs whose heartbeat is more recent than `stale_after` seconds are left alone, since another process
+        sharing the store may still be running them.
+
+        Args:
+            stale_after (float, optional): The seconds without a heartbeat after which a running job's worker
+                                           is considered gone. Defaults to 60.
+
+        Returns:
+            list: The ids of all queued jobs that run themselves, oldest first.
+        """
+
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                """UPDATE jobs SET status = 'queued', started = NULL, worker = NULL, heartbeat = NULL
+                WHERE status = 'running' AND shared_id IS NULL AND (heartbeat IS NULL OR heartbeat < ?)""",
+                (time.time() - stale_after,)
+            )
+            connection.execute(
+                """UPDATE jobs SET status = 'queued', started = NULL
+                WHERE status = 'running' AND shared_id IN (SELECT id FROM jobs WHERE status = 'queued')"""
+            )
+            rows = connection.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' AND shared_id IS NULL ORDER BY created"
+            ).fetchall()
+
+        return [row[0] for row in rows]
+
+    def purge(self, max_age_seconds: float = 7 * 24 * 3600) -> int:
+        """
+        Remove finished jobs older than `max_age_seconds`.
+
+        Args:
+            max_age_seconds (float, optional): The age in seconds after which finished jobs are removed.
+                                               Defaults to 7 days.
+
+        Returns:
+            int: The number of jobs removed.
+        """
+
+        placeholders = ", ".join("?" for _ in FINAL_STATUSES)
+
+        with closing(self._connect()) as connection, connection:
+            cursor = connection.execute(
+                f"DELETE FROM jobs WHERE status IN ({placeholders}) AND finished < ?",
+                FINAL_STATUSES + (time.time() - max_age_seconds,)
+            )
+
+        return cursor.rowcount
+
+
+def run_section_job(client, payload: dict, progress) -> str:
+    """
+    Generate one section, see `generate_text`.
+
+    Args:
+        client (OpenAI): The OpenAI client instance.
+        payload (dict): Keyword arguments of `generate_text` other than the client.
+        progress (callable): Called as `progress(fraction, message)` to report progress.
+
+    Returns:
+        str: The generated content.
+    """
+
+    from highlight.utils import generate_text
+
+    progress(0.0, f"Generating {payload.get('prompt_name', 'section')}")
+
+    return generate_text(client, **payload)
+
+
+def run_reduction_job(client, payload: dict, progress) -> str:
+    """
+    Reduce a document to its relevant content, see `content_reduction`.
+
+    Args:
+        client (OpenAI): The OpenAI client instance.
+        payload (dict): "content", "model", "max_allowable_tokens", "max_output_tokens", and optionally
+                        "max_workers" and "cache", see `content_reduction`.
+        progress (callable): Called as `progress(fraction, message)` to report progress.
+
+    Returns:
+        str: The reduced content.
+    """
+
+    import highlight.prompts as prompts
+    from highlight.utils import chunk_text, content_reduction, reduction_chunk_tokens
+
+    chunks = chunk_text(
+        payload["content"],
+        chunk_tokens=reduction_chunk_tokens(
+            payload["max_allowable_tokens"],
+            max_output_tokens=payload["max_output_tokens"]
+        ),
+        model=payload["model"]
+    )
+
+    return content_reduction(
+        client=client,
+        document_list=chunks,
+        system_scope=prompts.prompt_queue["system"],
+        model=payload["model"],
+        max_workers=payload.get("max_workers", 4),
+        cache=payload.get("cache"),
+        progress_callback=lambda n_completed, n_total: progress(
+            n_completed / n_total,
+            f"Reduced {n_completed} of {n_total} chunks"
+        )
+    )
+
+
+# handlers of the job kinds the service runs by default
+DEFAULT_JOB_HANDLERS = {
+    "section": run_section_job,
+    "reduction": run_reduction_job,
+}
+
+
+class JobService:
+    """
+    Run jobs submitted by any session on a shared pool of worker threads.
+
+    Jobs are recorded in a `JobStore` and executed by `max_workers` threads that share one client, so the number
+    of requests in flight, the client's rate limiter, and the response cache apply to every session together.
+    Jobs keep running when the session that submitted them goes away, and their results stay in the store to be
+    picked up later by the same owner.  A job identical to one still queued or running is not run twice; the
+    submitter is given a job of its own that is linked to the existing one and shares its result.
+
+    Several processes, e.g., the processes of a Streamlit deployment, can share one store.  Each service beats
+    the heartbeat of the jobs it runs every `heartbeat_interval` seconds and runs again the jobs that have gone
+    `stale_after` seconds without one, whose process has stopped.
+
+    Args:
+        store (JobStore, optional): Where jobs are recorded. Defaults to `jobs.sqlite3` in `default_cache_dir()`.
+        client_factory (callable, optional): Called once with no arguments to create the client passed to
+                                             handlers.  Defaults to an OpenAI client wrapped in a
+                                             `RetryingClient`.
+        max_workers (int, optional): The number of jobs run at once. Defaults to 4.
+        handlers (dict, optional): Handlers keyed by job kind, each called as `handler(client, payload, progress)`
+                                   and returning a JSON-serializable result.  Defaults to `DEFAULT_JOB_HANDLERS`.
+        heartbeat_interval (float, optional): The seconds between heartbeats of the running jobs. Defaults to 10.
+        stale_after (float, optional): The seconds without a heartbeat after which a running job is run again.
+                                       Defaults to 60.
+    """
+
+    def __init__(
+        self,
+        store=None,
+        client_factory=None,
+        max_workers=4,
+        handlers=None,
+        heartbeat_interval=10.0,
+        stale_after=60.0
+    ):
+
+        self.store = store if store is not None else JobStore(os.path.join(default_cache_dir(), "jobs.sqlite3"))
+        self.max_workers = max_workers
+        self.handlers = dict(DEFAULT_JOB_HANDLERS if handlers is None else handlers)
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+
+        # recorded with the jobs this service claims, to tell the processes sharing a store apart
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._client_factory = client_factory if client_factory is not None else _default_client
+        self._client = None
+        self._queue = queue.Queue()
+        self._queued = set()
+        self._running = set()
+        self._state_lock = threading.Lock()
+        self._workers = []
+        self._monitor = None
+        self._stopping = threading.Event()
+        self._submit_lock = threading.Lock()
+        self._started = False
+
+    def start(self):
+        """
+        Start the worker threads and queue the jobs left unfinished by a process that stopped.
+
+        Returns:
+            JobService: The service itself.
+        """
+
+        if self._started:
+            return self
+
+        self._client = self._client_factory()
+        self._started = True
+        self._stopping.clear()
+
+        for job_id in self.store.requeue_interrupted(self.stale_after):
+            self._enqueue(job_id)
+
+        for i in range(self.max_workers):
+            worker = threading.Thread(target=self._work, name=f"highlight-job-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+        self._monitor = threading.Thread(target=self._beat, name="highlight-job-heartbeat", daemon=True)
+        self._monitor.start()
+
+        return self
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stop the worker threads after the jobs they are running.  Queued jobs stay queued in the store.
+
+        Args:
+            wait (bool, optional): Wait for the workers to stop. Defaults to True.
+        """
+
+        self._stopping.set()
+
+        for _ in self._workers:
+            self._queue.put(None)
+
+        if wait:
+            for worker in self._workers:
+                worker.join()
+            self._monitor.join()
+
+        self._workers = []
+        self._monitor = None
+        self._started = False
+
+    def submit(self, kind: str, payload: dict, owner: str = None, tag: str = None, reuse_done: bool = False) -> str:
+        """
+        Queue a job.
+
+        Args:
+            kind (str): The job kind, a key of `handlers`.
+            payload (dict): The JSON-serializable arguments of the handler.
+            owner (str, optional): Identifies who submitted the job. Defaults to None.
+            tag (str, optional): A label for finding the job again.  See `latest`. Defaults to None.
+            reuse_done (bool, optional): Also reuse an identical job that has already finished, for deterministic
+                                         jobs. Defaults to False.
+
+        Returns:
+            str: The id of the new job.  When an identical job is reused, this is the owner's own job linked to it,
+                 or the reused job itself if it has the same owner and tag.
+
+        Raises:
+            KeyError: If there is no handler for `kind`.
+        """
+
+        if kind not in self.handlers:
+            raise KeyError(f"Unknown job kind:  '{kind}'.  Available kinds:  {', '.join(self.handlers)}")
+
+        statuses = ("queued", "running", "done") if reuse_done else ("queued", "running")
+
+        with self._submit_lock:
+            existing = self.store.find(kind, payload, statuses=statuses)
+
+            if existing is not None:
+                own = existing if existing.owner == owner else self.store.find(kind, payload, statuses, owner=owner)
+                if own is not None and own.tag == tag:
+                    return own.id
+
+                # the job runs once; every other owner gets a job of its own that follows it
+                return self.link(existing.id, owner=owner, tag=tag)
+
+            job_id = self.store.create(kind, payload, owner=owner, tag=tag)
+
+        self._enqueue(job_id)
+
+        return job_id
+
+    def link(self, shared_id: str, owner: str = None, tag: str = None) -> str:
+        """
+        Add a job for another owner that follows the execution of an existing job instead of running again.
+
+        Args:
+            shared_id (str): The id of the job that runs.
+            owner (str, optional): Identifies who submitted the job. Defaults to None.
+            tag (str, optional): A label for finding the job again. Defaults to None.
+
+        Returns:
+            str: The id of the linked job.
+        """
+
+        return self.store.link(shared_id, owner=owner, tag=tag)
+
+    def get(self, job_id: str) -> Job:
+        """
+        Look up a job.
+
+        Args:
+            job_id (str): The job id.
+
+        Returns:
+            Job: The job, or None.
+        """
+
+        return self.store.get(job_id)
+
+    def wait(self, job_id: str, timeout: float = None, poll_interval: float = 0.25, on_poll=None) -> Job:
+        """
+        Poll a job until it reaches a final status.
+
+        Args:
+            job_id (str): The job id.
+            timeout (float, optional): The longest wait in seconds.  None waits until the job finishes.
+                                       Defaults to None.
+            poll_interval (float, optional): The seconds between polls. Defaults to 0.25.
+            on_poll (callable, optional): Called with the job after every poll, e.g., to show its progress.
+                                          Defaults to None.
+
+        Returns:
+            Job: The job as last polled; check its status when a timeout is given.
+        """
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            job = self.store.get(job_id)
+
+            if on_poll is not None:
+                on_poll(job)
+
+            if job is None or job.status in FINAL_STATUSES:
+                return job
+
+            if deadline is not None and time.monotonic() >= deadline:
+                return job
+
+            time.sleep(poll_interval)
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a job that has not started.
+
+        Args:
+            job_id (str): The job id.
+
+        Returns:
+            bool: True if the job was cancelled.
+        """
+
+        return self.store.cancel(job_id)
+
+    def latest(self, owner: str, status: str = "done") -> dict:
+        """
+        Return the most recent job of each tag submitted by an owner.
+
+        Args:
+            owner (str): The owner.
+            status (str, optional): Only jobs with this status. Defaults to "done".
+
+        Returns:
+            dict: Jobs keyed by tag.
+        """
+
+        latest = {}
+
+        for job in self.store.list(owner=owner, status=status):
+            if job.tag is not None:
+                latest.setdefault(job.tag, job)
+
+        return latest
+
+    def _enqueue(self, job_id):
+        with self._state_lock:
+            if job_id in self._queued:
+                return
+            self._queued.add(job_id)
+
+        self._queue.put(job_id)
+
+    def _work(self):
+        while True:
+            job_id = self._queue.get()
+
+            if job_id is None:
+                return
+
+            with self._state_lock:
+                self._queued.discard(job_id)
+
+            # a failing store call, e.g., a locked or full database, fails this job but not the worker
+            try:
+                self._run(job_id)
+            except Exception:
+                logger.exception("Job worker failed to run job %s", job_id)
+
+    def _run(self, job_id):
+        if not self.store.claim(job_id, worker=self.worker_id):
+            # cancelled, or already run by another worker
+            return
+
+        with self._state_lock:
+            self._running.add(job_id)
+
+        try:
+            job = self.store.get(job_id)
+
+            def progress(fraction=None, message=None):
+                self.store.update(job_id, progress=fraction, message=message)
+
+            try:
+                result = self.handlers[job.kind](self._client, self.store.payload(job_id), progress)
+            except Exception as error:
+                self.store.finish(job_id, error=f"{type(error).__name__}: {error}")
+            else:
+                self.store.finish(job_id, result=result)
+
+        finally:
+            # a job whose outcome could not be recorded stops beating and is run again once it is stale
+            with self._state_lock:
+                self._running.discard(job_id)
+
+    def _beat(self):
+        while not self._stopping.wait(self.heartbeat_interval):
+            try:
+                with self._state_lock:
+                    running = list(self._running)
+
+                self.store.heartbeat(running)
+
+                # jobs of a process that stopped while this one runs are picked up without waiting for a restart
+                for job_id in self.store.requeue_interrupted(self.stale_after):
+                    self._enqueue(job_id)
+            except Exception:
+                logger.exception("Job heartbeat failed")
+
+
+def _default_client():
+    from openai import OpenAI
+
+    from highlight.client import RetryingClient
+    from highlight.ratelimit import RateLimiter
+
+    return RetryingClient(OpenAI(max_retries=0), rate_limiter=RateLimiter())
+
+
+_DEFAULT_JOB_SERVICE = None
+_DEFAULT_JOB_SERVICE_LOCK = threading.Lock()
+
+
+def get_job_service(**kwargs) -> JobService:
+    """
+    Return the process-wide job service, creating and starting it on first use.
+
+    Args:
+        **kwargs: Arguments of `JobService`, used only when the service is created.
+
+    Returns:
+        JobService: The started default job service.
+    """
+
+    global _DEFAULT_JOB_SERVICE
+
+    with _DEFAULT_JOB_SERVICE_LOCK:
+        if _DEFAULT_JOB_SERVICE is None:
+            _DEFAULT_JOB_SERVICE = JobService(**kwargs).start()
+
+    return _DEFAULT_JOB_SERVICE
@@ -0,0 +1,498 @@
+import contextlib
+import contextvars
+import json
+import threading
+import time
+from typing import NamedTuple
+
+from highlight.models import estimate_cost
+
+
+def usage_tokens(response) -> dict:
+    """
+    Read the token counts from the `usage` field of a chat completion or the final chunk of a stream.
+
+    Args:
+        response (object): A chat completion or chunk.
+
+    Returns:
+        dict: "input_tokens", "output_tokens", and "cached_tokens", or None if the response has no usage.
+    """
+
+    usage = getattr(response, "usage", None)
+
+    if usage is None:
+        return None
+
+    details = getattr(usage, "prompt_tokens_details", None)
+
+    return {
+        "input_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "output_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        "cached_tokens": (getattr(details, "cached_tokens", 0) or 0) if details is not None else 0,
+    }
+
+
+class CallRecord(NamedTuple):
+    """
+    Measurements of one completion.
+
+    `latency` is the wall time of the call in seconds and `time_to_first_token` the wait for the first streamed
+    piece of content, or None when the response was not streamed.  `cached_tokens` are the prompt tokens the
+    provider read from its prompt cache.  `response_cache_hit` marks calls answered from the local response cache
+    without a request.  `cost` is in US dollars, or None for models without prices.  `error` is the error that
+    failed the call, e.g., "RateLimitError: ...", or None if it completed, and `retries` the number of failed
+    attempts a `RetryingClient` made again.
+    """
+
+    prompt_name: str
+    model: str
+    latency: float
+    time_to_first_token: float = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    cost: float = None
+    response_cache_hit: bool = False
+    timestamp: float = None
+    error: str = None
+    retries: int = 0
+
+
+class MetricsAggregator:
+    """
+    Thread-safe in-memory sink that totals call records by prompt name and model.
+    """
+
+    def __init__(self):
+
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Reset all totals."""
+
+        with self._lock:
+            self._groups = {}
+
+    def record(self, call: CallRecord):
+        """
+        Add a call to the totals of its prompt name and model.
+
+        Args:
+            call (CallRecord): The measurements of the call.
+        """
+
+        with self._lock:
+            group = self._groups.setdefault((call.prompt_name or "", call.model), {
+                "calls": 0,
+                "response_cache_hits": 0,
+                "latency": 0.0,
+                "max_latency": 0.0,
+                "streamed_calls": 0,
+                "time_to_first_token": 0.0,
+                "input_tokens": 0,
+                "output_tokens": 0,
+                "cached_tokens": 0,
+                "prompt_cache_hits": 0,
+                "cost": 0.0,
+                "errors": 0,
+                "retries": 0,
+            })
+
+            group["calls"] += 1
+            group["response_cache_hits"] += call.response_cache_hit
+            group["latency"] += call.latency
+            group["max_latency"] = max(group["max_latency"], call.latency)
+            group["input_tokens"] += call.input_tokens
+            group["output_tokens"] += call.output_tokens
+            group["cached_tokens"] += call.cached_tokens
+            group["prompt_cache_hits"] += call.cached_tokens > 0
+            group["cost"] += call.cost or 0.0
+            group["errors"] += call.error is not None
+            group["retries"] += call.retries
+
+            if call.time_to_first_token is not None:
+                group["streamed_calls"] += 1
+                group["time_to_first_token"] += call.time_to_first_token
+
+    def groups(self) -> dict:
+        """
+        Return a copy of the raw totals.
+
+        Returns:
+            dict: Totals keyed by (prompt name, model), with latency and time to first token as sums.
+        """
+
+        with self._lock:
+            return {key: dict(group) for key, group in self._groups.items()}
+
+    def by_prompt(self) -> list:
+        """
+        Return the totals of each prompt name and model.
+
+        Returns:
+            list: One dictionary per prompt name and model with the number of calls, response cache hits, prompt
+                  cache hits, failed calls, and retried attempts, the mean and maximum latency, the mean time to
+                  first token (None if no call was streamed), the token totals, and the estimated cost, ordered by
+                  total latency.
+        """
+
+        rows = []
+        for (prompt_name, model), group in self.groups().items():
+            streamed_calls = group.pop("streamed_calls")
+            total_latency = group.pop("latency")
+            total_time_to_first_token = group.pop("time_to_first_token")
+
+            rows.append(dict(
+                prompt_name=prompt_name,
+                model=model,
+                mean_latency=total_latency / group["calls"],
+                mean_time_to_first_token=total_time_to_first_token / streamed_calls if streamed_calls else None,
+                total_latency=total_latency,
+                **group
+            ))
+
+        return sorted(rows, key=lambda row: row["total_latency"], reverse=True)
+
+    def summary(self) -> dict:
+        """
+        Return the totals over all prompts and models.
+
+        Returns:
+            dict: The number of calls, response cache hits, prompt cache hits (calls that reused a cached prompt
+                  prefix), failed calls, and retried attempts, the total latency, the token totals, the fraction
+                  of prompt tokens that were cached, and the estimated cost.
+        """
+
+        totals = {
+            "calls": 0,
+            "response_cache_hits": 0,
+            "prompt_cache_hits": 0,
+            "errors": 0,
+            "retries": 0,
+            "latency": 0.0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "cached_tokens": 0,
+            "cost": 0.0,
+        }
+
+        for group in self.groups().values():
+            for key in totals:
+                totals[key] += group[key]
+
+        totals["cached_fraction"] = totals["cached_tokens"] / totals["input_tokens"] if totals["input_tokens"] else 0.0
+
+        return totals
+
+
+class JsonlSink:
+    """
+    Sink that appends each call record to a JSON Lines file.
+
+    Args:
+        path (str): The file to append to.  It is created if it does not exist.
+    """
+
+    def __init__(self, path):
+
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(self, call: CallRecord):
+        """
+        Append a call to the file.
+
+        Args:
+            call (CallRecord): The measurements of the call.
+        """
+
+        line = json.dumps(call._asdict())
+
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as jsonl_file:
+                jsonl_file.write(line + "\n")
+
+
+def _label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class PrometheusSink(MetricsAggregator):
+    """
+    In-memory sink that renders its totals in the Prometheus text exposition format.
+
+    Scrape it by serving `render()` from an existing endpoint or by starting the built-in server with `serve()`.
+    """
+
+    # metric name, help text, type, and the total each group reports
+    _METRICS = (
+        ("highlight_llm_calls_total", "Completion calls.", "counter", "calls"),
+        ("highlight_llm_response_cache_hits_total", "Calls answered from the response cache.", "counter",
+         "response_cache_hits"),
+        ("highlight_llm_latency_seconds_total", "Total wall time of completion calls.", "counter", "latency"),
+        ("highlight_llm_time_to_first_token_seconds_total", "Total time to the first streamed token.", "counter",
+         "time_to_first_token"),
+        ("highlight_llm_streamed_calls_total", "Streamed completion calls.", "counter", "streamed_calls"),
+        ("highlight_llm_input_tokens_total", "Prompt tokens.", "counter", "input_tokens"),
+        ("highlight_llm_output_tokens_total", "Completion tokens.", "counter", "output_tokens"),
+        ("highlight_llm_cached_tokens_total", "Prompt tokens read from the provider's prompt cache.", "counter",
+         "cached_tokens"),
+        ("highlight_llm_prompt_cache_hits_total", "Calls that reused a cached prompt prefix.", "counter",
+         "prompt_cache_hits"),
+        ("highlight_llm_cost_dollars_total", "Estimated cost in US dollars.", "counter", "cost"),
+        ("highlight_llm_errors_total", "Completion calls that failed.", "counter", "errors"),
+        ("highlight_llm_retries_total", "Failed attempts that were retried.", "counter", "retries"),
+    )
+
+    def render(self) -> str:
+        """
+        Render the totals.
+
+        Returns:
+            str: The metrics in the Prometheus text exposition format, labelled by prompt name and model.
+        """
+
+        groups = sorted(self.groups().items())
+        lines = []
+
+        for name, help_text, metric_type, key in self._METRICS:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+
+            for (prompt_name, model), group in groups:
+                labels = f'prompt="{_label_value(prompt_name)}",model="{_label_value(model)}"'
+                lines.append(f"{name}{{{labels}}} {group[key]}")
+
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int = 9464, host: str = ""):
+        """
+        Serve the rendered metrics over HTTP from a daemon thread.
+
+        Args:
+            port (int, optional): The port to listen on; 0 picks a free port. Defaults to 9464.
+            host (str, optional): The address to bind. Defaults to all interfaces.
+
+        Returns:
+            ThreadingHTTPServer: The running server.  Call its `shutdown` method to stop it.
+        """
+
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        sink = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = sink.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        return server
+
+
+_METRICS = MetricsAggregator()
+_SINKS = [_METRICS]
+_SINKS_LOCK = threading.Lock()
+
+# sinks that only receive the calls made in the current thread or task, see `track_calls`
+_CONTEXT_SINKS = contextvars.ContextVar("highlight_context_sinks", default=())
+
+# the timer of the request being sent by the current thread or task, see `CallTimer.request`
+_ACTIVE_TIMER = contextvars.ContextVar("highlight_active_call_timer", default=None)
+
+
+def get_metrics() -> MetricsAggregator:
+    """
+    Return the process-wide in-memory sink that receives every call record.
+
+    Returns:
+        MetricsAggregator: The shared per-prompt totals.
+    """
+
+    return _METRICS
+
+
+def add_sink(sink):
+    """
+    Send every following call record to a sink.
+
+    Args:
+        sink (object): An object with a `record(call)` method, e.g., `JsonlSink` or `PrometheusSink`.
+    """
+
+    with _SINKS_LOCK:
+        if sink not in _SINKS:
+            _SINKS.append(sink)
+
+
+def remove_sink(sink):
+    """
+    Stop sending call records to a sink added with `add_sink`.
+
+    Args:
+        sink (object): The sink to remove.
+    """
+
+    with _SINKS_LOCK:
+        if sink in _SINKS:
+            _SINKS.remove(sink)
+
+
+@contextlib.contextmanager
+def track_calls(sink):
+    """
+    Send the call records made inside the block to a sink as well, e.g., to total the calls of one user session.
+
+    Only calls made by the current thread and the asyncio tasks it starts are sent; calls made by other threads
+    while the block runs are not.
+
+    Args:
+        sink (object): An object with a `record(call)` method, e.g., `MetricsAggregator`.
+
+    Yields:
+        object: The sink.
+    """
+
+    token = _CONTEXT_SINKS.set(_CONTEXT_SINKS.get() + (sink,))
+
+    try:
+        yield sink
+    finally:
+        _CONTEXT_SINKS.reset(token)
+
+
+def record_call(call: CallRecord):
+    """
+    Send a call record to every sink and to the sinks of the enclosing `track_calls` blocks.
+
+    A failing sink does not fail the call it measures.
+
+    Args:
+        call (CallRecord): The measurements of the call.
+    """
+
+    with _SINKS_LOCK:
+        sinks = list(_SINKS)
+
+    sinks.extend(sink for sink in _CONTEXT_SINKS.get() if sink not in sinks)
+
+    for sink in sinks:
+        try:
+            sink.record(call)
+        except Exception:
+            pass
+
+
+def record_retry():
+    """
+    Count a failed attempt that is made again on the timer of the enclosing `CallTimer.request` block, if any.
+    """
+
+    timer = _ACTIVE_TIMER.get()
+
+    if timer is not None:
+        timer.retries += 1
+
+
+class CallTimer:
+    """
+    Measure one completion call and record it when it finishes.
+
+    Create the timer just before the request and send the request inside `request()`, which records the call if
+    it fails.  Call `first_token()` when the first streamed content arrives, and `finish()` with the completion,
+    or the final chunk of a stream, once it is done.
+
+    Args:
+        prompt_name (str): The name of the prompt, e.g., "title" or "reduce_wordcount".
+        model (str): The model the request is sent to.
+    """
+
+    def __init__(self, prompt_name, model):
+
+        self.prompt_name = prompt_name
+        self.model = model
+        self.time_to_first_token = None
+        self.retries = 0
+        self._start = time.perf_counter()
+
+    def first_token(self):
+        """Mark the arrival of the first streamed content."""
+
+        if self.time_to_first_token is None:
+            self.time_to_first_token = time.perf_counter() - self._start
+
+    @contextlib.contextmanager
+    def request(self):
+        """
+        Send the request inside the block: the retries of a `RetryingClient` are counted on this timer, and an
+        error raised by the block is recorded before it propagates.
+
+        Yields:
+            CallTimer: The timer itself.
+        """
+
+        token = _ACTIVE_TIMER.set(self)
+
+        try:
+            yield self
+        except Exception as error:
+            self.finish(error=error)
+            raise
+        finally:
+            _ACTIVE_TIMER.reset(token)
+
+    def finish(self, response=None, response_cache_hit=False, error=None) -> CallRecord:
+        """
+        Record the call.
+
+        Args:
+            response (object, optional): The chat completion or the final chunk of a stream, whose usage gives
+                                         the token counts.  Defaults to None.
+            response_cache_hit (bool, optional): Whether the call was answered from the response cache.
+                                                 Defaults to False.
+            error (Exception, optional): The error that failed the call. Defaults to None.
+
+        Returns:
+            CallRecord: The recorded measurements.
+        """
+
+        latency = time.perf_counter() - self._start
+
+        tokens = usage_tokens(response) if response is not None else None
+        if tokens is None:
+            tokens = {"input_tokens": 0, "output_tokens": 0, "cached_tokens": 0}
+
+        cost = None
+        if not response_cache_hit:
+            try:
+                cost = estimate_cost(self.model, **tokens)
+            except KeyError:
+                pass
+
+        call = CallRecord(
+            prompt_name=self.prompt_name,
+            model=self.model,
+            latency=latency,
+            time_to_first_token=self.time_to_first_token,
+            cost=cost,
+            response_cache_hit=response_cache_hit,
+            timestamp=time.time(),
+            error=None if error is None else f"{type(error).__name__}: {error}",
+            retries=self.retries,
+            **tokens
+        )
+
+        record_call(call)
+
+        return call
@@ -0,0 +1,107 @@
+from typing import NamedTuple
+
+
+# the model used when none is selected
+DEFAULT_MODEL = "gpt-4o"
+
+
+class ModelInfo(NamedTuple):
+    """
+    Capabilities and pricing of a chat completion model.
+
+    Prices are in US dollars per million tokens.  `json_schema` marks models that support structured outputs
+    constrained by a JSON schema.  `requests_per_minute` and `tokens_per_minute` are the default rate limits of a
+    usage tier 1 account, used by `ModelRateLimiter(model_defaults=True)` when no limits are configured.
+    """
+
+    name: str
+    context_window: int
+    max_output_tokens: int
+    encoding: str
+    input_price: float
+    output_price: float
+    cached_input_price: float = None
+    json_schema: bool = False
+    requests_per_minute: int = None
+    tokens_per_minute: int = None
+
+
+# models offered in the app, in the order they are listed
+MODELS = {
+    "gpt-4o": ModelInfo("gpt-4o", 128000, 16384, "o200k_base", 2.50, 10.00, 1.25, True, 500, 30000),
+    "gpt-4o-mini": ModelInfo("gpt-4o-mini", 128000, 16384, "o200k_base", 0.15, 0.60, 0.075, True, 500, 200000),
+    "gpt-4-turbo": ModelInfo("gpt-4-turbo", 128000, 4096, "cl100k_base", 10.00, 30.00, None, False, 500, 30000),
+    "gpt-4": ModelInfo("gpt-4", 8192, 8192, "cl100k_base", 30.00, 60.00, None, False, 500, 10000),
+    "gpt-4-32k": ModelInfo("gpt-4-32k", 32768, 8192, "cl100k_base", 60.00, 120.00, None, False, 500, 10000),
+    "gpt-3.5-turbo-16k": ModelInfo("gpt-3.5-turbo-16k", 16385, 4096, "cl100k_base", 3.00, 4.00, None, False, 3500,
+                                   200000),
+    "gpt-3.5-turbo": ModelInfo("gpt-3.5-turbo", 16385, 4096, "cl100k_base", 0.50, 1.50, None, False, 3500, 200000),
+}
+
+
+def get_model_info(model: str) -> ModelInfo:
+    """
+    Look up a model in the registry.
+
+    Dated snapshots resolve to their base model, e.g., "gpt-4o-2024-08-06" resolves to "gpt-4o".
+
+    Args:
+        model (str): The model name.
+
+    Returns:
+        ModelInfo: The model's capabilities and pricing.
+
+    Raises:
+        KeyError: If the model is not in `MODELS`.
+    """
+
+    info = MODELS.get(model)
+
+    if info is None:
+        # the longest registered name that prefixes the snapshot name is its base model
+        candidates = [name for name in MODELS if model.startswith(f"{name}-")]
+
+        if not candidates:
+            raise KeyError(f"Unknown model:  '{model}'.  Available models:  {', '.join(MODELS)}")
+
+        info = MODELS[max(candidates, key=len)]
+
+    return info
+
+
+def context_window(model: str) -> int:
+    """
+    Return the maximum number of prompt and completion tokens a model accepts.
+
+    Args:
+        model (str): The model name.
+
+    Returns:
+        int: The context window in tokens.
+    """
+
+    return get_model_info(model).context_window
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int = 0, cached_tokens: int = 0) -> float:
+    """
+    Estimate the price of a request.
+
+    Args:
+        model (str): The model name.
+        input_tokens (int): The number of prompt tokens, including cached tokens.
+        output_tokens (int, optional): The number of completion tokens. Defaults to 0.
+        cached_tokens (int, optional): The number of prompt tokens served from the prompt cache. Defaults to 0.
+
+    Returns:
+        float: The price in US dollars.
+    """
+
+    info = get_model_info(model)
+    cached_price = info.input_price if info.cached_input_price is None else info.cached_input_price
+
+    return (
+        (input_tokens - cached_tokens) * info.input_price
+        + cached_tokens * cached_price
+        + output_tokens * info.output_price
+    ) / 1e6
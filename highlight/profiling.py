@@ -0,0 +1,358 @@
+import contextlib
+import contextvars
+import io
+import os
+import time
+import warnings
+from typing import NamedTuple
+
+
+# environment variables that turn on profiling and choose where profiler output is written
+PROFILE_ENV_VAR = "HIGHLIGHT_PROFILE"
+PROFILE_DIR_ENV_VAR = "HIGHLIGHT_PROFILE_DIR"
+
+# "timing" records phase timings only; the others also run a function-level profiler over the whole rerun
+PROFILE_MODES = ("timing", "cprofile", "pyinstrument")
+
+_OFF_VALUES = ("", "0", "false", "no", "off")
+
+# the profiler of the rerun executing in this thread or task
+_ACTIVE_PROFILER = contextvars.ContextVar("highlight_active_profiler", default=None)
+
+
+def _parse_mode(value) -> str:
+    value = str(value).strip().lower()
+
+    if value in _OFF_VALUES:
+        return None
+
+    return value if value in PROFILE_MODES else "timing"
+
+
+def profile_mode(value: str = None) -> str:
+    """
+    Resolve the profiling mode from the `HIGHLIGHT_PROFILE` environment variable and a query parameter value.
+
+    Profiling is only possible when the environment variable turns it on, so that visitors of a deployed app
+    cannot profile it with a query parameter.  When it is on, the query parameter can pick another mode or turn
+    profiling off for that page.
+
+    Args:
+        value (str, optional): The value of the `profile` query parameter.  None uses the mode of the environment
+                               variable. Defaults to None.
+
+    Returns:
+        str: One of `PROFILE_MODES`, or None when profiling is off.  Values that turn profiling on without
+             naming a mode, such as "1" or "true", select "timing".
+    """
+
+    mode = _parse_mode(os.getenv(PROFILE_ENV_VAR, ""))
+
+    if mode is None or value is None:
+        return mode
+
+    return _parse_mode(value)
+
+
+class Phase(NamedTuple):
+    """
+    The timing of one profiled phase.
+
+    `kind` is "block" for consecutive parts of the script recorded with `RerunProfiler.lap` and "operation" for
+    phases timed with `profile_phase`.  `self_seconds` excludes the time of operations nested inside this one.
+    """
+
+    name: str
+    kind: str
+    start: float
+    seconds: float
+    self_seconds: float
+    depth: int
+
+
+class RerunProfiler:
+    """
+    Time the phases of one Streamlit script run.
+
+    The script is split into consecutive blocks with `lap()`.  Operations inside the library, such as extraction,
+    token counting, and rendering, are timed with `profile_phase()` while the profiler is started.  In the
+    "cprofile" and "pyinstrument" modes a function-level profiler also runs over the whole rerun; its output is
+    written to `dump_dir` when one is set.  A profiler created with `mode=None` does nothing, so the hooks can
+    stay in place when profiling is off.
+
+    Args:
+        mode (str, optional): One of `PROFILE_MODES`, or None to disable profiling. Defaults to None.
+        dump_dir (str, optional): The directory profiler output is written to.  Defaults to the
+                                  `HIGHLIGHT_PROFILE_DIR` environment variable, or no output files.
+    """
+
+    def __init__(self, mode=None, dump_dir=None):
+
+        if mode is not None and mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode:  '{mode}'.  Available modes:  {', '.join(PROFILE_MODES)}")
+
+        self.mode = mode
+        self.dump_dir = dump_dir if dump_dir is not None else os.getenv(PROFILE_DIR_ENV_VAR)
+        self.phases = []
+        self.total_seconds = None
+        self.dump_path = None
+
+        self._function_profiler = None
+        self._start = None
+        self._lap_start = None
+        self._stack = []
+        self._token = None
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the profiler records anything."""
+
+        return self.mode is not None
+
+    def start(self):
+        """
+        Start timing the rerun and make this the active profiler of the calling thread.
+
+        Returns:
+            RerunProfiler: The profiler itself.
+        """
+
+        if not self.enabled:
+            return self
+
+        if self.mode == "cprofile":
+            import cProfile
+
+            self._function_profiler = cProfile.Profile()
+        elif self.mode == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                warnings.warn(
+                    "pyinstrument is not installed; profiling phase timings only.  Install it with "
+                    "`pip install highlight[profile]`."
+                )
+                self.mode = "timing"
+            else:
+                self._function_profiler = Profiler()
+
+        self._token = _ACTIVE_PROFILER.set(self)
+        self._start = self._lap_start = time.perf_counter()
+
+        if self._function_profiler is not None:
+            try:
+                if self.mode == "cprofile":
+                    self._function_profiler.enable()
+                else:
+                    self._function_profiler.start()
+            except (RuntimeError, ValueError):
+                # another profiler is still attached, e.g., by a rerun that was interrupted; keep the timings
+                self._function_profiler = None
+
+        return self
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """
+        Time an operation.
+
+        Args:
+            name (str): The name of the operation, e.g., "extraction".
+        """
+
+        if not self.enabled or self._start is None:
+            yield
+            return
+
+        frame = [0.0]
+        self._stack.append(frame)
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self._stack.pop()
+
+            if self._stack:
+                self._stack[-1][0] += seconds
+
+            self.phases.append(Phase(
+                name,
+                "operation",
+                start - self._start,
+                seconds,
+                seconds - frame[0],
+                len(self._stack)
+            ))
+
+    def lap(self, name: str):
+        """
+        Close a block of the script: the time since the previous lap, or the start, is recorded under `name`.
+
+        Args:
+            name (str): The name of the block, e.g., "title section".
+        """
+
+        if not self.enabled or self._start is None:
+            return
+
+        now = time.perf_counter()
+        seconds = now - self._lap_start
+
+        self.phases.append(Phase(name, "block", self._lap_start - self._start, seconds, seconds, 0))
+        self._lap_start = now
+
+    def finish(self, name: str = "end of script"):
+        """
+        Stop timing, record the remaining time as a last block, and write the profiler output.
+
+        Args:
+            name (str, optional): The name of the last block. Defaults to "end of script".
+
+        Returns:
+            RerunProfiler: The profiler itself.
+        """
+
+        if not self.enabled or self._start is None:
+            return self
+
+        if self._function_profiler is not None:
+            if self.mode == "cprofile":
+                self._function_profiler.disable()
+            else:
+                self._function_profiler.stop()
+
+        self.lap(name)
+        self.total_seconds = self._lap_start - self._start
+
+        _ACTIVE_PROFILER.reset(self._token)
+        self._start = None
+
+        if self.dump_dir and self._function_profiler is not None:
+            self.dump_path = self.dump(self.dump_dir)
+
+        return self
+
+    def dump(self, directory: str) -> str:
+        """
+        Write the output of the function-level profiler.
+
+        cProfile output is written as a `.prof` file for `pstats` or snakeviz, and pyinstrument output as an HTML
+        report.
+
+        Args:
+            directory (str): The directory to write to.  It is created if it does not exist.
+
+        Returns:
+            str: The path of the file written, or None in the "timing" mode.
+        """
+
+        if self._function_profiler is None:
+            return None
+
+        os.makedirs(directory, exist_ok=True)
+        # the sub-second suffix keeps reruns within the same second apart
+        file_name = f"rerun-{time.strftime('%Y%m%d-%H%M%S')}-{time.perf_counter_ns() % 10 ** 6:06d}"
+        stem = os.path.join(directory, file_name)
+
+        if self.mode == "cprofile":
+            path = f"{stem}.prof"
+            self._function_profiler.dump_stats(path)
+        else:
+            path = f"{stem}.html"
+            with open(path, "w", encoding="utf-8") as html_file:
+                html_file.write(self._function_profiler.output_html())
+
+        return path
+
+    def blocks(self) -> list:
+        """
+        Return the timings of the script blocks.
+
+        Returns:
+            list: A dictionary per block, in script order, with its name, seconds, and share of the rerun.
+        """
+
+        total = self.total_seconds or sum(phase.seconds for phase in self.phases if phase.kind == "block") or 1.0
+
+        return [
+            {"block": phase.name, "seconds": phase.seconds, "share": phase.seconds / total}
+            for phase in self.phases if phase.kind == "block"
+        ]
+
+    def operations(self) -> list:
+        """
+        Return the timings of the operations, combined by name.
+
+        Returns:
+            list: A dictionary per operation name with the number of calls, the total seconds, and the seconds
+                  excluding nested operations, ordered by total seconds.
+        """
+
+        totals = {}
+
+        for phase in self.phases:
+            if phase.kind != "operation":
+                continue
+
+            row = totals.setdefault(phase.name, {"operation": phase.name, "calls": 0, "seconds": 0.0,
+                                                 "self_seconds": 0.0})
+            row["calls"] += 1
+            row["seconds"] += phase.seconds
+            row["self_seconds"] += phase.self_seconds
+
+        return sorted(totals.values(), key=lambda row: row["seconds"], reverse=True)
+
+    def report(self, limit: int = 30) -> str:
+        """
+        Render the function-level profile as text.
+
+        Args:
+            limit (int, optional): The number of functions listed by cProfile. Defaults to 30.
+
+        Returns:
+            str: The functions with the highest cumulative time, or None in the "timing" mode.
+        """
+
+        if self._function_profiler is None:
+            return None
+
+        if self.mode == "cprofile":
+            import pstats
+
+            stream = io.StringIO()
+            pstats.Stats(self._function_profiler, stream=stream).sort_stats("cumulative").print_stats(limit)
+            return stream.getvalue()
+
+        return self._function_profiler.output_text()
+
+
+def get_active_profiler():
+    """
+    Return the profiler of the rerun executing in the calling thread or task.
+
+    Returns:
+        RerunProfiler: The started profiler, or None.
+    """
+
+    return _ACTIVE_PROFILER.get()
+
+
+def profile_phase(name: str):
+    """
+    Time an operation with the active profiler, if there is one.
+
+    Args:
+        name (str): The name of the operation, e.g., "docx render".
+
+    Returns:
+        contextmanager: The timing context, or a no-op context when no profiler is active.
+    """
+
+    profiler = _ACTIVE_PROFILER.get()
+
+    if profiler is None:
+        return contextlib.nullcontext()
+
+    return profiler.phase(name)
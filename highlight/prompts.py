@@ -3,6 +3,23 @@ EXAMPLE_TEXT_ONE = """Multisector Dynamics: Advancing the Science of Complex Ada
 EXAMPLE_TEXT_TWO = """The Role of Regional Connections in Planning for Future Power System Operations Under Climate Extremes.  Identifying the sensitivity of future power systems to climate extremes must consider the concurrent effects of changing climate and evolving power systems. We investigated the sensitivity of a Western U.S. power system to isolated and combined heat and drought when it has low (5%) and moderate (31%) variable renewable energy shares, representing historic and future systems. We used an electricity operational model combined with a model of historically extreme drought (for hydropower and freshwater-reliant thermoelectric generators) over the Western U.S. and a synthetic, regionally extreme heat event in Southern California (for thermoelectric generators and electricity load). We found that the drought has the highest impact on summertime production cost (+10% to +12%), while temperature-based deratings have minimal effect (at most +1%). The Southern California heat wave scenario impacting load increases summertime regional net imports to Southern California by 10–14%, while the drought decreases them by 6–12%. Combined heat and drought conditions have a moderate effect on imports to Southern California (−2%) in the historic system and a stronger effect (+8%) in the future system. Southern California dependence on other regions decreases in the summertime with the moderate increase in variable renewable energy (−34% imports), but hourly peak regional imports are maintained under those infrastructure changes. By combining synthetic and historically driven conditions to test two infrastructures, we consolidate the importance of considering compounded heat wave and drought in planning studies and suggest that region-to-region energy transfers during peak periods are key to optimal operations under climate extremes."""
 SYSTEM_SCOPE = """You are a technical science editor.  You are constructing high impact highlight content from recent publications."""
 
+# shared prefix layout:  the document is sent once as the first user message and each section prompt refers to it
+DOCUMENT_PREFIX = """The following is the input text delimited by triple backticks.  The requests that follow refer to it.
+
+```{0}```"""
+
+# replaces the input block at the end of each section prompt in the shared prefix layout
+DOCUMENT_REFERENCE = "The input text is provided in the previous message."
+
+# single request for several sections; {0} lists the sections and {1} holds the instructions for each
+STRUCTURED_PROMPT = """Generate the following sections of a research highlight for the input text provided in the \
+previous message:  {0}.
+
+Return a JSON object with one string field per section.  The instructions for each section are delimited by \
+three pound signs followed by the section name.  Follow them as if each section were requested on its own.
+
+{1}"""
+
 prompt_queue = {
     "system": """You are a technical science editor.  You are constructing high impact highlight content from recent publications.""",
 
@@ -0,0 +1,217 @@
+import asyncio
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Thread-safe token-bucket limiter for requests per minute and tokens per minute.
+
+    Each bucket starts full and refills continuously at its per-minute rate.  Calls to `acquire` block until both
+    buckets hold enough budget for the request.
+
+    Args:
+        requests_per_minute (int, optional): The request budget per minute.  None disables the request bucket.
+        tokens_per_minute (int, optional): The token budget per minute.  None disables the token bucket.
+        clock (callable, optional): Monotonic clock returning seconds. Defaults to time.monotonic.
+        sleep (callable, optional): Function used to wait for budget. Defaults to time.sleep.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute=None,
+        tokens_per_minute=None,
+        model_defaults=False,
+        clock=time.monotonic,
+        sleep=time.sleep
+    ):
+
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.model_defaults = model_defaults
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+        self._available_requests = float(requests_per_minute) if requests_per_minute else None
+        self._available_tokens = float(tokens_per_minute) if tokens_per_minute else None
+        self._last_refill = clock()
+
+    def _refill(self):
+        now = self._clock()
+        elapsed_minutes = (now - self._last_refill) / 60.0
+        self._last_refill = now
+
+        if self._available_requests is not None:
+            self._available_requests = min(
+                float(self.requests_per_minute),
+                self._available_requests + elapsed_minutes * self.requests_per_minute
+            )
+
+        if self._available_tokens is not None:
+            self._available_tokens = min(
+                float(self.tokens_per_minute),
+                self._available_tokens + elapsed_minutes * self.tokens_per_minute
+            )
+
+    def _wait_seconds(self, tokens):
+        wait = 0.0
+
+        if self._available_requests is not None and self._available_requests < 1:
+            wait = max(wait, (1 - self._available_requests) * 60.0 / self.requests_per_minute)
+
+        if self._available_tokens is not None and self._available_tokens < tokens:
+            wait = max(wait, (tokens - self._available_tokens) * 60.0 / self.tokens_per_minute)
+
+        return wait
+
+    def _try_acquire(self, tokens):
+        """Consume the budget for one request and return 0, or return the seconds to wait for it."""
+
+        # a request larger than the whole bucket would never fit, so let it through on a full bucket
+        if self.tokens_per_minute:
+            tokens = min(tokens, self.tokens_per_minute)
+
+        with self._lock:
+            self._refill()
+            wait = self._wait_seconds(tokens)
+
+            if wait <= 0:
+                if self._available_requests is not None:
+                    self._available_requests -= 1
+                if self._available_tokens is not None:
+                    self._available_tokens -= tokens
+                return 0.0
+
+        return wait
+
+    def for_model(self, model):
+        """
+        Return the limiter for requests to `model`.  A single limiter budgets every model together.
+
+        Args:
+            model (str): The model name.
+
+        Returns:
+            RateLimiter: The limiter itself.
+        """
+
+        return self
+
+    def acquire(self, tokens=0):
+        """
+        Block until the budget for one request of `tokens` tokens is available, then consume it.
+
+        Args:
+            tokens (int, optional): The number of tokens the request is expected to use. Defaults to 0.
+
+        Returns:
+            float: The number of seconds spent waiting.
+        """
+
+        waited = 0.0
+
+        while True:
+            wait = self._try_acquire(tokens)
+
+            if wait <= 0:
+                return waited
+
+            self._sleep(wait)
+            waited += wait
+
+    async def aacquire(self, tokens=0):
+        """
+        Wait without blocking the event loop until the budget for one request is available, then consume it.
+
+        Args:
+            tokens (int, optional): The number of tokens the request is expected to use. Defaults to 0.
+
+        Returns:
+            float: The number of seconds spent waiting.
+        """
+
+        waited = 0.0
+
+        while True:
+            wait = self._try_acquire(tokens)
+
+            if wait <= 0:
+                return waited
+
+            await asyncio.sleep(wait)
+            waited += wait
+
+
+class ModelRateLimiter:
+    """
+    Keep a separate `RateLimiter` for each model, since providers budget requests and tokens per model.
+
+    Limits that are not configured are not enforced, unless `model_defaults` is set; they then come from the
+    model registry (see `highlight.models.ModelInfo`), which lists the limits of a usage tier 1 account.  Models
+    missing from the registry are not limited unless limits are configured.
+
+    Args:
+        requests_per_minute (int, optional): The request budget per minute of every model.  None leaves requests
+                                             unlimited or uses each model's default. Defaults to None.
+        tokens_per_minute (int, optional): The token budget per minute of every model.  None leaves tokens
+                                           unlimited or uses each model's default. Defaults to None.
+        model_defaults (bool, optional): Limit each model to its tier 1 defaults where no limit is configured.
+                                         Defaults to False.
+        clock (callable, optional): Monotonic clock returning seconds. Defaults to time.monotonic.
+        sleep (callable, optional): Function used to wait for budget. Defaults to time.sleep.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute=None,
+        tokens_per_minute=None,
+        model_defaults=False,
+        clock=time.monotonic,
+        sleep=time.sleep
+    ):
+
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.model_defaults = model_defaults
+        self._clock = clock
+        self._sleep = sleep
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def for_model(self, model):
+        """
+        Return the limiter for requests to `model`, creating it on first use.
+
+        Args:
+            model (str): The model name.  Dated snapshots share the limiter of their base model.
+
+        Returns:
+            RateLimiter: The model's limiter.
+        """
+
+        from highlight.models import get_model_info
+
+        try:
+            info = get_model_info(model)
+            name = info.name
+        except KeyError:
+            info = None
+            name = model
+
+        if not self.model_defaults:
+            info = None
+
+        with self._lock:
+            limiter = self._limiters.get(name)
+
+            if limiter is None:
+                limiter = RateLimiter(
+                    self.requests_per_minute or (info.requests_per_minute if info is not None else None),
+                    self.tokens_per_minute or (info.tokens_per_minute if info is not None else None),
+                    clock=self._clock,
+                    sleep=self._sleep
+                )
+                self._limiters[name] = limiter
+
+        return limiter
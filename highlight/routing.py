@@ -0,0 +1,97 @@
+from typing import NamedTuple
+
+from highlight.models import DEFAULT_MODEL, MODELS, get_model_info
+
+
+class RoutingRule(NamedTuple):
+    """
+    Send matching requests to a model.
+
+    A rule matches when the prompt name is in `prompt_names` (None matches every prompt) and the document has at
+    most `max_document_tokens` tokens (None matches every document).
+    """
+
+    model: str
+    prompt_names: tuple = None
+    max_document_tokens: int = None
+
+
+# short extraction prompts that do not need the most capable model
+DEFAULT_ROUTING_RULES = (
+    RoutingRule("gpt-4o-mini", prompt_names=("citation", "funding", "reduce_wordcount")),
+)
+
+
+class ModelRouter:
+    """
+    Choose the model for each request from the prompt name and the size of the document.
+
+    Rules are checked in order and the first match picks the model, otherwise `default_model` is used.  If the
+    document, prompt overhead, and completion do not fit in the chosen model's context window, the first model
+    in `fallback_models` with a bigger context window that fits is used instead.
+
+    Args:
+        rules (iterable, optional): `RoutingRule` instances or dictionaries of their fields.
+                                    Defaults to `DEFAULT_ROUTING_RULES`.
+        default_model (str, optional): The model used when no rule matches. Defaults to `DEFAULT_MODEL`.
+        fallback_models (iterable, optional): Models tried in order when the chosen model is too small.
+                                              Defaults to the registered models from the smallest to the largest
+                                              context window, cheapest first.
+        prompt_overhead (int, optional): Tokens reserved for the system scope and prompt instructions.
+                                         Defaults to 500.
+    """
+
+    def __init__(self, rules=None, default_model=DEFAULT_MODEL, fallback_models=None, prompt_overhead=500):
+
+        if rules is None:
+            rules = DEFAULT_ROUTING_RULES
+
+        self.rules = [rule if isinstance(rule, RoutingRule) else RoutingRule(**rule) for rule in rules]
+        self.default_model = default_model
+        self.prompt_overhead = prompt_overhead
+
+        if fallback_models is None:
+            fallback_models = sorted(MODELS, key=lambda name: (MODELS[name].context_window, MODELS[name].input_price))
+
+        self.fallback_models = list(fallback_models)
+
+    def _fits(self, model, n_tokens, max_tokens):
+        return n_tokens + self.prompt_overhead + max_tokens <= get_model_info(model).context_window
+
+    def route(self, prompt_name: str, n_tokens: int, max_tokens: int = 0) -> str:
+        """
+        Choose the model for a request.
+
+        Args:
+            prompt_name (str): The name of the prompt from `prompt_queue`.
+            n_tokens (int): The number of tokens in the document or content sent with the prompt.
+            max_tokens (int, optional): The maximum number of completion tokens requested. Defaults to 0.
+
+        Returns:
+            str: The model name.  If no model is large enough, the model with the largest context window.
+        """
+
+        model = self.default_model
+
+        for rule in self.rules:
+            if rule.prompt_names is not None and prompt_name not in rule.prompt_names:
+                continue
+
+            if rule.max_document_tokens is not None and n_tokens > rule.max_document_tokens:
+                continue
+
+            model = rule.model
+            break
+
+        if self._fits(model, n_tokens, max_tokens):
+            return model
+
+        window = get_model_info(model).context_window
+
+        for fallback_model in self.fallback_models:
+            is_bigger = get_model_info(fallback_model).context_window > window
+
+            if is_bigger and self._fits(fallback_model, n_tokens, max_tokens):
+                return fallback_model
+
+        return max([model] + self.fallback_models, key=lambda name: get_model_info(name).context_window)
@@ -0,0 +1,246 @@
+import streamlit as st
+
+from highlight.utils import (
+    generate_text,
+    get_token_count,
+    reduce_word_count,
+    stream_prompt,
+    tokens_per_word,
+    word_budget_tokens
+)
+
+
+def generate_content(
+    client,
+    container,
+    content,
+    prompt_name="title",
+    result_title="Title Result:",
+    max_tokens=50,
+    temperature=0.0,
+    box_height=200,
+    additional_content=None,
+    max_word_count=100,
+    min_word_count=75,
+    max_allowable_tokens: int = None,
+    model="gpt-4o",
+    cache=None,
+    stream=False,
+    word_budget=False,
+    rewrite_model=None,
+    router=None,
+    prompt_layout="inline",
+    job_service=None,
+    owner=None,
+    tag=None
+):
+    """
+    Generate content using the OpenAI API based on the provided parameters and display it in a Streamlit container.
+
+    Args:
+        container (streamlit.container): The Streamlit container to display the generated content.
+        content (str): The text content to be used for generating the prompt.
+        prompt_name (str, optional): The name of the prompt to use. Defaults to "title".
+        result_title (str, optional): The title to display above the generated content. Defaults to "Title Result:".
+        max_tokens (int, optional): The maximum number of tokens to generate. Defaults to 50.
+        temperature (float, optional): The sampling temperature. Defaults to 0.0.
+        box_height (int, optional): The height of the text area box to display the generated content. Defaults to 200.
+        additional_content (str, optional): Additional content to include in the prompt. Defaults to None.
+        max_word_count (int, optional): The maximum word count for the generated content. Defaults to 100.
+        min_word_count (int, optional): The minimum word count for the generated content. Defaults to 75.
+        max_allowable_tokens (int, optional): The maximum allowable tokens for the content.
+                                              Defaults to the context window of `model`.
+        model (str, optional): The model to use for content generation. Defaults to "gpt-4o".
+        cache (ResponseCache or bool, optional): The response cache to use for the generation and word count
+                                                 reduction requests.  See `generate_prompt_content`.
+                                                 Defaults to None.
+        stream (bool, optional): Show the response as it is generated instead of waiting for the full
+                                 completion.  A response over the maximum word count is still rewritten before
+                                 it is placed in the text area. Defaults to False.
+        word_budget (bool, optional): Lower `max_tokens` to what `max_word_count` words need.  See
+                                      `generate_text`. Defaults to False.
+        rewrite_model (str, optional): The model used to rewrite a response that is too long to trim locally.
+                                       Defaults to `model`.
+        router (ModelRouter, optional): Chooses the model from `prompt_name` and the size of `content` instead
+                                        of using `model`, limited by that model's context window rather than
+                                        `max_allowable_tokens`. Defaults to None.
+        prompt_layout (str, optional): How the request is assembled.  See `build_prompt_parts`.
+                                       Defaults to "inline".
+        job_service (JobService, optional): Run the generation as a "section" job on this shared service and
+                                            poll it until it finishes, instead of calling the API from the
+                                            session.  Responses are not streamed in this case. Defaults to None.
+        owner (str, optional): The owner recorded with the job, e.g., the browser session. Defaults to None.
+        tag (str, optional): The tag recorded with the job, e.g., the session state key of the result.
+                             Defaults to `prompt_name`.
+
+    Returns:
+        str: The generated content.
+    """
+
+    if router is not None:
+        model = router.route(prompt_name, get_token_count(content, model=model), max_tokens)
+        max_allowable_tokens = None
+        rewrite_model = rewrite_model or router.route("reduce_wordcount", 0, max_tokens)
+
+    if job_service is not None:
+        # the response cache is left to the service so every session shares it
+        job_id = job_service.submit(
+            "section",
+            {
+                "content": content,
+                "prompt_name": prompt_name,
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+                "additional_content": additional_content,
+                "max_word_count": max_word_count,
+                "min_word_count": min_word_count,
+                "max_allowable_tokens": max_allowable_tokens,
+                "model": model,
+                "word_budget": word_budget,
+                "rewrite_model": rewrite_model,
+                "prompt_layout": prompt_layout,
+            },
+            owner=owner,
+            tag=tag if tag is not None else prompt_name
+        )
+
+        status = container.empty()
+        job = job_service.wait(
+            job_id,
+            on_poll=lambda job: status.info(f"Job {job.status}:  {job.message or prompt_name}", icon="⏳")
+        )
+        status.empty()
+
+        if job.status != "done":
+            raise RuntimeError(f"The {prompt_name} job {job.status}:  {job.error}")
+
+        response = job.result
+        container.markdown(result_title)
+
+    elif stream:
+        fallback_max_tokens = None
+        if word_budget:
+            fallback_max_tokens = max_tokens
+            max_tokens = min(max_tokens, word_budget_tokens(max_word_count, tokens_per_word(content, model=model)))
+
+        container.markdown(result_title)
+
+        # the streamed text is replaced by the editable text area once the response is complete; the response
+        # is the generator's return value, which differs from the streamed text when a cut-off response was
+        # generated again
+        streamed = {}
+
+        def pieces():
+            streamed["response"] = yield from stream_prompt(
+                client,
+                content=content,
+                prompt_name=prompt_name,
+                max_tokens=max_tokens,
+                max_allowable_tokens=max_allowable_tokens,
+                temperature=temperature,
+                additional_content=additional_content,
+                model=model,
+                cache=cache,
+                prompt_layout=prompt_layout,
+                fallback_max_tokens=fallback_max_tokens
+            )
+
+        placeholder = container.empty()
+        placeholder.write_stream(pieces())
+        response = streamed["response"]
+
+        response = reduce_word_count(
+            client,
+            response,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            max_word_count=max_word_count,
+            min_word_count=min_word_count,
+            max_allowable_tokens=max_allowable_tokens,
+            model=model,
+            cache=cache,
+            rewrite_model=rewrite_model
+        )
+        placeholder.empty()
+
+    else:
+        response = generate_text(
+            client,
+            content=content,
+            prompt_name=prompt_name,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            additional_content=additional_content,
+            max_word_count=max_word_count,
+            min_word_count=min_word_count,
+            max_allowable_tokens=max_allowable_tokens,
+            model=model,
+            cache=cache,
+            word_budget=word_budget,
+            rewrite_model=rewrite_model,
+            prompt_layout=prompt_layout
+        )
+
+        container.markdown(result_title)
+
+    container.text_area(
+        label=result_title,
+        value=response,
+        label_visibility="collapsed",
+        height=box_height
+    )
+
+    st.write(f"Word count:  {len(response.split())}")
+
+    return response
+
+
+def show_profile(profiler, container=None):
+    """
+    Show the phase breakdown of a finished `RerunProfiler` in an expander.
+
+    Args:
+        profiler (RerunProfiler): The profiler of the rerun.  Nothing is shown when it is disabled.
+        container (streamlit.container, optional): Where to place the expander. Defaults to the sidebar.
+    """
+
+    if not profiler.enabled or profiler.total_seconds is None:
+        return
+
+    if container is None:
+        container = st.sidebar
+
+    expander = container.expander(f"Rerun profile:  {profiler.total_seconds:.2f} s", expanded=True)
+
+    expander.markdown("Script blocks")
+    expander.dataframe(
+        [
+            {"block": row["block"], "seconds": round(row["seconds"], 3), "share": f"{row['share']:.0%}"}
+            for row in profiler.blocks()
+        ],
+        hide_index=True
+    )
+
+    operations = profiler.operations()
+    if operations:
+        expander.markdown("Operations")
+        expander.dataframe(
+            [
+                {
+                    "operation": row["operation"],
+                    "calls": row["calls"],
+                    "seconds": round(row["seconds"], 3),
+                    "self seconds": round(row["self_seconds"], 3),
+                }
+                for row in operations
+            ],
+            hide_index=True
+        )
+
+    report = profiler.report()
+    if report is not None:
+        expander.markdown(f"{profiler.mode} profile")
+        expander.code(report, language=None)
+
+    if profiler.dump_path is not None:
+        expander.caption(f"Profile written to {profiler.dump_path}")
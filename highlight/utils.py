@@ -1,9 +1,73 @@
+import contextvars
+import re
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from io import BytesIO
+from typing import NamedTuple
+
 import tiktoken
-from tqdm import tqdm
 from pypdf import PdfReader
-import streamlit as st
 
 import highlight.prompts as prompts
+from highlight.cache import extraction_cache_key, get_default_extraction_cache, make_cache_key, resolve_cache
+from highlight.metrics import CallTimer
+from highlight.models import context_window, get_model_info
+from highlight.profiling import profile_phase
+
+
+# process-wide registry of tiktoken encoders keyed by model or encoding name
+_ENCODERS = {}
+_ENCODERS_LOCK = threading.Lock()
+
+
+def get_encoder(model="gpt-4o"):
+    """
+    Return the tiktoken encoder for a model or encoding name, building it only on first use.
+
+    The encoding of models in `highlight.models.MODELS` comes from the registry; other names are resolved by
+    tiktoken.
+
+    Args:
+        model (str): A model name (e.g., "gpt-4o") or a tiktoken encoding name (e.g., "o200k_base").
+                     Default is "gpt-4o".
+
+    Returns:
+        tiktoken.Encoding: The cached encoder.
+    """
+
+    encoder = _ENCODERS.get(model)
+
+    if encoder is None:
+        with _ENCODERS_LOCK:
+            encoder = _ENCODERS.get(model)
+
+            if encoder is None:
+                try:
+                    encoder = tiktoken.get_encoding(get_model_info(model).encoding)
+                except KeyError:
+                    try:
+                        encoder = tiktoken.encoding_for_model(model)
+                    except KeyError:
+                        encoder = tiktoken.get_encoding(model)
+
+                _ENCODERS[model] = encoder
+
+    return encoder
+
+
+def warm_encoders(models=("gpt-4o",)):
+    """
+    Load the encoders for the provided models ahead of time so the first token count does not pay for it.
+
+    Args:
+        models (tuple): Model or encoding names to load. Default is ("gpt-4o",).
+
+    Returns:
+        dict: A dictionary of model name to encoder.
+    """
+
+    return {model: get_encoder(model) for model in models}
 
 
 def get_token_count(text, model="gpt-4o"):
@@ -18,32 +82,108 @@ def get_token_count(text, model="gpt-4o"):
         int: The total number of tokens in the text.
     """
 
-    encoding = tiktoken.encoding_for_model(model)
-    encoded_text = encoding.encode(text)
+    encoded_text = get_encoder(model).encode(text)
     n_text_tokens = len(encoded_text)
 
     return n_text_tokens
 
 
-def read_pdf(file_object: object, reference_indicator: str = "References\n") -> dict:
+def get_token_counts(texts, model="gpt-4o", num_threads=8):
     """
-    Extract text content from a PDF file until a specified reference indicator is encountered.
+    Calculate the number of tokens in each of the provided texts in one batch.
 
     Args:
-        file_object (object): The PDF file object to read from.
-        reference_indicator (str): The string indicating the start of the reference section. Default is "References\n".
+        texts (list): A list of strings to be tokenized.
+        model (str): The model to use for tokenization. Default is "gpt-4o".
+        num_threads (int): The number of threads tiktoken uses to encode the batch. Default is 8.
 
     Returns:
-        dict: A dictionary containing:
-            - content (str): The extracted text content.
-            - n_pages (int): The number of pages read.
-            - n_characters (int): The number of characters in the extracted content.
-            - n_words (int): The number of words in the extracted content.
-            - n_tokens (int): The number of tokens in the extracted content.
+        list: The number of tokens in each text, in the same order as `texts`.
+    """
+
+    encoded_texts = get_encoder(model).encode_batch(list(texts), num_threads=num_threads)
+
+    return [len(encoded_text) for encoded_text in encoded_texts]
+
+
+# PDF reader opened once per extraction worker process
+_WORKER_READER = None
+
+
+def _init_pdf_worker(pdf_bytes):
+    """Open the PDF once in each extraction worker process."""
+
+    global _WORKER_READER
+    _WORKER_READER = PdfReader(BytesIO(pdf_bytes))
+
+
+def _extract_page_range(start, stop, reference_indicator):
+    """Extract the text of pages `start` to `stop` in a worker, stopping at the page with the reference indicator."""
+
+    pages = []
+
+    for page_number in range(start, stop):
+        page_content = _WORKER_READER.pages[page_number].extract_text()
+        pages.append(page_content)
+
+        if reference_indicator in page_content:
+            break
+
+    return pages
+
+
+def _iter_pages_parallel(file_object, reference_indicator, max_workers, pages_per_task):
     """
+    Yield page text in order from a process pool that extracts page ranges, scheduling no further ranges once the
+    page containing the reference indicator has been found.
+    """
+
+    position = file_object.tell()
+    file_object.seek(0)
+    pdf_bytes = file_object.read()
+    file_object.seek(position)
+
+    n_total = len(PdfReader(BytesIO(pdf_bytes)).pages)
+    page_ranges = iter([
+        (start, min(start + pages_per_task, n_total)) for start in range(0, n_total, pages_per_task)
+    ])
+
+    executor = ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_pdf_worker,
+        initargs=(pdf_bytes,)
+    )
+
+    try:
+        # keep every worker busy with one range queued behind it
+        pending = deque()
+        for start, stop in page_ranges:
+            pending.append(executor.submit(_extract_page_range, start, stop, reference_indicator))
+            if len(pending) >= 2 * max_workers:
+                break
+
+        while pending:
 
-    content = ""
-    n_pages = 0
+            for page_content in pending.popleft().result():
+                yield page_content
+
+                if reference_indicator in page_content:
+                    return
+
+            next_range = next(page_ranges, None)
+            if next_range is not None:
+                pending.append(executor.submit(_extract_page_range, *next_range, reference_indicator))
+
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _iter_page_text(file_object, reference_indicator, max_workers=1, pages_per_task=8):
+    """Yield the text of each page in order, stopping after the page that contains the reference indicator."""
+
+    if max_workers > 1:
+        yield from _iter_pages_parallel(file_object, reference_indicator, max_workers, pages_per_task)
+        return
 
     # creating a pdf reader object
     reader = PdfReader(file_object)
@@ -51,27 +191,158 @@ def read_pdf(file_object: object, reference_indicator: str = "References\n") ->
     for page in reader.pages:
 
         page_content = page.extract_text()
+        yield page_content
 
         if reference_indicator in page_content:
-            content += page_content
-            break
+            return
 
-        else:
-            content += page_content
 
-        n_pages += 1
+def iter_pdf_pages(
+    file_object: object,
+    reference_indicator: str = "References\n",
+    max_workers: int = 1,
+    pages_per_task: int = 8,
+    count_tokens: bool = True,
+    model: str = "gpt-4o"
+):
+    """
+    Extract a PDF one page at a time, yielding each page as soon as its text is available.
+
+    Extraction stops after the page that contains the reference indicator, so the reference section is never
+    parsed.  Only the current page is held by the iterator, which keeps memory bounded for very large documents.
+
+    Args:
+        file_object (object): The PDF file object to read from.
+        reference_indicator (str): The string indicating the start of the reference section. Default is "References\n".
+        max_workers (int): The number of processes used to extract pages.  See `read_pdf`. Default is 1.
+        pages_per_task (int): The number of consecutive pages each process extracts per task. Default is 8.
+        count_tokens (bool): Whether to count the tokens of each page. Default is True.
+        model (str): The model to use for tokenization. Default is "gpt-4o".
+
+    Yields:
+        dict: A page record containing:
+            - index (int): The zero-based page index.
+            - text (str): The full extracted text of the page.
+            - content (str): The page text before the reference indicator.
+            - is_reference_page (bool): Whether the page contains the reference indicator.
+            - n_characters (int): The number of characters in `content`.
+            - n_words (int): The number of words in `content`.
+            - n_tokens (int): The number of tokens in `content`, or None if `count_tokens` is False.
+    """
+
+    for index, text in enumerate(_iter_page_text(file_object, reference_indicator, max_workers, pages_per_task)):
+
+        is_reference_page = reference_indicator in text
+        content = text.split(reference_indicator)[0] if is_reference_page else text
+
+        yield {
+            "index": index,
+            "text": text,
+            "content": content,
+            "is_reference_page": is_reference_page,
+            "n_characters": len(content),
+            "n_words": len(content.split()),
+            "n_tokens": get_token_count(content, model) if count_tokens else None,
+        }
+
+
+def content_dict_from_pages(page_records, reference_indicator: str = "References\n") -> dict:
+    """
+    Build the `read_pdf` result from page records produced by `iter_pdf_pages`.
+
+    Args:
+        page_records (iterable): Page records from `iter_pdf_pages`.
+        reference_indicator (str): The string indicating the start of the reference section. Default is "References\n".
+
+    Returns:
+        dict: The same dictionary returned by `read_pdf`.
+    """
+
+    pages = []
+    reference_page = None
+
+    for record in page_records:
+        pages.append(record["text"])
+
+        if record["is_reference_page"]:
+            reference_page = record["index"]
+
+    n_pages = len(pages) if reference_page is None else reference_page
 
-    content = content.split(reference_indicator)[0]
+    content = "".join(pages).split(reference_indicator)[0]
+
+    with profile_phase("token counting"):
+        n_tokens = get_token_count(content)
 
     return {
         "content": content,
         "n_pages": n_pages,
         "n_characters": len(content),
         "n_words": len(content.split(" ")),
-        "n_tokens": get_token_count(content)
+        "n_tokens": n_tokens,
+        "pages": pages,
+        "reference_page": reference_page
     }
 
 
+def read_pdf(
+    file_object: object,
+    reference_indicator: str = "References\n",
+    cache=None,
+    max_workers: int = 1,
+    pages_per_task: int = 8
+) -> dict:
+    """
+    Extract text content from a PDF file until a specified reference indicator is encountered.
+
+    Args:
+        file_object (object): The PDF file object to read from.
+        reference_indicator (str): The string indicating the start of the reference section. Default is "References\n".
+        cache (ExtractionCache or bool, optional): A cache of extraction results keyed by the file's digest, True
+                                                   to use the default in-memory cache, or None to always extract.
+                                                   Default is None.
+        max_workers (int): The number of processes used to extract pages.  Values greater than one extract page
+                           ranges in parallel, which helps for long documents since text extraction is CPU bound.
+                           Default is 1.
+        pages_per_task (int): The number of consecutive pages each process extracts per task. Default is 8.
+
+    Returns:
+        dict: A dictionary containing:
+            - content (str): The extracted text content.
+            - n_pages (int): The number of pages read.
+            - n_characters (int): The number of characters in the extracted content.
+            - n_words (int): The number of words in the extracted content.
+            - n_tokens (int): The number of tokens in the extracted content.
+            - pages (list): The text of each extracted page, through the page containing the reference indicator.
+            - reference_page (int): The index of the page containing the reference indicator, or None.
+    """
+
+    extraction_cache = get_default_extraction_cache() if cache is True else cache
+
+    if extraction_cache is not None:
+        cache_key = extraction_cache_key(file_object, "pdf", reference_indicator)
+        cached_result = extraction_cache.get(cache_key)
+        if cached_result is not None:
+            return cached_result
+
+    with profile_phase("extraction"):
+        result = content_dict_from_pages(
+            iter_pdf_pages(
+                file_object,
+                reference_indicator=reference_indicator,
+                max_workers=max_workers,
+                pages_per_task=pages_per_task,
+                count_tokens=False
+            ),
+            reference_indicator=reference_indicator
+        )
+
+    if extraction_cache is not None:
+        extraction_cache.set(cache_key, result)
+
+    return result
+
+
 def read_text(file_object: object) -> dict:
     """
     Read the content of a text file and return its content along with various metadata.
@@ -87,58 +358,351 @@ def read_text(file_object: object) -> dict:
             - n_words (int): The number of words in the extracted content.
             - n_tokens (int): The number of tokens in the extracted content.
     """
-    content = bytes.decode(file_object.read(), 'utf-8')
+    with profile_phase("extraction"):
+        content = bytes.decode(file_object.read(), 'utf-8')
+
+        with profile_phase("token counting"):
+            n_tokens = get_token_count(content)
 
     return {
         "content": content,
         "n_pages": 1,
         "n_characters": len(content),
         "n_words": len(content.replace("\n", " ").split()),
-        "n_tokens": get_token_count(content)
+        "n_tokens": n_tokens
     }
 
 
+# paragraph and sentence boundaries used by the chunker
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+
+
+class Chunk(NamedTuple):
+    """A token-bounded piece of a document, usable as a `content_reduction` input."""
+
+    page_content: str
+    n_tokens: int
+
+
+def _split_segments(text):
+    """Split text into sentence segments that concatenate back to the text, flagging the last of each paragraph."""
+
+    segments = []
+    position = 0
+
+    for paragraph_match in list(_PARAGRAPH_BREAK.finditer(text)) + [None]:
+        end = len(text) if paragraph_match is None else paragraph_match.end()
+        paragraph = text[position:end]
+
+        sentence_start = 0
+        for sentence_match in _SENTENCE_BREAK.finditer(paragraph):
+            segments.append([paragraph[sentence_start:sentence_match.end()], False])
+            sentence_start = sentence_match.end()
+
+        if sentence_start < len(paragraph):
+            segments.append([paragraph[sentence_start:], False])
+
+        if segments:
+            segments[-1][1] = True
+
+        position = end
+
+    return segments
+
+
+def chunk_text(text: str, chunk_tokens: int = 2000, overlap_tokens: int = 0, model: str = "gpt-4o") -> list:
+    """
+    Split text, such as the content from `read_pdf` or `read_text`, into token-bounded chunks.
+
+    Chunks end on a paragraph boundary when one falls in the back half of the chunk and otherwise on a sentence
+    boundary.  A sentence that is longer than `chunk_tokens` on its own is split on token boundaries.  The text
+    is tokenized once, in a single batch over all sentences.
+
+    Args:
+        text (str): The text content to split.
+        chunk_tokens (int, optional): The maximum number of tokens per chunk. Defaults to 2000.
+        overlap_tokens (int, optional): The maximum number of tokens from the end of a chunk that are repeated
+                                        at the start of the next chunk.  Overlap is made of whole sentences.
+                                        Defaults to 0.
+        model (str, optional): The model to use for tokenization. Defaults to "gpt-4o".
+
+    Returns:
+        list: A list of `Chunk` objects with `page_content` and `n_tokens` attributes.
+
+    Raises:
+        ValueError: If `overlap_tokens` is not smaller than `chunk_tokens`.
+    """
+
+    if overlap_tokens >= chunk_tokens:
+        raise ValueError(f"overlap_tokens ({overlap_tokens}) must be less than chunk_tokens ({chunk_tokens}).")
+
+    encoder = get_encoder(model)
+    segments = _split_segments(text)
+    encoded_segments = encoder.encode_ordinary_batch([segment for segment, _ in segments])
+
+    # (text, n_tokens, ends_paragraph) for each piece no longer than chunk_tokens
+    pieces = []
+    for (segment, ends_paragraph), tokens in zip(segments, encoded_segments):
+        if len(tokens) <= chunk_tokens:
+            pieces.append((segment, len(tokens), ends_paragraph))
+        else:
+            for k in range(0, len(tokens), chunk_tokens):
+                piece_tokens = tokens[k:k + chunk_tokens]
+                is_last = k + chunk_tokens >= len(tokens)
+                pieces.append((encoder.decode(piece_tokens), len(piece_tokens), ends_paragraph and is_last))
+
+    cumulative_tokens = [0]
+    for _, n_tokens, _ in pieces:
+        cumulative_tokens.append(cumulative_tokens[-1] + n_tokens)
+
+    def make_chunk(first, last):
+        return Chunk(
+            page_content="".join(piece[0] for piece in pieces[first:last]),
+            n_tokens=cumulative_tokens[last] - cumulative_tokens[first]
+        )
+
+    chunks = []
+    start = 0  # first piece of the current chunk, including overlap
+    fresh = 0  # first piece of the current chunk that was not carried over as overlap
+    end = 0
+
+    while end < len(pieces):
+
+        if cumulative_tokens[end + 1] - cumulative_tokens[start] <= chunk_tokens:
+            end += 1
+            continue
+
+        # the carried over overlap alone leaves no room for the next piece
+        if end == fresh:
+            start += 1
+            continue
+
+        cut = end
+        for k in range(end, fresh, -1):
+            if pieces[k - 1][2]:
+                if cumulative_tokens[k] - cumulative_tokens[start] >= chunk_tokens // 2:
+                    cut = k
+                break
+
+        chunks.append(make_chunk(start, cut))
+
+        overlap_start = cut
+        while overlap_start > start and cumulative_tokens[cut] - cumulative_tokens[overlap_start - 1] <= overlap_tokens:
+            overlap_start -= 1
+
+        start, fresh, end = overlap_start, cut, cut
+
+    if end > fresh:
+        chunks.append(make_chunk(start, end))
+
+    return chunks
+
+
+def reduction_chunk_tokens(max_allowable_tokens: int, max_output_tokens: int = 4096, prompt_overhead: int = 100) -> int:
+    """
+    Size chunks for `content_reduction`, where each request asks for as many output tokens as the chunk holds.
+
+    Args:
+        max_allowable_tokens (int): The context window of the model used for reduction.
+        max_output_tokens (int, optional): The maximum number of completion tokens the model returns. Defaults to 4096.
+        prompt_overhead (int, optional): Tokens reserved for the system scope and reduction instructions. Defaults to 100.
+
+    Returns:
+        int: The maximum number of tokens per chunk.
+    """
+
+    return max(1, min(max_output_tokens, (max_allowable_tokens - prompt_overhead) // 2))
+
+
 def content_reduction(
     client,
     document_list,
     system_scope,
-    model
+    model,
+    max_workers=1,
+    rate_limiter=None,
+    progress_callback=None,
+    cache=None
 ):
     """
     Reduce the input text by removing irrelevant content.
 
+    Chunks are sent to the API concurrently when `max_workers` is greater than one and the reduced chunks are
+    reassembled in their original order.
+
     Args:
         client (OpenAI): The OpenAI client instance.
         document_list (list): A list of documents to process.
         system_scope (str): The system scope or context for the prompt.
         model (str): The model to use for content reduction.
+        max_workers (int, optional): The maximum number of chunks in flight at once. Defaults to 1.
+        rate_limiter (RateLimiter, optional): A shared request/token budget each chunk acquires before it is
+                                              sent.  Ignored when the client rate limits its own requests,
+                                              e.g., a `RetryingClient` with a `rate_limiter`, so that chunks are
+                                              not charged twice. Defaults to None.
+        progress_callback (callable, optional): Called as `progress_callback(n_completed, n_total)` from the
+                                                calling thread as each chunk finishes, so it is safe to update
+                                                Streamlit elements from it.  Defaults to a tqdm progress bar.
+        cache (ResponseCache or bool, optional): The response cache to use, False to bypass caching, or None
+                                                 to use the default cache. Defaults to None.
 
     Returns:
         str: The content with irrelevant parts removed.
     """
 
-    prompt = """Remove irrelevant content from the following text.\n\n{text}\n\n}"""
+    prompt = """Remove irrelevant content from the following text.\n\n{text}\n\n"""
+
+    page_contents = [document.page_content for document in document_list]
+    page_token_counts = get_token_counts(page_contents)
+    n_total = len(page_contents)
 
-    content = ""
-    for i in tqdm(range(len(document_list))):
-        page_content = document_list[i].page_content
-        page_tokens = get_token_count(page_content)
+    response_cache = resolve_cache(cache, 0.0)
 
+    if getattr(client, "rate_limiter", None) is not None:
+        rate_limiter = None
+
+    def reduce_page(i):
         messages = [
             {"role": "system", "content": system_scope},
-            {"role": "user", "content": prompt.format(text=page_content)}
+            {"role": "user", "content": prompt.format(text=page_contents[i])}
         ]
 
-        response = client.chat.completions.create(
-            model=model,
-            max_tokens=page_tokens,
-            temperature=0.0,
-            messages=messages
-        )
+        timer = CallTimer("reduce_content", model)
 
-        content += response.choices[0].message.content
+        if response_cache is not None:
+            cache_key = make_cache_key(system_scope, messages[-1]["content"], model, page_token_counts[i], 0.0)
+            cached_response = response_cache.get(cache_key)
+            if cached_response is not None:
+                timer.finish(response_cache_hit=True)
+                return cached_response
 
-    return content
+        if rate_limiter is not None:
+            rate_limiter.for_model(model).acquire(2 * page_token_counts[i])
+
+        with timer.request():
+            response = client.chat.completions.create(
+                model=model,
+                max_tokens=page_token_counts[i],
+                temperature=0.0,
+                messages=messages
+            )
+
+        timer.finish(response)
+
+        content = response.choices[0].message.content
+
+        if response_cache is not None:
+            response_cache.set(cache_key, content, model=model)
+
+        return content
+
+    progress_bar = None
+    if progress_callback is None:
+        from tqdm import tqdm
+
+        progress_bar = tqdm(total=n_total)
+        progress_callback = lambda n_completed, n_total: progress_bar.update(1)
+
+    reduced_pages = [None] * n_total
+
+    try:
+        if max_workers <= 1:
+            for i in range(n_total):
+                reduced_pages[i] = reduce_page(i)
+                progress_callback(i + 1, n_total)
+
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                # each page runs in the caller's context so its call reaches the caller's `track_calls` sinks
+                futures = {
+                    executor.submit(contextvars.copy_context().run, reduce_page, i): i for i in range(n_total)
+                }
+
+                try:
+                    for n_completed, future in enumerate(as_completed(futures), start=1):
+                        reduced_pages[futures[future]] = future.result()
+                        progress_callback(n_completed, n_total)
+
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    raise
+
+    finally:
+        if progress_bar is not None:
+            progress_bar.close()
+
+    return "".join(reduced_pages)
+
+
+def check_prompt_tokens(prompt, max_tokens, max_allowable_tokens=None, model="gpt-4o"):
+    """
+    Ensure a prompt plus its requested completion fits within the allowable token count.
+
+    Args:
+        prompt (str): The user prompt that will be sent.
+        max_tokens (int): The maximum number of tokens requested for the completion.
+        max_allowable_tokens (int, optional): The maximum allowable tokens for the prompt and response.
+                                              Defaults to the context window of `model`.
+        model (str, optional): The model the prompt is sent to. Defaults to "gpt-4o".
+
+    Returns:
+        int: The number of prompt tokens plus `max_tokens`.
+
+    Raises:
+        RuntimeError: If the total number of tokens in the prompt and response exceeds max_allowable_tokens.
+    """
+
+    if max_allowable_tokens is None:
+        max_allowable_tokens = context_window(model)
+
+    n_prompt_tokens = get_token_count(prompt, model=model) + max_tokens
+
+    if n_prompt_tokens > max_allowable_tokens:
+        raise RuntimeError((
+            "ERROR:  input text tokens needs to be reduced due to exceeding the maximum "
+            f"allowable tokens per prompt by {n_prompt_tokens - max_allowable_tokens} tokens."
+        ))
+
+    return n_prompt_tokens
+
+
+def build_messages(system_scope: str, prompt: str, prefix: str = None) -> list:
+    """
+    Build the chat messages of a request.
+
+    Args:
+        system_scope (str): The system scope or context for the prompt.
+        prompt (str): The user prompt.
+        prefix (str, optional): A user message sent before `prompt`. Defaults to None.
+
+    Returns:
+        list: The system message, the prefix message if provided, and the prompt message.
+    """
+
+    messages = [{"role": "system", "content": system_scope}]
+
+    if prefix is not None:
+        messages.append({"role": "user", "content": prefix})
+
+    messages.append({"role": "user", "content": prompt})
+
+    return messages
+
+
+def hit_token_limit(choice) -> bool:
+    """
+    Check whether a completion choice, or the last chunk of a streamed one, was cut off by `max_tokens`.
+
+    Args:
+        choice: An item of the `choices` of a chat completion or chunk.
+
+    Returns:
+        bool: True if the finish reason is "length".
+    """
+
+    return getattr(choice, "finish_reason", None) == "length"
 
 
 def generate_prompt_content(
@@ -147,8 +711,12 @@ def generate_prompt_content(
     prompt,
     max_tokens=50,
     temperature=0.0,
-    max_allowable_tokens=8192,
-    model="gpt-4o"
+    max_allowable_tokens=None,
+    model="gpt-4o",
+    cache=None,
+    prefix=None,
+    prompt_name=None,
+    fallback_max_tokens=None
 ):
     """
     Generate content using the OpenAI API based on the provided prompt and parameters.
@@ -159,8 +727,19 @@ def generate_prompt_content(
         prompt (str): The user prompt to generate content from.
         max_tokens (int, optional): The maximum number of tokens to generate. Defaults to 50.
         temperature (float, optional): The sampling temperature. Defaults to 0.0.
-        max_allowable_tokens (int, optional): The maximum allowable tokens for the prompt and response. Defaults to 8192.
+        max_allowable_tokens (int, optional): The maximum allowable tokens for the prompt and response.
+                                              Defaults to the context window of `model`.
         model (str, optional): The model to use for content generation. Defaults to "gpt-4o".
+        cache (ResponseCache or bool, optional): The response cache to use, True to use the default cache,
+                                                 False to bypass caching, or None to use the default cache
+                                                 only when temperature is 0.0. Defaults to None.
+        prefix (str, optional): A user message sent before `prompt`, such as the document in the shared prefix
+                                layout (see `build_prompt_parts`). Defaults to None.
+        prompt_name (str, optional): The name the call is recorded under in the metrics, see `CallTimer`.
+                                     Defaults to None.
+        fallback_max_tokens (int, optional): A larger limit to request the response again with when it is cut
+                                             off at `max_tokens`, e.g., the limit before a word budget lowered
+                                             it.  The complete response is what is cached. Defaults to None.
 
     Returns:
         str: The generated content.
@@ -169,67 +748,315 @@ def generate_prompt_content(
         RuntimeError: If the total number of tokens in the prompt and response exceeds max_allowable_tokens.
     """
 
-    n_prompt_tokens = get_token_count(prompt) + max_tokens
+    full_prompt = prompt if prefix is None else f"{prefix}\n{prompt}"
+    check_prompt_tokens(full_prompt, max_tokens, max_allowable_tokens, model=model)
 
-    if n_prompt_tokens > max_allowable_tokens:
-        raise RuntimeError((
-            f"ERROR:  input text tokens needs to be reduced due to exceeding the maximum ",
-            " allowable tokens per prompt by {n_prompt_tokens - max_allowable_tokens} tokens."
-        ))
+    timer = CallTimer(prompt_name, model)
+    response_cache = resolve_cache(cache, temperature)
 
-    messages = [
-        {"role": "system", "content": system_scope},
-        {"role": "user", "content": prompt}
-    ]
+    if response_cache is not None:
+        key_prompt = prompt if prefix is None else [prefix, prompt]
+        cache_key = make_cache_key(system_scope, key_prompt, model, max_tokens, temperature)
+        cached_content = response_cache.get(cache_key)
+        if cached_content is not None:
+            timer.finish(response_cache_hit=True)
+            return cached_content
 
-    response = client.chat.completions.create(
-        model=model,
-        max_tokens=max_tokens,
-        temperature=temperature,
-        messages=messages
-    )
+    messages = build_messages(system_scope, prompt, prefix=prefix)
+
+    with timer.request():
+        response = client.chat.completions.create(
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            messages=messages
+        )
+
+    timer.finish(response)
 
     content = response.choices[0].message.content
 
+    # a response cut off mid-sentence by a lowered limit is generated again rather than trimmed or rewritten
+    if fallback_max_tokens is not None and fallback_max_tokens > max_tokens and hit_token_limit(response.choices[0]):
+        content = generate_prompt_content(
+            client,
+            system_scope,
+            prompt,
+            max_tokens=fallback_max_tokens,
+            temperature=temperature,
+            max_allowable_tokens=max_allowable_tokens,
+            model=model,
+            cache=cache,
+            prefix=prefix,
+            prompt_name=prompt_name
+        )
+
+    if response_cache is not None:
+        response_cache.set(cache_key, content, model=model)
+
     return content
 
 
-def generate_content(
+def stream_prompt_content(
+    client,
+    system_scope,
+    prompt,
+    max_tokens=50,
+    temperature=0.0,
+    max_allowable_tokens=None,
+    model="gpt-4o",
+    cache=None,
+    prefix=None,
+    prompt_name=None,
+    fallback_max_tokens=None
+):
+    """
+    Generate content like `generate_prompt_content`, yielding the text as it arrives from a streamed completion.
+
+    A cached response is yielded as a single chunk.  The assembled response is stored in the cache once the
+    stream completes and is also the generator's return value, so `yield from` returns it to the caller.  When
+    the stream is cut off at `max_tokens` and `fallback_max_tokens` is given, the response is generated again
+    with the larger limit; the return value is then that complete response rather than the streamed text.
+
+    Args:
+        client (OpenAI): The OpenAI client instance.
+        system_scope (str): The system scope or context for the prompt.
+        prompt (str): The user prompt to generate content from.
+        max_tokens (int, optional): The maximum number of tokens to generate. Defaults to 50.
+        temperature (float, optional): The sampling temperature. Defaults to 0.0.
+        max_allowable_tokens (int, optional): The maximum allowable tokens for the prompt and response.
+                                              Defaults to the context window of `model`.
+        model (str, optional): The model to use for content generation. Defaults to "gpt-4o".
+        cache (ResponseCache or bool, optional): The response cache to use.  See `generate_prompt_content`.
+                                                 Defaults to None.
+        prefix (str, optional): A user message sent before `prompt`.  See `generate_prompt_content`.
+                                Defaults to None.
+        prompt_name (str, optional): The name the call is recorded under in the metrics.  Defaults to None.
+        fallback_max_tokens (int, optional): A larger limit to generate the response again with when the
+                                             stream is cut off at `max_tokens`. Defaults to None.
+
+    Yields:
+        str: Pieces of the generated content.
+
+    Raises:
+        RuntimeError: If the total number of tokens in the prompt and response exceeds max_allowable_tokens.
+    """
+
+    full_prompt = prompt if prefix is None else f"{prefix}\n{prompt}"
+    check_prompt_tokens(full_prompt, max_tokens, max_allowable_tokens, model=model)
+
+    timer = CallTimer(prompt_name, model)
+    response_cache = resolve_cache(cache, temperature)
+
+    if response_cache is not None:
+        key_prompt = prompt if prefix is None else [prefix, prompt]
+        cache_key = make_cache_key(system_scope, key_prompt, model, max_tokens, temperature)
+        cached_content = response_cache.get(cache_key)
+        if cached_content is not None:
+            timer.finish(response_cache_hit=True)
+            yield cached_content
+            return cached_content
+
+    messages = build_messages(system_scope, prompt, prefix=prefix)
+
+    with timer.request():
+        stream = client.chat.completions.create(
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+
+    pieces = []
+    usage_chunk = None
+    truncated = False
+    try:
+        for chunk in stream:
+            # the final chunk carries the usage of the whole request and no choices
+            if not chunk.choices:
+                usage_chunk = chunk
+                continue
+
+            truncated = truncated or hit_token_limit(chunk.choices[0])
+
+            delta = chunk.choices[0].delta.content
+            if delta:
+                timer.first_token()
+                pieces.append(delta)
+                yield delta
+    except Exception as error:
+        # the connection can also fail while the stream is read
+        timer.finish(error=error)
+        raise
+
+    timer.finish(usage_chunk)
+
+    content = "".join(pieces)
+
+    if fallback_max_tokens is not None and fallback_max_tokens > max_tokens and truncated:
+        content = generate_prompt_content(
+            client,
+            system_scope,
+            prompt,
+            max_tokens=fallback_max_tokens,
+            temperature=temperature,
+            max_allowable_tokens=max_allowable_tokens,
+            model=model,
+            cache=cache,
+            prefix=prefix,
+            prompt_name=prompt_name
+        )
+
+    if response_cache is not None:
+        response_cache.set(cache_key, content, model=model)
+
+    return content
+
+
+def tokens_per_word(text: str, model: str = "gpt-4o", sample_words: int = 2000) -> float:
+    """
+    Estimate the number of tokens per word for text like the provided sample.
+
+    Args:
+        text (str): Representative text, e.g., the document the response is generated from.
+        model (str, optional): The model whose tokenizer is used. Defaults to "gpt-4o".
+        sample_words (int, optional): The number of leading words used for the estimate. Defaults to 2000.
+
+    Returns:
+        float: The estimated tokens per word, or 4/3 (typical English prose) if the text has no words.
+    """
+
+    words = text.split()[:sample_words]
+
+    if not words:
+        return 4 / 3
+
+    return get_token_count(" ".join(words), model=model) / len(words)
+
+
+def word_budget_tokens(max_word_count: int, tokens_per_word: float = 4 / 3, slack: float = 1.2) -> int:
+    """
+    Size `max_tokens` for a response with a target maximum word count.
+
+    A response that runs past the target is cut off a little over it, where `trim_to_word_count` can usually
+    bring it back under the limit without another request.
+
+    Args:
+        max_word_count (int): The maximum word count for the response.
+        tokens_per_word (float, optional): The estimated tokens per word, see `tokens_per_word`. Defaults to 4/3.
+        slack (float, optional): The allowance over the target so that the last sentence can finish.
+                                 Defaults to 1.2.
+
+    Returns:
+        int: The number of completion tokens to request.
+    """
+
+    return max(1, int(max_word_count * tokens_per_word * slack + 0.5))
+
+
+def trim_to_word_count(text: str, max_word_count: int, min_word_count: int = 0, max_overshoot: float = 0.3):
+    """
+    Drop whole sentences from the end of a response until it is within the maximum word count.
+
+    Args:
+        text (str): The response to trim.
+        max_word_count (int): The maximum word count.
+        min_word_count (int, optional): The minimum word count of the trimmed response. Defaults to 0.
+        max_overshoot (float, optional): The largest fraction over `max_word_count` that is trimmed locally.
+                                         Longer responses need a rewrite to keep their content. Defaults to 0.3.
+
+    Returns:
+        str: The trimmed response, `text` unchanged if it is already within the limit, or None if it cannot be
+             trimmed to between `min_word_count` and `max_word_count` words.
+    """
+
+    n_words = len(text.split())
+
+    if n_words <= max_word_count:
+        return text
+
+    if n_words > max_word_count * (1 + max_overshoot):
+        return None
+
+    kept = ""
+    n_kept = 0
+    start = 0
+    text = text.strip()
+
+    for match in list(_SENTENCE_BREAK.finditer(text)) + [None]:
+        end = len(text) if match is None else match.start()
+        sentence = text[start:end]
+        n_sentence = len(sentence.split())
+
+        if n_kept + n_sentence > max_word_count:
+            break
+
+        kept = text[:end]
+        n_kept += n_sentence
+
+        if match is not None:
+            start = match.end()
+
+    if n_kept == 0 or n_kept < min_word_count:
+        return None
+
+    return kept
+
+
+def generate_text(
     client,
-    container,
     content,
     prompt_name="title",
-    result_title="Title Result:",
     max_tokens=50,
     temperature=0.0,
-    box_height=200,
     additional_content=None,
     max_word_count=100,
     min_word_count=75,
-    max_allowable_tokens: int = 150000,
-    model="gpt-4o"
+    max_allowable_tokens: int = None,
+    model="gpt-4o",
+    cache=None,
+    word_budget=False,
+    rewrite_model=None,
+    prompt_layout="inline"
 ):
     """
-    Generate content using the OpenAI API based on the provided parameters and display it in a Streamlit container.
+    Generate the response for a prompt, shortening it when it exceeds the maximum word count.
 
     Args:
-        container (streamlit.container): The Streamlit container to display the generated content.
+        client (OpenAI): The OpenAI client instance.
         content (str): The text content to be used for generating the prompt.
         prompt_name (str, optional): The name of the prompt to use. Defaults to "title".
-        result_title (str, optional): The title to display above the generated content. Defaults to "Title Result:".
         max_tokens (int, optional): The maximum number of tokens to generate. Defaults to 50.
         temperature (float, optional): The sampling temperature. Defaults to 0.0.
-        box_height (int, optional): The height of the text area box to display the generated content. Defaults to 200.
         additional_content (str, optional): Additional content to include in the prompt. Defaults to None.
         max_word_count (int, optional): The maximum word count for the generated content. Defaults to 100.
         min_word_count (int, optional): The minimum word count for the generated content. Defaults to 75.
-        max_allowable_tokens (int, optional): The maximum allowable tokens for the content. Defaults to 150000.
+        max_allowable_tokens (int, optional): The maximum allowable tokens for the content.
+                                              Defaults to the context window of `model`.
         model (str, optional): The model to use for content generation. Defaults to "gpt-4o".
+        cache (ResponseCache or bool, optional): The response cache to use for the generation and word count
+                                                 reduction requests.  See `generate_prompt_content`.
+                                                 Defaults to None.
+        word_budget (bool, optional): Lower `max_tokens` to what `max_word_count` words need, estimated with
+                                      the tokenizer from `content`.  A response cut off at the lowered limit is
+                                      generated again with `max_tokens`. Defaults to False.
+        rewrite_model (str, optional): The model used to rewrite a response that is too long.  See
+                                       `reduce_word_count`. Defaults to None.
+        prompt_layout (str, optional): "inline" formats the content into the prompt; "shared_prefix" sends it
+                                       first as a stable prefix.  See `build_prompt_parts`. Defaults to "inline".
 
     Returns:
         str: The generated content.
     """
 
+    # a response cut off by the word budget is generated again with the requested limit
+    fallback_max_tokens = None
+    if word_budget:
+        fallback_max_tokens = max_tokens
+        max_tokens = min(max_tokens, word_budget_tokens(max_word_count, tokens_per_word(content, model=model)))
+
     response = generate_prompt(
         client,
         content=content,
@@ -238,73 +1065,117 @@ def generate_content(
         max_tokens=max_tokens,
         max_allowable_tokens=max_allowable_tokens,
         additional_content=additional_content,
-        model=model
+        model=model,
+        cache=cache,
+        prompt_layout=prompt_layout,
+        fallback_max_tokens=fallback_max_tokens
     )
 
-    container.markdown(result_title)
+    return reduce_word_count(
+        client,
+        response,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        max_word_count=max_word_count,
+        min_word_count=min_word_count,
+        max_allowable_tokens=max_allowable_tokens,
+        model=model,
+        cache=cache,
+        rewrite_model=rewrite_model
+    )
 
-    word_count = len(response.split())
 
-    if word_count > max_word_count:
+def reduce_word_count(
+    client,
+    response,
+    max_tokens=50,
+    temperature=0.0,
+    max_word_count=100,
+    min_word_count=75,
+    max_allowable_tokens: int = None,
+    model="gpt-4o",
+    cache=None,
+    rewrite_model=None,
+    max_overshoot=0.3
+):
+    """
+    Shorten a response that exceeds the maximum word count.
 
-        # construct word count reduction prompt
-        reduction_prompt = prompts.prompt_queue["reduce_wordcount"].format(min_word_count, max_word_count, response)
+    A small overshoot is trimmed locally by dropping sentences from the end (see `trim_to_word_count`).  Only
+    when that is not possible is the `reduce_wordcount` prompt sent to the model.
 
-        messages = [
-            {"role": "system", "content": prompts.prompt_queue["system"]},
-            {"role": "user", "content": reduction_prompt}
-        ]
+    Args:
+        client (OpenAI): The OpenAI client instance.
+        response (str): The generated response.
+        max_tokens (int, optional): The maximum number of tokens to generate. Defaults to 50.
+        temperature (float, optional): The sampling temperature. Defaults to 0.0.
+        max_word_count (int, optional): The maximum word count for the generated content. Defaults to 100.
+        min_word_count (int, optional): The minimum word count for the generated content. Defaults to 75.
+        max_allowable_tokens (int, optional): The maximum allowable tokens for the content.
+                                              Defaults to the context window of `model`.
+        model (str, optional): The model to use for content generation. Defaults to "gpt-4o".
+        cache (ResponseCache or bool, optional): The response cache to use.  See `generate_prompt_content`.
+                                                 Defaults to None.
+        rewrite_model (str, optional): The model used for the rewrite, e.g., a cheaper model than the one that
+                                       generated the response. Defaults to `model`.
+        max_overshoot (float, optional): The largest fraction over `max_word_count` that is trimmed locally.
+                                         0 always rewrites. Defaults to 0.3.
 
-        reduced_response = client.chat.completions.create(
-            model=model,
-            max_tokens=max_tokens,
-            temperature=temperature,
-            messages=messages
-        )
+    Returns:
+        str: The shortened response, or `response` unchanged if it is within the maximum word count.
+    """
 
-        response = reduced_response.choices[0].message.content
+    if len(response.split()) <= max_word_count:
+        return response
 
-    container.text_area(
-        label=result_title,
-        value=response,
-        label_visibility="collapsed",
-        height=box_height
-    )
+    trimmed = trim_to_word_count(response, max_word_count, min_word_count, max_overshoot=max_overshoot)
+    if trimmed is not None:
+        return trimmed
 
-    st.write(f"Word count:  {len(response.split())}")
+    # construct word count reduction prompt
+    reduction_prompt = prompts.prompt_queue["reduce_wordcount"].format(min_word_count, max_word_count, response)
 
-    return response
+    return generate_prompt_content(
+        client=client,
+        system_scope=prompts.prompt_queue["system"],
+        prompt=reduction_prompt,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        max_allowable_tokens=max_allowable_tokens,
+        model=rewrite_model or model,
+        cache=cache,
+        prompt_name="reduce_wordcount"
+    )
 
 
-def generate_prompt(
-    client,
+def build_prompt(
     content: str,
     prompt_name: str = "title",
-    max_tokens: int = 50,
-    max_allowable_tokens: int = 150000,
-    temperature: float = 0.0,
     additional_content: str = None,
-    model: str = "gpt-4"
+    prompt_queue: dict = None
 ) -> str:
     """
-    Generate a prompt using the provided parameters and the prompt queue.
+    Format the named prompt from the prompt queue with the provided content.
 
     Args:
-        client: The OpenAI client to use for generating the prompt.
         content (str): The main text content to be used in the prompt.
         prompt_name (str, optional): The name of the prompt to use. Defaults to "title".
-        max_tokens (int, optional): The maximum number of tokens to generate. Defaults to 50.
-        max_allowable_tokens (int, optional): The maximum allowable tokens for the content. Defaults to 150000.
-        temperature (float, optional): The sampling temperature. Defaults to 0.0.
         additional_content (str, optional): Additional content to include in the prompt. Defaults to None.
-        model (str, optional): The model to use for content generation. Defaults to "gpt-4".
+        prompt_queue (dict, optional): The prompts to format, e.g., from `shared_prefix_prompt`.
+                                       Defaults to `prompts.prompt_queue`.
 
     Returns:
-        str: The generated prompt.
+        str: The formatted prompt.
+
+    Raises:
+        KeyError: If `prompt_name` is not a section prompt.
     """
 
+    if prompt_queue is None:
+        prompt_queue = prompts.prompt_queue
+
     if prompt_name in ("objective",):
-        prompt = prompts.prompt_queue[prompt_name].format(
+        prompt = prompt_queue[prompt_name].format(
             prompts.EXAMPLE_TEXT_ONE, 
             prompts.EXAMPLE_TEXT_TWO, 
             content
@@ -313,7 +1184,7 @@ def generate_prompt(
     elif prompt_name in ("approach",):
         if additional_content is None:
             additional_content = content
-        prompt = prompts.prompt_queue[prompt_name].format(
+        prompt = prompt_queue[prompt_name].format(
             content, 
             additional_content
         )
@@ -321,7 +1192,7 @@ def generate_prompt(
     elif prompt_name in ("subtitle",):
         if additional_content is None:
             additional_content = content
-        prompt = prompts.prompt_queue[prompt_name].format(
+        prompt = prompt_queue[prompt_name].format(
             content, 
             additional_content
         )
@@ -339,7 +1210,135 @@ def generate_prompt(
         "citation",
         "funding"
     ):
-        prompt = prompts.prompt_queue[prompt_name].format(content)
+        prompt = prompt_queue[prompt_name].format(content)
+
+    else:
+        raise KeyError(f"Unknown prompt name:  '{prompt_name}'")
+
+    return prompt
+
+
+# ways of assembling a section request, see `build_prompt_parts`
+PROMPT_LAYOUTS = ("inline", "shared_prefix")
+
+# the input block that ends each section prompt, e.g., "```{0}```" or "TEXT: {0}" followed by "RESPONSE:"
+_TRAILING_INPUT = re.compile(r"(?:```\{\d\}```|TEXT: \{\d\})(?=\s*(?:RESPONSE:)?\s*$)")
+
+
+def shared_prefix_prompt(prompt: str) -> str:
+    """
+    Adapt a section prompt to the shared prefix layout by replacing the input block at its end with a reference
+    to the document sent in the previous message.
+
+    Args:
+        prompt (str): A section prompt from `prompts.prompt_queue`.
+
+    Returns:
+        str: The prompt template without the document's placeholder.
+
+    Raises:
+        ValueError: If the prompt does not end with an input block.
+    """
+
+    prompt, n_replaced = _TRAILING_INPUT.subn(prompts.DOCUMENT_REFERENCE, prompt)
+
+    if n_replaced != 1:
+        raise ValueError("The prompt does not end with an input block")
+
+    return prompt
+
+
+def build_prompt_parts(
+    content: str,
+    prompt_name: str = "title",
+    additional_content: str = None,
+    prompt_layout: str = "inline"
+) -> tuple:
+    """
+    Assemble the user messages of a section request.
+
+    With the "inline" layout the content is formatted into the section prompt, as in `build_prompt`.  With the
+    "shared_prefix" layout the content is sent first in its own message and the section prompt refers to that
+    message instead of holding the content (see `shared_prefix_prompt`), so every section request for a
+    document starts with the same system scope and document.  Providers that cache prompt
+    prefixes then only process the document once across sections.
+
+    Args:
+        content (str): The main text content to be used in the prompt.
+        prompt_name (str, optional): The name of the prompt to use. Defaults to "title".
+        additional_content (str, optional): Additional content to include in the prompt. Defaults to None.
+        prompt_layout (str, optional): One of `PROMPT_LAYOUTS`. Defaults to "inline".
+
+    Returns:
+        tuple: The prefix message (None for the inline layout) and the prompt.
+
+    Raises:
+        ValueError: If `prompt_layout` is not one of `PROMPT_LAYOUTS`.
+    """
+
+    if prompt_layout == "inline":
+        return None, build_prompt(content, prompt_name=prompt_name, additional_content=additional_content)
+
+    if prompt_layout == "shared_prefix":
+        if prompt_name not in prompts.prompt_queue:
+            raise KeyError(f"Unknown prompt name:  '{prompt_name}'")
+
+        # the prompt leaves out the document's placeholder, so only additional content is formatted in
+        prompt = build_prompt(
+            content,
+            prompt_name=prompt_name,
+            additional_content=additional_content,
+            prompt_queue={prompt_name: shared_prefix_prompt(prompts.prompt_queue[prompt_name])}
+        )
+        return prompts.DOCUMENT_PREFIX.format(content), prompt
+
+    raise ValueError(f"Unknown prompt layout:  '{prompt_layout}'.  Use one of {PROMPT_LAYOUTS}")
+
+
+def generate_prompt(
+    client,
+    content: str,
+    prompt_name: str = "title",
+    max_tokens: int = 50,
+    max_allowable_tokens: int = None,
+    temperature: float = 0.0,
+    additional_content: str = None,
+    model: str = "gpt-4o",
+    cache=None,
+    prompt_layout: str = "inline",
+    fallback_max_tokens: int = None
+) -> str:
+    """
+    Generate a prompt using the provided parameters and the prompt queue.
+
+    Args:
+        client: The OpenAI client to use for generating the prompt.
+        content (str): The main text content to be used in the prompt.
+        prompt_name (str, optional): The name of the prompt to use. Defaults to "title".
+        max_tokens (int, optional): The maximum number of tokens to generate. Defaults to 50.
+        max_allowable_tokens (int, optional): The maximum allowable tokens for the content.
+                                              Defaults to the context window of `model`.
+        temperature (float, optional): The sampling temperature. Defaults to 0.0.
+        additional_content (str, optional): Additional content to include in the prompt. Defaults to None.
+        model (str, optional): The model to use for content generation. Defaults to "gpt-4o".
+        cache (ResponseCache or bool, optional): The response cache to use.  See `generate_prompt_content`.
+                                                 Defaults to None.
+        prompt_layout (str, optional): "inline" formats the content into the prompt; "shared_prefix" sends it
+                                       first as a stable prefix.  See `build_prompt_parts`. Defaults to "inline".
+        fallback_max_tokens (int, optional): A larger limit to request the response again with when it is cut
+                                             off at `max_tokens`.  See `generate_prompt_content`.
+                                             Defaults to None.
+
+    Returns:
+        str: The generated prompt.
+    """
+
+    prefix, prompt = build_prompt_parts(
+        content,
+        prompt_name=prompt_name,
+        additional_content=additional_content,
+        prompt_layout=prompt_layout
+    )
 
     return generate_prompt_content(
         client=client,
@@ -348,5 +1347,69 @@ def generate_prompt(
         max_tokens=max_tokens,
         temperature=temperature,
         max_allowable_tokens=max_allowable_tokens,
-        model=model
+        model=model,
+        cache=cache,
+        prefix=prefix,
+        prompt_name=prompt_name,
+        fallback_max_tokens=fallback_max_tokens
+    )
+
+
+def stream_prompt(
+    client,
+    content: str,
+    prompt_name: str = "title",
+    max_tokens: int = 50,
+    max_allowable_tokens: int = None,
+    temperature: float = 0.0,
+    additional_content: str = None,
+    model: str = "gpt-4o",
+    cache=None,
+    prompt_layout: str = "inline",
+    fallback_max_tokens: int = None
+):
+    """
+    Stream the response to a named prompt, see `generate_prompt` and `stream_prompt_content`.
+
+    Args:
+        client: The OpenAI client to use for generating the prompt.
+        content (str): The main text content to be used in the prompt.
+        prompt_name (str, optional): The name of the prompt to use. Defaults to "title".
+        max_tokens (int, optional): The maximum number of tokens to generate. Defaults to 50.
+        max_allowable_tokens (int, optional): The maximum allowable tokens for the content.
+                                              Defaults to the context window of `model`.
+        temperature (float, optional): The sampling temperature. Defaults to 0.0.
+        additional_content (str, optional): Additional content to include in the prompt. Defaults to None.
+        model (str, optional): The model to use for content generation. Defaults to "gpt-4o".
+        cache (ResponseCache or bool, optional): The response cache to use.  See `generate_prompt_content`.
+                                                 Defaults to None.
+        prompt_layout (str, optional): "inline" formats the content into the prompt; "shared_prefix" sends it
+                                       first as a stable prefix.  See `build_prompt_parts`. Defaults to "inline".
+        fallback_max_tokens (int, optional): A larger limit to request the response again with when it is cut
+                                             off at `max_tokens`.  See `generate_prompt_content`.
+                                             Defaults to None.
+
+    Yields:
+        str: Pieces of the generated content.  The assembled content is the generator's return value.
+    """
+
+    prefix, prompt = build_prompt_parts(
+        content,
+        prompt_name=prompt_name,
+        additional_content=additional_content,
+        prompt_layout=prompt_layout
     )
+
+    return (yield from stream_prompt_content(
+        client=client,
+        system_scope=prompts.SYSTEM_SCOPE,
+        prompt=prompt,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        max_allowable_tokens=max_allowable_tokens,
+        model=model,
+        cache=cache,
+        prefix=prefix,
+        prompt_name=prompt_name,
+        fallback_max_tokens=fallback_max_tokens
+    ))
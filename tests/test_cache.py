@@ -0,0 +1,168 @@
+import os
+import tempfile
+import time
+import unittest
+from io import BytesIO
+from types import SimpleNamespace
+from unittest.mock import Mock, PropertyMock, patch
+
+from pypdf import PdfReader, PdfWriter
+
+import highlight as hlt
+from highlight.cache import ExtractionCache, ResponseCache, file_digest, make_cache_key, resolve_cache
+
+
+def fake_completion(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "responses.sqlite3")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_make_cache_key(self):
+        key = make_cache_key("scope", "prompt", "gpt-4o", 50, 0.0)
+
+        self.assertEqual(key, make_cache_key("scope", "prompt", "gpt-4o", 50, 0))
+        self.assertNotEqual(key, make_cache_key("scope", "prompt", "gpt-4o", 51, 0.0))
+        self.assertNotEqual(key, make_cache_key("scope", "prompt", "gpt-4", 50, 0.0))
+
+    def test_get_set(self):
+        cache = ResponseCache(self.path)
+
+        self.assertIsNone(cache.get("key"))
+        cache.set("key", "value")
+        self.assertEqual(cache.get("key"), "value")
+        self.assertEqual(ResponseCache(self.path).get("key"), "value")
+
+    def test_evicts_least_recently_used(self):
+        cache = ResponseCache(self.path, max_entries=2)
+
+        cache.set("a", "1")
+        time.sleep(0.01)
+        cache.set("b", "2")
+        time.sleep(0.01)
+        cache.get("a")
+        time.sleep(0.01)
+        cache.set("c", "3")
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "1")
+
+    def test_evicts_by_size(self):
+        cache = ResponseCache(self.path, max_bytes=10)
+
+        cache.set("a", "x" * 8)
+        time.sleep(0.01)
+        cache.set("b", "y" * 8)
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), "y" * 8)
+
+    def test_expires_by_age(self):
+        cache = ResponseCache(self.path, max_age_seconds=0.01)
+
+        cache.set("a", "1")
+        time.sleep(0.02)
+
+        self.assertIsNone(cache.get("a"))
+
+    def test_resolve_cache(self):
+        cache = ResponseCache(self.path)
+
+        self.assertIs(resolve_cache(cache, 0.7), cache)
+        self.assertIsNone(resolve_cache(False, 0.0))
+        self.assertIsNone(resolve_cache(None, 0.7))
+
+        with patch.dict(os.environ, {"HIGHLIGHT_DISABLE_CACHE": "1"}):
+            self.assertIsNone(resolve_cache(None, 0.0))
+
+
+class TestGeneratePromptContentCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(os.path.join(self.tmp_dir.name, "responses.sqlite3"))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_generate_prompt_content_uses_cache(self):
+        client = Mock()
+        client.chat.completions.create.return_value = fake_completion("A Title")
+
+        for _ in range(2):
+            content = hlt.generate_prompt_content(client, "scope", "prompt", cache=self.cache)
+
+        self.assertEqual(content, "A Title")
+        self.assertEqual(client.chat.completions.create.call_count, 1)
+
+    def test_generate_prompt_content_bypass(self):
+        client = Mock()
+        client.chat.completions.create.return_value = fake_completion("A Title")
+
+        for _ in range(2):
+            hlt.generate_prompt_content(client, "scope", "prompt", cache=False)
+
+        self.assertEqual(client.chat.completions.create.call_count, 2)
+
+
+class TestExtractionCache(unittest.TestCase):
+    def test_file_digest_keeps_position(self):
+        file_object = BytesIO(b"some pdf bytes")
+        file_object.seek(4)
+
+        self.assertEqual(file_digest(file_object), file_digest(BytesIO(b"some pdf bytes")))
+        self.assertEqual(file_object.tell(), 4)
+
+    def test_lru_eviction(self):
+        cache = ExtractionCache(max_items=2)
+
+        cache.set("a", {"content": "a"})
+        cache.set("b", {"content": "b"})
+        cache.get("a")
+        cache.set("c", {"content": "c"})
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), {"content": "a"})
+
+    def test_results_are_copies(self):
+        cache = ExtractionCache()
+        value = {"content": "a", "pages": ["a"]}
+
+        cache.set("a", value)
+        value["pages"].append("b")
+        cache.get("a")["pages"].append("c")
+
+        self.assertEqual(cache.get("a"), {"content": "a", "pages": ["a"]})
+
+    def test_disk_tier(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            ExtractionCache(disk_dir=tmp_dir).set("a", {"content": "a", "pages": ["a"]})
+
+            self.assertEqual(ExtractionCache(disk_dir=tmp_dir).get("a"), {"content": "a", "pages": ["a"]})
+
+    def test_read_pdf_uses_cache(self):
+        cache = ExtractionCache()
+
+        writer = PdfWriter()
+        writer.add_blank_page(width=612, height=792)
+        buffer = BytesIO()
+        writer.write(buffer)
+        pdf_bytes = buffer.getvalue()
+
+        with patch.object(PdfReader, "pages", new_callable=PropertyMock) as mock_pages:
+            mock_page = Mock()
+            mock_page.extract_text.return_value = "Hello World"
+            mock_pages.return_value = [mock_page]
+
+            first = hlt.read_pdf(BytesIO(pdf_bytes), cache=cache)
+            second = hlt.read_pdf(BytesIO(pdf_bytes), cache=cache)
+            hlt.read_pdf(BytesIO(pdf_bytes), reference_indicator="Bibliography\n", cache=cache)
+
+        self.assertEqual(first, second)
+        self.assertEqual(mock_page.extract_text.call_count, 2)
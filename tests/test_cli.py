@@ -0,0 +1,119 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+from docx import Document
+from pptx import Presentation
+
+from highlight import cli
+
+
+class FakeAsyncClient:
+    """Stand-in for AsyncOpenAI that answers every prompt with a short response."""
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model, max_tokens, temperature, messages):
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="- point one\n- point two"))])
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        # keep the default response cache out of the user's home directory
+        environment = patch.dict(os.environ, {"HIGHLIGHT_DISABLE_CACHE": "1"})
+        environment.start()
+        self.addCleanup(environment.stop)
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.input_dir = os.path.join(self.tmp_dir.name, "papers")
+        self.output_dir = os.path.join(self.tmp_dir.name, "out")
+        os.makedirs(self.input_dir)
+
+        for name in ("paper_a.txt", "paper_b.txt", "notes.md"):
+            with open(os.path.join(self.input_dir, name), "w") as paper:
+                paper.write("Some research content.")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_discover_documents_directory(self):
+        documents = cli.discover_documents(self.input_dir)
+
+        self.assertEqual([os.path.basename(path) for path in documents], ["paper_a.txt", "paper_b.txt"])
+
+    def test_discover_documents_manifest(self):
+        manifest = os.path.join(self.tmp_dir.name, "manifest.txt")
+        with open(manifest, "w") as manifest_file:
+            manifest_file.write("# papers\npapers/paper_b.txt\n\n")
+
+        self.assertEqual(cli.discover_documents(manifest), [os.path.join(self.tmp_dir.name, "papers/paper_b.txt")])
+
+    def test_run_batch_writes_outputs_and_resumes(self):
+        statuses = cli.run_batch(self.input_dir, self.output_dir, client_factory=FakeAsyncClient, max_documents=2)
+
+        self.assertEqual(sorted(statuses.values()), ["done", "done"])
+
+        for stem in ("paper_a", "paper_b"):
+            for extension in ("docx", "pptx", "json"):
+                self.assertTrue(os.path.exists(os.path.join(self.output_dir, f"{stem}.{extension}")))
+
+        document = Document(os.path.join(self.output_dir, "paper_a.docx"))
+        self.assertIn("point one", "\n".join(paragraph.text for paragraph in document.paragraphs))
+
+        slide_text = [
+            shape.text_frame.text
+            for shape in Presentation(os.path.join(self.output_dir, "paper_a.pptx")).slides[0].shapes
+            if shape.has_text_frame
+        ]
+        self.assertNotIn("objective_0", slide_text)
+
+        statuses = cli.run_batch(self.input_dir, self.output_dir, client_factory=FakeAsyncClient)
+        self.assertEqual(sorted(statuses.values()), ["skipped", "skipped"])
+
+    def test_run_batch_reports_failures(self):
+        with patch.object(cli, "read_document", side_effect=ValueError("unreadable")):
+            statuses = cli.run_batch(self.input_dir, self.output_dir, client_factory=FakeAsyncClient)
+
+        self.assertTrue(all(status.startswith("error") for status in statuses.values()))
+
+    def test_run_batch_rejects_documents_with_the_same_name(self):
+        other_dir = os.path.join(self.tmp_dir.name, "more_papers")
+        os.makedirs(other_dir)
+        with open(os.path.join(other_dir, "paper_a.pdf"), "w") as paper:
+            paper.write("Other research content.")
+
+        manifest = os.path.join(self.tmp_dir.name, "manifest.txt")
+        with open(manifest, "w") as manifest_file:
+            manifest_file.write("papers/paper_a.txt\npapers/paper_b.txt\nmore_papers/paper_a.pdf\n")
+
+        with self.assertRaises(ValueError) as raised:
+            cli.run_batch(manifest, self.output_dir, client_factory=FakeAsyncClient)
+
+        self.assertIn("paper_a.pdf", str(raised.exception))
+        self.assertFalse(os.path.exists(self.output_dir))
+
+    def test_main_returns_exit_code(self):
+        with patch.object(cli, "run_batch", return_value={"a.pdf": "done", "b.pdf": "error: boom"}):
+            self.assertEqual(cli.main(["batch", self.input_dir]), 1)
+
+    def test_metrics_server_stops_when_the_batch_fails(self):
+        server = SimpleNamespace(shutdown=Mock(), server_close=Mock())
+
+        with patch.object(cli.PrometheusSink, "serve", return_value=server), \
+                patch.object(cli, "run_batch", side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                cli.main(["batch", self.input_dir, "--metrics-port", "0"])
+
+        server.shutdown.assert_called_once()
+
+    def test_deck_from_batch_outputs(self):
+        cli.run_batch(self.input_dir, self.output_dir, client_factory=FakeAsyncClient)
+        deck_path = os.path.join(self.tmp_dir.name, "deck.pptx")
+
+        with patch("sys.stdout"):
+            self.assertEqual(cli.main(["deck", self.output_dir, "--output", deck_path]), 0)
+
+        self.assertEqual(len(Presentation(deck_path).slides), 2)
@@ -0,0 +1,141 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from highlight.client import (
+    AsyncRetryingClient,
+    RetryingClient,
+    backoff_delay,
+    estimate_request_tokens,
+    retry_after_seconds
+)
+from highlight.ratelimit import ModelRateLimiter, RateLimiter
+
+
+class FakeStatusError(Exception):
+    """Stand-in for an OpenAI API status error."""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+class FlakyClient:
+    """Stand-in for the OpenAI client that raises the provided errors before succeeding."""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = []
+        self.api_key = "test-key"
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.errors:
+            raise self.errors.pop(0)
+        return "completion"
+
+
+class AsyncFlakyClient(FlakyClient):
+    async def create(self, **kwargs):
+        return super().create(**kwargs)
+
+
+class TestRetryAfter(unittest.TestCase):
+    def test_retry_after_seconds(self):
+        self.assertEqual(retry_after_seconds(FakeStatusError(429, {"retry-after": "3"})), 3.0)
+        self.assertEqual(retry_after_seconds(FakeStatusError(429, {"retry-after-ms": "250"})), 0.25)
+        self.assertIsNone(retry_after_seconds(FakeStatusError(429)))
+        self.assertIsNone(retry_after_seconds(ValueError("no response")))
+
+    def test_backoff_delay(self):
+        self.assertEqual(backoff_delay(0, base_delay=1.0, jitter=lambda: 1.0), 1.0)
+        self.assertEqual(backoff_delay(3, base_delay=1.0, jitter=lambda: 0.5), 4.0)
+        self.assertEqual(backoff_delay(10, base_delay=1.0, max_delay=60.0, jitter=lambda: 1.0), 60.0)
+
+
+class TestRetryingClient(unittest.TestCase):
+    def test_retries_transient_errors(self):
+        sleeps = []
+        client = FlakyClient([FakeStatusError(500), FakeStatusError(429, {"retry-after": "7"})])
+        wrapper = RetryingClient(client, sleep=sleeps.append, jitter=lambda: 1.0)
+
+        self.assertEqual(wrapper.chat.completions.create(model="gpt-4o", messages=[]), "completion")
+        self.assertEqual(sleeps, [1.0, 7.0])
+        self.assertEqual(len(client.calls), 3)
+
+    def test_does_not_retry_client_errors(self):
+        client = FlakyClient([FakeStatusError(400)])
+        wrapper = RetryingClient(client, sleep=lambda seconds: None)
+
+        with self.assertRaises(FakeStatusError):
+            wrapper.chat.completions.create(model="gpt-4o", messages=[])
+
+        self.assertEqual(len(client.calls), 1)
+
+    def test_gives_up_after_max_retries(self):
+        client = FlakyClient([FakeStatusError(503)] * 3)
+        wrapper = RetryingClient(client, max_retries=2, sleep=lambda seconds: None)
+
+        with self.assertRaises(FakeStatusError):
+            wrapper.chat.completions.create(model="gpt-4o", messages=[])
+
+        self.assertEqual(len(client.calls), 3)
+
+    def test_timeout_and_passthrough(self):
+        client = FlakyClient([])
+        wrapper = RetryingClient(client, timeout=30)
+
+        wrapper.chat.completions.create(model="gpt-4o", messages=[])
+
+        self.assertEqual(client.calls[0]["timeout"], 30)
+        self.assertEqual(wrapper.api_key, "test-key")
+
+    def test_rate_limiter_is_charged_per_attempt(self):
+        limiter = RateLimiter(requests_per_minute=100, tokens_per_minute=10000)
+        client = FlakyClient([FakeStatusError(500)])
+        wrapper = RetryingClient(client, rate_limiter=limiter, sleep=lambda seconds: None)
+
+        wrapper.chat.completions.create(
+            model="gpt-4o",
+            max_tokens=100,
+            messages=[{"role": "user", "content": "Some prompt."}]
+        )
+
+        self.assertLessEqual(limiter._available_requests, 98.1)
+        self.assertLess(limiter._available_tokens, 10000 - 200)
+
+
+    def test_model_rate_limiter_charges_the_requested_model(self):
+        limiters = ModelRateLimiter(model_defaults=True)
+        wrapper = RetryingClient(FlakyClient([]), rate_limiter=limiters)
+
+        wrapper.chat.completions.create(model="gpt-4o-mini", max_tokens=10, messages=[])
+
+        self.assertLess(limiters.for_model("gpt-4o-mini")._available_requests, 500)
+        self.assertEqual(limiters.for_model("gpt-4o")._available_requests, 500)
+
+    def test_message_token_counts_are_reused(self):
+        messages = [{"role": "user", "content": "A long document. " * 100}]
+        expected = estimate_request_tokens(messages, max_tokens=10)
+
+        with patch("highlight.client.get_token_count", side_effect=AssertionError("tokenized again")):
+            self.assertEqual(estimate_request_tokens(messages, max_tokens=10), expected)
+
+
+class TestAsyncRetryingClient(unittest.TestCase):
+    def test_retries_transient_errors(self):
+        sleeps = []
+
+        async def sleep(seconds):
+            sleeps.append(seconds)
+
+        client = AsyncFlakyClient([FakeStatusError(502)])
+        wrapper = AsyncRetryingClient(client, sleep=sleep, jitter=lambda: 1.0)
+
+        result = asyncio.run(wrapper.chat.completions.create(model="gpt-4o", messages=[]))
+
+        self.assertEqual(result, "completion")
+        self.assertEqual(sleeps, [1.0])
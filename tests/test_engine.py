@@ -0,0 +1,225 @@
+import asyncio
+import json
+import time
+import unittest
+from types import SimpleNamespace
+
+import highlight as hlt
+
+
+class FakeAsyncClient:
+    """Minimal stand-in for AsyncOpenAI that echoes which prompt it received after a fixed delay."""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.prompts = []
+        self.max_tokens = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model, max_tokens, temperature, messages):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        self.prompts.append(messages[-1]["content"])
+        self.max_tokens.append(max_tokens)
+
+        await asyncio.sleep(self.delay)
+
+        self.in_flight -= 1
+
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f"response {len(self.prompts)}"))])
+
+
+class TestResolveSections(unittest.TestCase):
+    def test_resolve_sections_adds_dependencies(self):
+        self.assertEqual(hlt.engine.resolve_sections(["subtitle"]), ["title", "subtitle"])
+
+    def test_resolve_sections_uses_existing_results(self):
+        self.assertEqual(hlt.engine.resolve_sections(["subtitle"], {"title": "A Title"}), ["subtitle"])
+
+    def test_resolve_sections_unknown(self):
+        with self.assertRaises(KeyError):
+            hlt.engine.resolve_sections(["not_a_section"])
+
+
+class TestGenerateAll(unittest.TestCase):
+    def test_generate_all_sections(self):
+        client = FakeAsyncClient()
+        results = hlt.generate_all(client, "Some document text.", max_concurrency=len(hlt.SECTIONS), cache=False)
+
+        self.assertEqual(list(results), list(hlt.SECTIONS))
+        self.assertEqual(len(client.prompts), len(hlt.SECTIONS))
+
+    def test_generate_all_dependencies_are_passed(self):
+        client = FakeAsyncClient()
+        results = hlt.generate_all(client, "Some document text.", sections=["subtitle", "figure"], cache=False)
+
+        subtitle_prompt = next(prompt for prompt in client.prompts if "Generate a subtitle" in prompt)
+        figure_prompt = next(prompt for prompt in client.prompts if "search strings" in prompt)
+
+        self.assertIn(results["title"], subtitle_prompt)
+        self.assertIn(results["summary"], figure_prompt)
+
+    def test_generate_all_respects_concurrency_limit(self):
+        client = FakeAsyncClient()
+        hlt.generate_all(client, "Some document text.", max_concurrency=2, cache=False)
+
+        self.assertEqual(client.max_in_flight, 2)
+
+    def test_generate_all_runs_concurrently(self):
+        delay = 0.1
+        client = FakeAsyncClient(delay=delay)
+
+        start_time = time.perf_counter()
+        hlt.generate_all(client, "Some document text.", max_concurrency=len(hlt.SECTIONS), cache=False)
+        elapsed = time.perf_counter() - start_time
+
+        # the longest dependency chain is two requests deep
+        self.assertLess(elapsed, delay * 4)
+
+    def test_generate_all_word_budget(self):
+        content = "Some document text."
+        client = FakeAsyncClient(delay=0)
+        hlt.generate_all(client, content, sections=["impact"], cache=False)
+
+        expected = hlt.word_budget_tokens(100, hlt.tokens_per_word(content))
+        self.assertEqual(client.max_tokens[0], min(expected, hlt.SECTIONS["impact"]["max_tokens"]))
+
+    def test_cut_off_section_is_regenerated(self):
+        class TruncatingClient(FakeAsyncClient):
+            async def create(self, model, max_tokens, temperature, messages):
+                response = await super().create(model, max_tokens, temperature, messages)
+                response.choices[0].finish_reason = "length" if max_tokens < 700 else "stop"
+                return response
+
+        client = TruncatingClient(delay=0)
+        # short words keep the word budget well below the section's max_tokens
+        hlt.generate_all(client, "a " * 200, sections=["impact"], cache=False)
+
+        self.assertEqual(client.max_tokens[-1], hlt.SECTIONS["impact"]["max_tokens"])
+        self.assertEqual(len(client.max_tokens), 2)
+
+    def test_generate_all_shared_prefix(self):
+        client = FakeAsyncClient(delay=0)
+        hlt.generate_all(client, "Some document text.", sections=["title", "science"], cache=False,
+                         prompt_layout="shared_prefix")
+
+        # the document is sent ahead of the section instructions rather than inside them
+        self.assertTrue(all("Some document text." not in prompt for prompt in client.prompts))
+
+    def test_sections_built_on_other_sections_stay_inline(self):
+        client = FakeAsyncClient(delay=0)
+        hlt.generate_all(client, "Some document text.", sections=["summary", "figure"], cache=False,
+                         prompt_layout="shared_prefix")
+
+        # the figure prompt is generated from the summary, which it holds itself
+        figure_prompt = next(prompt for prompt in client.prompts if "search strings" in prompt)
+        self.assertIn("response 1", figure_prompt)
+
+
+class FakeStructuredClient(FakeAsyncClient):
+    """Answers structured requests with JSON that leaves out the funding section."""
+
+    def __init__(self, structured_delay=0, fail_structured=False):
+        super().__init__(delay=0)
+        self.structured_delay = structured_delay
+        self.fail_structured = fail_structured
+        self.response_formats = []
+        self.structured_temperatures = []
+        self.sent_during_structured = []
+
+    async def create(self, model, max_tokens, temperature, messages, response_format=None):
+        if response_format is None:
+            return await super().create(model, max_tokens, temperature, messages)
+
+        self.response_formats.append(response_format)
+        self.structured_temperatures.append(temperature)
+
+        if self.fail_structured:
+            raise RuntimeError("The structured request failed")
+
+        n_prompts = len(self.prompts)
+        await asyncio.sleep(self.structured_delay)
+        self.sent_during_structured = self.prompts[n_prompts:]
+
+        sections = response_format["json_schema"]["schema"]["required"]
+        content = json.dumps({name: f"structured {name}" for name in sections if name != "funding"})
+
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class TestStructuredGeneration(unittest.TestCase):
+    def test_parse_structured_response(self):
+        response = json.dumps({"title": "A Title", "citation": '"A Citation"', "science": ""})
+        results, failed = hlt.engine.parse_structured_response(response, ["title", "citation", "science", "impact"])
+
+        self.assertEqual(results, {"title": "A Title", "citation": "A Citation"})
+        self.assertEqual(failed, ["science", "impact"])
+
+    def test_parse_invalid_json(self):
+        results, failed = hlt.engine.parse_structured_response("not json", ["title"])
+
+        self.assertEqual(results, {})
+        self.assertEqual(failed, ["title"])
+
+    def test_generate_all_structured_with_fallback(self):
+        client = FakeStructuredClient()
+        results = hlt.generate_all(client, "Some document text.", structured=True, cache=False)
+
+        self.assertEqual(list(results), list(hlt.SECTIONS))
+        self.assertEqual(results["science"], "structured science")
+
+        # funding failed validation and was generated on its own, along with the unstructured sections
+        self.assertFalse(results["funding"].startswith("structured"))
+        self.assertIn("structured objective", next(prompt for prompt in client.prompts if "methodolgocial" in prompt))
+
+        grouped = sum(len(response_format["json_schema"]["schema"]["required"])
+                      for response_format in client.response_formats)
+        self.assertEqual(len(client.prompts), len(hlt.SECTIONS) - grouped + 1)
+
+    def test_structured_requests_are_grouped_by_temperature(self):
+        client = FakeStructuredClient()
+        hlt.generate_all(client, "Some document text.", structured=True, cache=False)
+
+        # the title and the impact points are alone at their temperatures and are requested on their own
+        self.assertEqual(sorted(client.structured_temperatures), [0.0, 0.3])
+        self.assertEqual(
+            sorted(sorted(response_format["json_schema"]["schema"]["required"])
+                   for response_format in client.response_formats),
+            [["citation", "funding", "impact"], ["objective", "science", "summary"]]
+        )
+
+        client = FakeStructuredClient()
+        overrides = {"impact": 0.3, "citation": 0.3, "funding": 0.3}
+        hlt.generate_all(client, "Some document text.", structured=True, cache=False, temperatures=overrides)
+
+        self.assertEqual(client.structured_temperatures, [0.3])
+        self.assertEqual(len(client.response_formats[0]["json_schema"]["schema"]["required"]), 6)
+
+    def test_failed_structured_request_falls_back_to_sections(self):
+        client = FakeStructuredClient(fail_structured=True)
+        completed = []
+        results = hlt.generate_all(client, "Some document text.", structured=True, cache=False,
+                                   on_complete=lambda section_name, response, elapsed: completed.append(section_name))
+
+        self.assertEqual(list(results), list(hlt.SECTIONS))
+        self.assertFalse(any(response.startswith("structured") for response in results.values()))
+        self.assertEqual(len(client.prompts), len(hlt.SECTIONS))
+        self.assertEqual(sorted(completed), sorted(hlt.SECTIONS))
+
+    def test_independent_sections_do_not_wait_for_the_structured_request(self):
+        client = FakeStructuredClient(structured_delay=0.05)
+        hlt.generate_all(client, "Some document text.", sections=["science", "objective", "approach", "figure_choice"],
+                         structured=True, cache=False)
+
+        # the figure choice was requested while the structured request ran; the approach needs its objective
+        self.assertEqual(len(client.sent_during_structured), 1)
+        self.assertNotIn("methodolgocial", client.sent_during_structured[0])
+        self.assertIn("structured objective", next(prompt for prompt in client.prompts if "methodolgocial" in prompt))
+
+    def test_structured_request_sends_document_once(self):
+        prefix, prompt, _ = hlt.engine.build_structured_request("Some document text.")
+
+        self.assertIn("Some document text.", prefix)
+        self.assertNotIn("Some document text.", prompt)
@@ -0,0 +1,157 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from docx import Document
+from pptx import Presentation
+
+from highlight.export import (
+    PPTX_PLACEHOLDERS,
+    TemplateManager,
+    build_deck,
+    deck_file_path,
+    build_shape_index,
+    build_word_parameters,
+    fill_slide,
+    render_pptx
+)
+
+
+def slide_text(pptx_bytes):
+    return [
+        shape.text_frame.text
+        for shape in Presentation(io.BytesIO(pptx_bytes)).slides[0].shapes
+        if shape.has_text_frame
+    ]
+
+
+class TestTemplateManager(unittest.TestCase):
+    def setUp(self):
+        self.manager = TemplateManager()
+        self.parameters = build_word_parameters({"title": "A Title", "summary": "A summary."}, point_of_contact="Jane")
+
+    def test_render_docx(self):
+        document = Document(io.BytesIO(self.manager.render_docx(self.parameters)))
+        text = "\n".join(paragraph.text for paragraph in document.paragraphs)
+
+        self.assertIn("A summary.", text)
+
+    def test_render_docx_is_memoized(self):
+        with patch("highlight.export.DocxTemplate.render", autospec=True) as mock_render:
+            self.manager.render_docx(self.parameters)
+            self.manager.render_docx(dict(self.parameters))
+            self.manager.render_docx({**self.parameters, "title": "Another Title"})
+
+        self.assertEqual(mock_render.call_count, 2)
+
+    def test_clones_are_independent(self):
+        first = self.manager.docx_template()
+        first.render(self.parameters)
+
+        second = self.manager.docx_template()
+
+        self.assertIn("{{", "\n".join(paragraph.text for paragraph in second.docx.paragraphs))
+
+    def test_template_is_indexed_once(self):
+        with patch("highlight.export.build_shape_index", wraps=build_shape_index) as mock_index:
+            self.manager.presentation()
+            self.manager.presentation()
+            self.manager.shape_index()
+
+        self.assertEqual(mock_index.call_count, 1)
+
+    def test_presentation_copies_are_independent(self):
+        first = self.manager.presentation()
+        fill_slide(first.slides[0], self.manager.shape_index(), {"title": "A Title"})
+
+        second = self.manager.presentation()
+        text = [shape.text_frame.text for shape in second.slides[0].shapes if shape.has_text_frame]
+
+        self.assertIn("title", text)
+
+
+class TestRenderPptx(unittest.TestCase):
+    def test_render_pptx(self):
+        text = slide_text(render_pptx(
+            title="A Title",
+            citation="A Citation",
+            objective="An objective.",
+            approach="- step one\n- step two",
+            ppt_impact="- result one"
+        ))
+
+        self.assertIn("A Title", text)
+        self.assertIn("An objective.", text)
+        self.assertNotIn("approach_0", text)
+        self.assertTrue(any("step two" in shape_text for shape_text in text))
+
+
+class TestShapeIndex(unittest.TestCase):
+    def test_build_shape_index(self):
+        manager = TemplateManager()
+        shape_index = build_shape_index(manager.presentation())
+
+        self.assertEqual(set(shape_index), set(PPTX_PLACEHOLDERS))
+        self.assertIs(manager.shape_index(), manager.shape_index())
+
+    def test_fill_slide_skips_missing_fields(self):
+        manager = TemplateManager()
+        prs = manager.presentation()
+
+        fill_slide(prs.slides[0], manager.shape_index(), {"title": "A Title"})
+        text = [shape.text_frame.text for shape in prs.slides[0].shapes if shape.has_text_frame]
+
+        self.assertIn("A Title", text)
+        self.assertIn("citation", text)
+
+
+class TestBuildDeck(unittest.TestCase):
+    def test_split_deck(self):
+        records = ({"title": f"Title {index}"} for index in range(5))
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = os.path.join(tmp_dir, "deck.pptx")
+            built = []
+            n_slides = build_deck(records, output, slides_per_file=2, progress_callback=built.append)
+
+            slide_counts = [len(Presentation(deck_file_path(output, number)).slides) for number in (1, 2, 3)]
+
+            self.assertFalse(os.path.exists(output))
+            self.assertFalse(os.path.exists(deck_file_path(output, 4)))
+
+        self.assertEqual(n_slides, 5)
+        self.assertEqual(built, [1, 2, 3, 4, 5])
+        self.assertEqual(slide_counts, [2, 2, 1])
+
+        with self.assertRaises(ValueError):
+            build_deck([], io.BytesIO(), slides_per_file=2)
+
+    def test_build_deck(self):
+        records = (
+            {"title": f"Title {index}", "citation": "A Citation", "objective": "An objective.",
+             "approach": "- step one", "ppt_impact": "- result one"}
+            for index in range(5)
+        )
+
+        output = io.BytesIO()
+        n_slides = build_deck(records, output)
+
+        prs = Presentation(io.BytesIO(output.getvalue()))
+        titles = [
+            [shape.text_frame.text for shape in slide.shapes if shape.has_text_frame]
+            for slide in prs.slides
+        ]
+
+        self.assertEqual(n_slides, 5)
+        self.assertEqual(len(prs.slides), 5)
+        for index, text in enumerate(titles):
+            self.assertIn(f"Title {index}", text)
+            self.assertNotIn("title", text)
+
+    def test_build_deck_empty(self):
+        output = io.BytesIO()
+
+        self.assertEqual(build_deck([], output), 0)
+        self.assertEqual(len(Presentation(io.BytesIO(output.getvalue())).slides), 0)
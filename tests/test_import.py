@@ -0,0 +1,42 @@
+import subprocess
+import sys
+import unittest
+
+
+# modules that the core package must not pull in at import time
+HEAVY_MODULES = ("streamlit", "docxtpl", "pptx", "openai", "tqdm")
+
+# generous ceiling on the import time of the core package, in seconds
+MAX_IMPORT_SECONDS = 1.5
+
+
+def run_python(code):
+    """Run code in a fresh interpreter so the import state of the test process does not interfere."""
+
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+    return result.stdout.strip()
+
+
+class TestImport(unittest.TestCase):
+    def test_import_does_not_load_heavy_modules(self):
+        loaded = run_python(
+            "import sys, highlight; "
+            f"print(','.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))"
+        )
+
+        self.assertEqual(loaded, "")
+
+    def test_import_time(self):
+        # best of three to smooth over a cold file system cache
+        timings = [
+            float(run_python("import time; start = time.perf_counter(); import highlight; print(time.perf_counter() - start)"))
+            for _ in range(3)
+        ]
+
+        self.assertLess(min(timings), MAX_IMPORT_SECONDS)
+
+    def test_lazy_attributes(self):
+        loaded = run_python("import sys, highlight; highlight.render_docx; print('docxtpl' in sys.modules)")
+
+        self.assertEqual(loaded, "True")
@@ -0,0 +1,269 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import highlight as hlt
+from highlight.jobs import JobService, JobStore, job_dedup_key
+
+
+class FakeClient:
+    """Stand-in for the OpenAI client that echoes the last word of the prompt."""
+
+    def __init__(self):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, max_tokens, temperature, messages, **kwargs):
+        self.calls += 1
+        prompt = messages[-1]["content"]
+        text = prompt.split("\n\n")[1] if prompt.startswith("Remove irrelevant") else "A short title"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))], usage=None)
+
+
+class TestJobStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = JobStore(os.path.join(self.tmp_dir.name, "jobs", "jobs.sqlite3"))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_lifecycle(self):
+        job_id = self.store.create("section", {"prompt_name": "title"}, owner="a", tag="title_response")
+
+        self.assertEqual(self.store.get(job_id).status, "queued")
+        self.assertTrue(self.store.claim(job_id))
+        self.assertFalse(self.store.claim(job_id))
+
+        self.store.update(job_id, progress=0.5, message="halfway")
+        self.assertEqual(self.store.get(job_id).message, "halfway")
+
+        self.store.finish(job_id, result="A title")
+        job = self.store.get(job_id)
+
+        self.assertEqual((job.status, job.result, job.progress), ("done", "A title", 1.0))
+        self.assertEqual(self.store.payload(job_id), {"prompt_name": "title"})
+        self.assertEqual(self.store.purge(max_age_seconds=-1), 1)
+        self.assertIsNone(self.store.get(job_id))
+
+    def test_find_and_requeue(self):
+        job_id = self.store.create("section", {"prompt_name": "title"})
+        self.store.claim(job_id)
+
+        self.assertEqual(self.store.find("section", {"prompt_name": "title"}).id, job_id)
+        self.assertIsNone(self.store.find("section", {"prompt_name": "impact"}))
+
+        # a job another process is still running is left alone
+        self.assertEqual(self.store.requeue_interrupted(), [])
+        self.assertEqual(self.store.get(job_id).status, "running")
+
+        # a job whose heartbeat stopped, e.g., with the process running it, is queued again
+        self.assertEqual(self.store.requeue_interrupted(stale_after=-1), [job_id])
+        self.assertEqual(self.store.get(job_id).status, "queued")
+        self.assertTrue(self.store.cancel(job_id))
+
+    def test_adds_worker_columns_to_older_stores(self):
+        path = os.path.join(os.path.dirname(self.store.path), "old.sqlite3")
+        with sqlite3.connect(path) as connection:
+            connection.execute(
+                """CREATE TABLE jobs (id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, owner TEXT,
+                tag TEXT, progress REAL NOT NULL DEFAULT 0, message TEXT, result TEXT, error TEXT,
+                created REAL NOT NULL, started REAL, finished REAL, payload TEXT NOT NULL, dedup_key TEXT NOT NULL,
+                shared_id TEXT)"""
+            )
+        connection.close()
+
+        store = JobStore(path)
+        job_id = store.create("section", {"prompt_name": "title"})
+
+        self.assertTrue(store.claim(job_id, worker="worker"))
+        self.assertEqual(store.requeue_interrupted(), [])
+
+    def test_dedup_key_ignores_key_order(self):
+        self.assertEqual(job_dedup_key("section", {"a": 1, "b": 2}), job_dedup_key("section", {"b": 2, "a": 1}))
+
+
+class TestJobService(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        # registered first so it runs after the services are shut down
+        self.addCleanup(tmp_dir.cleanup)
+
+        self.store = JobStore(os.path.join(tmp_dir.name, "jobs.sqlite3"))
+        self.client = FakeClient()
+
+    def service(self, **kwargs):
+        service = JobService(store=self.store, client_factory=lambda: self.client, **kwargs).start()
+        self.addCleanup(service.shutdown)
+        return service
+
+    def test_section_job(self):
+        service = self.service(max_workers=2)
+
+        job_id = service.submit(
+            "section",
+            {"content": "Some content.", "prompt_name": "title", "max_word_count": 10, "min_word_count": 0, "cache": False},
+            owner="session",
+            tag="title_response"
+        )
+        job = service.wait(job_id, timeout=10)
+
+        self.assertEqual((job.status, job.result), ("done", "A short title"))
+        self.assertEqual(service.latest("session")["title_response"].id, job_id)
+        self.assertEqual(service.latest("other"), {})
+
+    def test_reduction_job(self):
+        service = self.service()
+        polled = []
+
+        job = service.wait(
+            service.submit("reduction", {
+                "content": "Some relevant content. " * 50,
+                "model": "gpt-4o",
+                "max_allowable_tokens": 300,
+                "max_output_tokens": 100,
+                "cache": False,
+            }),
+            timeout=10,
+            poll_interval=0.01,
+            on_poll=polled.append
+        )
+
+        self.assertEqual(job.status, "done")
+        self.assertIn("Some relevant content.", job.result)
+        self.assertGreater(self.client.calls, 1)
+        self.assertTrue(polled)
+
+    def test_identical_jobs_run_once(self):
+        release = threading.Event()
+        calls = []
+
+        def handler(client, payload, progress):
+            calls.append(payload)
+            release.wait(10)
+            return payload["n"]
+
+        service = self.service(handlers={"echo": handler})
+
+        first = service.submit("echo", {"n": 1}, owner="a", tag="echo")
+        second = service.submit("echo", {"n": 1}, owner="b", tag="echo")
+        self.assertEqual(service.submit("echo", {"n": 1}, owner="b", tag="echo"), second)
+        release.set()
+
+        # each owner has its own job, which shares the one execution
+        self.assertNotEqual(first, second)
+        self.assertEqual(service.get(second).shared_id, first)
+        self.assertEqual(service.wait(first, timeout=10).result, 1)
+        self.assertEqual(service.wait(second, timeout=10).result, 1)
+        self.assertEqual(service.latest("b")["echo"].id, second)
+        self.assertEqual([job.id for job in service.store.list(owner="b")], [second])
+
+        # finished jobs are only reused when asked to
+        self.assertEqual(service.submit("echo", {"n": 1}, owner="a", tag="echo", reuse_done=True), first)
+        linked = service.get(service.submit("echo", {"n": 1}, owner="c", reuse_done=True))
+        self.assertEqual((linked.status, linked.result, linked.shared_id), ("done", 1, first))
+        self.assertNotEqual(service.submit("echo", {"n": 1}, owner="a", tag="echo"), first)
+        self.assertEqual(calls[0], {"n": 1})
+
+    def test_linked_job_keeps_the_shared_job_queued(self):
+        first = self.store.create("echo", {"n": 3}, owner="a")
+        second = self.store.link(first, owner="b")
+
+        self.assertFalse(self.store.cancel(first))
+        self.assertTrue(self.store.cancel(second))
+        self.assertTrue(self.store.cancel(first))
+
+        # linked jobs follow the job they share but are never queued themselves
+        third = self.store.create("echo", {"n": 4}, owner="a")
+        fourth = self.store.link(third, owner="b")
+        self.store.claim(third)
+
+        self.assertEqual(self.store.get(fourth).status, "running")
+        self.assertEqual(self.store.requeue_interrupted(stale_after=-1), [third])
+        self.assertEqual(self.store.find("echo", {"n": 4}, owner="b").id, fourth)
+
+    def test_link(self):
+        service = self.service(handlers={"echo": lambda client, payload, progress: payload["n"]})
+
+        first = service.submit("echo", {"n": 5}, owner="a")
+        service.wait(first, timeout=10)
+        linked = service.get(service.link(first, owner="b", tag="echo"))
+
+        self.assertEqual((linked.owner, linked.tag, linked.shared_id), ("b", "echo", first))
+        self.assertEqual((linked.status, linked.result), ("done", 5))
+
+    def test_failed_job(self):
+        def handler(client, payload, progress):
+            raise ValueError("bad payload")
+
+        service = self.service(handlers={"fail": handler})
+        job = service.wait(service.submit("fail", {}), timeout=10)
+
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(job.error, "ValueError: bad payload")
+
+        with self.assertRaises(KeyError):
+            service.submit("unknown", {})
+
+    def test_unfinished_jobs_resume_on_start(self):
+        job_id = self.store.create("echo", {"n": 2})
+        self.store.claim(job_id, worker="stopped")
+
+        # picked up once its heartbeat is stale rather than while its worker may still run it
+        service = self.service(
+            handlers={"echo": lambda client, payload, progress: payload["n"]},
+            heartbeat_interval=0.05,
+            stale_after=0.2
+        )
+
+        self.assertEqual(service.wait(job_id, timeout=10).result, 2)
+
+    def test_running_jobs_keep_their_heartbeat(self):
+        release = threading.Event()
+
+        def handler(client, payload, progress):
+            release.wait(10)
+            return payload["n"]
+
+        service = self.service(handlers={"echo": handler}, heartbeat_interval=0.05, stale_after=0.2)
+        job_id = service.submit("echo", {"n": 6})
+        time.sleep(0.5)
+
+        # a job running longer than `stale_after` is not run a second time
+        self.assertEqual(self.store.requeue_interrupted(stale_after=0.2), [])
+        self.assertEqual(self.store.get(job_id).status, "running")
+
+        release.set()
+        self.assertEqual(service.wait(job_id, timeout=10).result, 6)
+
+    def test_worker_survives_store_errors(self):
+        service = self.service(handlers={"echo": lambda client, payload, progress: payload["n"]}, max_workers=1)
+        claim = self.store.claim
+        failures = []
+
+        def flaky_claim(job_id, worker=None):
+            if not failures:
+                failures.append(job_id)
+                raise sqlite3.OperationalError("database is locked")
+            return claim(job_id, worker=worker)
+
+        with mock.patch.object(self.store, "claim", side_effect=flaky_claim), self.assertLogs("highlight.jobs", "ERROR"):
+            failed = service.submit("echo", {"n": 7})
+            job = service.wait(service.submit("echo", {"n": 8}), timeout=10)
+
+        # the only worker logged the error and went on to the next job
+        self.assertEqual(failures, [failed])
+        self.assertEqual((job.status, job.result), ("done", 8))
+
+    def test_exported(self):
+        self.assertIs(hlt.JobService, JobService)
+        self.assertIn("done", hlt.JOB_STATUSES)
+
+
+if __name__ == "__main__":
+    unittest.main()
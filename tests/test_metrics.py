@@ -0,0 +1,213 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+import urllib.request
+from types import SimpleNamespace
+
+import highlight as hlt
+from highlight.metrics import CallRecord, CallTimer, JsonlSink, MetricsAggregator, PrometheusSink
+
+
+def fake_completion(content, prompt_tokens=100, completion_tokens=20, cached_tokens=0):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=cached_tokens)
+        )
+    )
+
+
+class FakeClient:
+    """Stand-in for the OpenAI client that returns a completion with usage."""
+
+    def __init__(self, content):
+        self.content = content
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        return fake_completion(self.content, cached_tokens=50)
+
+
+class ServerError(Exception):
+    """Stand-in for an OpenAI API status error that is retried."""
+
+    status_code = 500
+
+
+class FailingClient:
+    """Stand-in for the OpenAI client that raises the provided errors before returning a completion."""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        if self.errors:
+            raise self.errors.pop(0)
+        return fake_completion("A title")
+
+
+class TestMetricsAggregator(unittest.TestCase):
+    def test_totals_by_prompt_and_model(self):
+        aggregator = MetricsAggregator()
+        aggregator.record(CallRecord("title", "gpt-4o", 1.0, input_tokens=100, output_tokens=10, cost=0.01))
+        aggregator.record(CallRecord(
+            "title", "gpt-4o", 3.0, 0.5, input_tokens=200, output_tokens=30, cached_tokens=150, cost=0.02
+        ))
+        aggregator.record(CallRecord("citation", "gpt-4o-mini", 0.1, response_cache_hit=True))
+
+        rows = aggregator.by_prompt()
+
+        self.assertEqual([row["prompt_name"] for row in rows], ["title", "citation"])
+        self.assertEqual(rows[0]["calls"], 2)
+        self.assertEqual(rows[0]["mean_latency"], 2.0)
+        self.assertEqual(rows[0]["max_latency"], 3.0)
+        self.assertEqual(rows[0]["mean_time_to_first_token"], 0.5)
+        self.assertEqual(rows[0]["input_tokens"], 300)
+        self.assertIsNone(rows[1]["mean_time_to_first_token"])
+
+        aggregator.record(CallRecord("citation", "gpt-4o-mini", 2.0, error="ServerError: status 500", retries=2))
+        self.assertEqual((aggregator.by_prompt()[1]["errors"], aggregator.by_prompt()[1]["retries"]), (1, 2))
+
+        summary = aggregator.summary()
+        self.assertEqual(summary["calls"], 4)
+        self.assertEqual((summary["errors"], summary["retries"]), (1, 2))
+        self.assertEqual(summary["response_cache_hits"], 1)
+        self.assertEqual(summary["prompt_cache_hits"], 1)
+        self.assertEqual(summary["cached_fraction"], 0.5)
+        self.assertAlmostEqual(summary["cost"], 0.03)
+
+
+class TestSinks(unittest.TestCase):
+    def test_jsonl_sink(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "calls.jsonl")
+            sink = JsonlSink(path)
+            sink.record(CallRecord("title", "gpt-4o", 1.5, input_tokens=10))
+            sink.record(CallRecord("funding", "gpt-4o", 0.5))
+
+            with open(path, "r", encoding="utf-8") as jsonl_file:
+                records = [json.loads(line) for line in jsonl_file]
+
+        self.assertEqual([record["prompt_name"] for record in records], ["title", "funding"])
+        self.assertEqual(records[0]["input_tokens"], 10)
+
+    def test_prometheus_render_and_serve(self):
+        sink = PrometheusSink()
+        sink.record(CallRecord("title", "gpt-4o", 1.5, input_tokens=10, cost=0.5))
+        sink.record(CallRecord("title", "gpt-4o", 0.5, error="ServerError: status 500", retries=3))
+
+        text = sink.render()
+        self.assertIn("# TYPE highlight_llm_calls_total counter", text)
+        self.assertIn('highlight_llm_calls_total{prompt="title",model="gpt-4o"} 2', text)
+        self.assertIn('highlight_llm_errors_total{prompt="title",model="gpt-4o"} 1', text)
+        self.assertIn('highlight_llm_retries_total{prompt="title",model="gpt-4o"} 3', text)
+        self.assertIn('highlight_llm_input_tokens_total{prompt="title",model="gpt-4o"} 10', text)
+
+        server = sink.serve(port=0, host="127.0.0.1")
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url, timeout=5) as response:
+                self.assertEqual(response.read().decode("utf-8"), text)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+class TestCallTimer(unittest.TestCase):
+    def setUp(self):
+        self.sink = MetricsAggregator()
+        hlt.add_sink(self.sink)
+
+    def tearDown(self):
+        hlt.remove_sink(self.sink)
+
+    def test_finish_records_usage_and_cost(self):
+        timer = CallTimer("title", "gpt-4o")
+        timer.first_token()
+        call = timer.finish(fake_completion("A title", prompt_tokens=1000, completion_tokens=100))
+
+        self.assertEqual(call.input_tokens, 1000)
+        self.assertIsNotNone(call.time_to_first_token)
+        self.assertAlmostEqual(call.cost, hlt.estimate_cost("gpt-4o", 1000, 100))
+        self.assertEqual(self.sink.summary()["calls"], 1)
+
+    def test_unknown_model_has_no_cost(self):
+        call = CallTimer("title", "local-model").finish(fake_completion("A title"))
+
+        self.assertIsNone(call.cost)
+
+    def test_generate_prompt_records_the_prompt_name(self):
+        hlt.generate_prompt(FakeClient("A title"), "Some content.", prompt_name="title", cache=False)
+
+        rows = self.sink.by_prompt()
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["prompt_name"], "title")
+        self.assertEqual(rows[0]["cached_tokens"], 50)
+        self.assertGreater(rows[0]["cost"], 0)
+
+    def test_failed_and_retried_calls_are_recorded(self):
+        with self.assertRaises(ValueError):
+            hlt.generate_prompt(
+                FailingClient([ValueError("bad request")]), "Some content.", prompt_name="subtitle", cache=False
+            )
+
+        client = hlt.RetryingClient(FailingClient([ServerError("status 500")] * 2), sleep=lambda delay: None)
+        hlt.generate_prompt(client, "Some content.", prompt_name="title", cache=False)
+
+        rows = {row["prompt_name"]: row for row in self.sink.by_prompt()}
+        self.assertEqual((rows["subtitle"]["calls"], rows["subtitle"]["errors"]), (1, 1))
+        self.assertEqual((rows["title"]["calls"], rows["title"]["errors"], rows["title"]["retries"]), (1, 0, 2))
+
+    def test_failed_stream_is_recorded(self):
+        def create(**kwargs):
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="A"), finish_reason=None)])
+            raise ConnectionError("stream closed")
+
+        client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        records = []
+        with hlt.track_calls(SimpleNamespace(record=records.append)), self.assertRaises(ConnectionError):
+            list(hlt.stream_prompt_content(client, "A system scope.", "A prompt.", cache=False))
+
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0].error, "ConnectionError: stream closed")
+        self.assertIsNotNone(records[0].time_to_first_token)
+
+    def test_track_calls_only_sees_calls_made_in_the_block(self):
+        session = MetricsAggregator()
+
+        hlt.generate_prompt(FakeClient("A title"), "Some content.", prompt_name="title", cache=False)
+        with hlt.track_calls(session):
+            hlt.generate_prompt(FakeClient("A subtitle"), "Some content.", prompt_name="subtitle", cache=False)
+
+            # a call made by another thread while the block runs belongs to whoever made it
+            thread = threading.Thread(
+                target=hlt.generate_prompt,
+                args=(FakeClient("A summary"), "Some content."),
+                kwargs=dict(prompt_name="summary", cache=False)
+            )
+            thread.start()
+            thread.join()
+
+        self.assertEqual([row["prompt_name"] for row in session.by_prompt()], ["subtitle"])
+        self.assertEqual(self.sink.summary()["calls"], 3)
+
+    def test_failing_sink_does_not_fail_the_call(self):
+        broken_sink = SimpleNamespace(record=lambda call: 1 / 0)
+        hlt.add_sink(broken_sink)
+
+        try:
+            content = hlt.generate_prompt(FakeClient("A title"), "Some content.", cache=False)
+        finally:
+            hlt.remove_sink(broken_sink)
+
+        self.assertEqual(content, "A title")
+        self.assertEqual(self.sink.summary()["calls"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
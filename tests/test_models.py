@@ -0,0 +1,32 @@
+import unittest
+
+import highlight as hlt
+
+
+class TestModelRegistry(unittest.TestCase):
+    def test_get_model_info(self):
+        info = hlt.get_model_info("gpt-4o")
+
+        self.assertEqual(info.context_window, 128000)
+        self.assertEqual(info.encoding, "o200k_base")
+
+    def test_snapshot_resolves_to_base_model(self):
+        self.assertEqual(hlt.get_model_info("gpt-4o-mini-2024-07-18").name, "gpt-4o-mini")
+        self.assertEqual(hlt.get_model_info("gpt-4-32k-0613").name, "gpt-4-32k")
+
+    def test_unknown_model(self):
+        with self.assertRaises(KeyError):
+            hlt.get_model_info("not-a-model")
+
+    def test_default_model_is_registered(self):
+        self.assertIn(hlt.DEFAULT_MODEL, hlt.MODELS)
+
+    def test_estimate_cost(self):
+        self.assertAlmostEqual(hlt.estimate_cost("gpt-4o", 1000000, 1000000), 12.50)
+        self.assertAlmostEqual(hlt.estimate_cost("gpt-4o", 1000000, cached_tokens=1000000), 1.25)
+
+    def test_check_prompt_tokens_uses_context_window(self):
+        with self.assertRaises(RuntimeError):
+            hlt.check_prompt_tokens("A short prompt.", max_tokens=9000, model="gpt-4")
+
+        hlt.check_prompt_tokens("A short prompt.", max_tokens=9000, model="gpt-4o")
@@ -0,0 +1,102 @@
+import io
+import os
+import pstats
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import highlight as hlt
+from highlight.profiling import PROFILE_ENV_VAR, RerunProfiler, get_active_profiler, profile_mode, profile_phase
+
+
+class TestProfileMode(unittest.TestCase):
+    def test_query_parameter_takes_precedence(self):
+        with patch.dict(os.environ, {PROFILE_ENV_VAR: "cprofile"}):
+            self.assertEqual(profile_mode(), "cprofile")
+            self.assertIsNone(profile_mode("0"))
+            self.assertEqual(profile_mode("true"), "timing")
+
+    def test_off_by_default(self):
+        with patch.dict(os.environ, {}, clear=True):
+            self.assertIsNone(profile_mode())
+
+    def test_query_parameter_needs_the_environment_variable(self):
+        with patch.dict(os.environ, {}, clear=True):
+            self.assertIsNone(profile_mode("1"))
+            self.assertIsNone(profile_mode("cprofile"))
+
+        with patch.dict(os.environ, {PROFILE_ENV_VAR: "off"}):
+            self.assertIsNone(profile_mode("pyinstrument"))
+
+    def test_unknown_mode_is_rejected_by_the_profiler(self):
+        with self.assertRaises(ValueError):
+            RerunProfiler("flamegraph")
+
+
+class TestRerunProfiler(unittest.TestCase):
+    def test_missing_pyinstrument_falls_back_to_timing(self):
+        with patch.dict(sys.modules, {"pyinstrument": None}):
+            with self.assertWarns(UserWarning):
+                profiler = RerunProfiler("pyinstrument").start()
+
+        profiler.lap("title section")
+        profiler.finish()
+
+        self.assertEqual(profiler.mode, "timing")
+        self.assertEqual([block["block"] for block in profiler.blocks()], ["title section", "end of script"])
+
+    def test_disabled_profiler_records_nothing(self):
+        profiler = RerunProfiler().start()
+
+        with profiler.phase("extraction"):
+            pass
+        profiler.lap("title section")
+        profiler.finish()
+
+        self.assertEqual(profiler.phases, [])
+        self.assertIsNone(get_active_profiler())
+
+    def test_blocks_and_nested_operations(self):
+        profiler = RerunProfiler("timing").start()
+
+        with profile_phase("extraction"):
+            with profile_phase("token counting"):
+                pass
+        profiler.lap("upload")
+        profiler.finish("sidebar")
+
+        self.assertEqual([row["block"] for row in profiler.blocks()], ["upload", "sidebar"])
+        self.assertAlmostEqual(sum(row["share"] for row in profiler.blocks()), 1.0, places=2)
+
+        operations = {row["operation"]: row for row in profiler.operations()}
+        self.assertEqual(set(operations), {"extraction", "token counting"})
+        self.assertLessEqual(operations["extraction"]["self_seconds"], operations["extraction"]["seconds"])
+        self.assertIsNone(get_active_profiler())
+
+    def test_read_text_is_profiled(self):
+        profiler = RerunProfiler("timing").start()
+        try:
+            hlt.read_text(io.BytesIO(b"Some text content."))
+        finally:
+            profiler.finish()
+
+        self.assertEqual(
+            [row["operation"] for row in profiler.operations()],
+            ["extraction", "token counting"]
+        )
+
+    def test_cprofile_dump(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            profiler = RerunProfiler("cprofile", dump_dir=tmp_dir).start()
+            sum(range(1000))
+            profiler.finish()
+
+            self.assertTrue(profiler.dump_path.endswith(".prof"))
+            self.assertIsNotNone(pstats.Stats(profiler.dump_path))
+
+        self.assertIn("cumulative", profiler.report())
+
+
+if __name__ == "__main__":
+    unittest.main()
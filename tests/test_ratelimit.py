@@ -0,0 +1,81 @@
+import asyncio
+import unittest
+
+from highlight.models import MODELS
+from highlight.ratelimit import ModelRateLimiter, RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_requests_per_minute(self):
+        clock = FakeClock()
+        limiter = RateLimiter(requests_per_minute=2, clock=clock, sleep=clock.sleep)
+
+        self.assertEqual(limiter.acquire(), 0.0)
+        self.assertEqual(limiter.acquire(), 0.0)
+        self.assertAlmostEqual(limiter.acquire(), 30.0)
+
+    def test_tokens_per_minute(self):
+        clock = FakeClock()
+        limiter = RateLimiter(tokens_per_minute=1000, clock=clock, sleep=clock.sleep)
+
+        limiter.acquire(800)
+        self.assertAlmostEqual(limiter.acquire(500), 18.0)
+
+    def test_oversized_request_is_clamped(self):
+        clock = FakeClock()
+        limiter = RateLimiter(tokens_per_minute=100, clock=clock, sleep=clock.sleep)
+
+        self.assertEqual(limiter.acquire(5000), 0.0)
+
+    def test_unlimited(self):
+        limiter = RateLimiter()
+
+        for _ in range(100):
+            self.assertEqual(limiter.acquire(10 ** 6), 0.0)
+
+    def test_aacquire_shares_budget(self):
+        limiter = RateLimiter(requests_per_minute=60000)
+
+        asyncio.run(limiter.aacquire())
+
+        self.assertLess(limiter._available_requests, 60000)
+
+
+class TestModelRateLimiter(unittest.TestCase):
+    def test_unlimited_by_default(self):
+        limiter = ModelRateLimiter().for_model("gpt-4o")
+
+        self.assertEqual((limiter.requests_per_minute, limiter.tokens_per_minute), (None, None))
+        self.assertEqual(limiter.acquire(10 ** 6), 0.0)
+
+    def test_model_defaults(self):
+        limiters = ModelRateLimiter(model_defaults=True)
+        limiter = limiters.for_model("gpt-4o")
+
+        self.assertEqual(limiter.tokens_per_minute, MODELS["gpt-4o"].tokens_per_minute)
+        self.assertIs(limiters.for_model("gpt-4o-2024-08-06"), limiter)
+        self.assertIsNot(limiters.for_model("gpt-4o-mini"), limiter)
+
+    def test_configured_limits(self):
+        limiter = ModelRateLimiter(requests_per_minute=10, tokens_per_minute=1000).for_model("gpt-4o")
+
+        self.assertEqual((limiter.requests_per_minute, limiter.tokens_per_minute), (10, 1000))
+
+    def test_unknown_model_is_unlimited(self):
+        limiter = ModelRateLimiter().for_model("not-a-model")
+
+        self.assertIsNone(limiter.requests_per_minute)
+        self.assertEqual(limiter.acquire(10 ** 6), 0.0)
@@ -0,0 +1,56 @@
+import unittest
+from types import SimpleNamespace
+
+import highlight as hlt
+from highlight.routing import ModelRouter, RoutingRule
+
+
+class RecordingAsyncClient:
+    """Stand-in for AsyncOpenAI that records the model of each request."""
+
+    def __init__(self):
+        self.models = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model, max_tokens, temperature, messages):
+        self.models.append(model)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="response"))])
+
+
+class TestModelRouter(unittest.TestCase):
+    def test_default_rules(self):
+        router = ModelRouter()
+
+        self.assertEqual(router.route("citation", 5000), "gpt-4o-mini")
+        self.assertEqual(router.route("impact", 5000), hlt.DEFAULT_MODEL)
+
+    def test_custom_rules_in_order(self):
+        router = ModelRouter(rules=[
+            {"model": "gpt-4", "max_document_tokens": 2000},
+            RoutingRule("gpt-4o-mini", prompt_names=("title",)),
+        ])
+
+        self.assertEqual(router.route("title", 1000), "gpt-4")
+        self.assertEqual(router.route("title", 3000), "gpt-4o-mini")
+        self.assertEqual(router.route("summary", 3000), hlt.DEFAULT_MODEL)
+
+    def test_overflow_falls_back_to_bigger_context_window(self):
+        router = ModelRouter(rules=[], default_model="gpt-4")
+
+        self.assertEqual(router.route("summary", 1000), "gpt-4")
+        self.assertEqual(router.route("summary", 12000), "gpt-3.5-turbo")
+        self.assertEqual(router.route("summary", 20000), "gpt-4-32k")
+
+    def test_no_model_fits(self):
+        router = ModelRouter(rules=[], default_model="gpt-4")
+
+        self.assertEqual(hlt.get_model_info(router.route("summary", 10 ** 7)).context_window, 128000)
+
+
+class TestGenerateAllRouting(unittest.TestCase):
+    def test_generate_all_uses_router(self):
+        client = RecordingAsyncClient()
+
+        hlt.generate_all(client, "Some document text.", sections=["citation", "title"], router=ModelRouter(), cache=False)
+
+        self.assertEqual(sorted(client.models), sorted(["gpt-4o-mini", hlt.DEFAULT_MODEL]))
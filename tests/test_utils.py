@@ -1,13 +1,45 @@
+import time
 import unittest
-from unittest.mock import patch
+from unittest.mock import Mock, patch
 from io import BytesIO
+from types import SimpleNamespace
 
 import tiktoken
 from pypdf import PdfWriter, PdfReader
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
 
 import highlight as hlt
 
 
+def make_text_pdf(page_lines):
+    """Build a PDF in memory with one page per entry in `page_lines`, each a list of text lines."""
+
+    writer = PdfWriter()
+
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+
+    for lines in page_lines:
+        page = writer.add_blank_page(width=612, height=792)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})
+        })
+
+        operators = " 0 -14 Td ".join(f"({line}) Tj" for line in lines)
+        stream = DecodedStreamObject()
+        stream.set_data(f"BT /F1 12 Tf 72 720 Td {operators} ET".encode("latin-1"))
+        page[NameObject("/Contents")] = writer._add_object(stream)
+
+    buffer = BytesIO()
+    writer.write(buffer)
+    buffer.seek(0)
+
+    return buffer
+
+
 class TestGetTokenCount(unittest.TestCase):
     def test_get_token_count_default_model(self):
         text = "This is a test."
@@ -26,6 +58,28 @@ class TestGetTokenCount(unittest.TestCase):
         self.assertEqual(hlt.get_token_count(text), expected_token_count)
 
 
+class TestGetEncoder(unittest.TestCase):
+    def test_get_encoder_is_cached(self):
+        self.assertIs(hlt.get_encoder("gpt-4o"), hlt.get_encoder("gpt-4o"))
+
+    def test_get_encoder_by_encoding_name(self):
+        self.assertEqual(hlt.get_encoder("o200k_base").name, "o200k_base")
+
+    def test_warm_encoders(self):
+        encoders = hlt.warm_encoders(("gpt-4o", "gpt-3.5-turbo"))
+        self.assertIs(encoders["gpt-3.5-turbo"], hlt.get_encoder("gpt-3.5-turbo"))
+
+
+class TestGetTokenCounts(unittest.TestCase):
+    def test_get_token_counts_matches_single(self):
+        texts = ["This is a test.", "", "Another, slightly longer, test string."]
+        expected = [hlt.get_token_count(text) for text in texts]
+        self.assertEqual(hlt.get_token_counts(texts), expected)
+
+    def test_get_token_counts_empty_list(self):
+        self.assertEqual(hlt.get_token_counts([]), [])
+
+
 class TestReadPdf(unittest.TestCase):
     def test_read_pdf_without_reference_indicator(self):
         # Create a sample PDF file using pypdf
@@ -60,6 +114,56 @@ class TestReadPdf(unittest.TestCase):
             self.assertGreater(result["n_tokens"], 0)
 
 
+class TestReadPdfParallel(unittest.TestCase):
+    def setUp(self):
+        page_lines = [[f"Page {i} body text.", "More text here."] for i in range(12)]
+        page_lines[7] = ["End of the paper.", "References", "Smith 2020."]
+        self.pdf = make_text_pdf(page_lines)
+
+    def test_read_pdf_parallel_matches_serial(self):
+        serial = hlt.read_pdf(self.pdf)
+        parallel = hlt.read_pdf(self.pdf, max_workers=2, pages_per_task=2)
+
+        self.assertEqual(parallel, serial)
+        self.assertEqual(parallel["reference_page"], 7)
+        self.assertEqual(len(parallel["pages"]), 8)
+        self.assertIn("End of the paper.", parallel["content"])
+        self.assertNotIn("Smith 2020.", parallel["content"])
+
+
+class TestIterPdfPages(unittest.TestCase):
+    def setUp(self):
+        page_lines = [[f"Page {i} body text.", "More text here."] for i in range(6)]
+        page_lines[3] = ["End of the paper.", "References", "Smith 2020."]
+        self.pdf = make_text_pdf(page_lines)
+
+    def test_iter_pdf_pages_records(self):
+        records = list(hlt.iter_pdf_pages(self.pdf))
+
+        self.assertEqual([record["index"] for record in records], [0, 1, 2, 3])
+        self.assertTrue(records[3]["is_reference_page"])
+        self.assertNotIn("Smith 2020.", records[3]["content"])
+        self.assertEqual(records[0]["n_tokens"], hlt.get_token_count(records[0]["content"]))
+
+    def test_iter_pdf_pages_is_lazy(self):
+        with patch.object(PdfReader, 'pages', new_callable=unittest.mock.PropertyMock) as mock_pages:
+            mock_page = unittest.mock.Mock()
+            mock_page.extract_text.return_value = "Hello World"
+            mock_pages.return_value = [mock_page] * 5
+
+            next(hlt.iter_pdf_pages(self.pdf))
+
+            self.assertEqual(mock_page.extract_text.call_count, 1)
+
+    def test_content_dict_from_pages_matches_read_pdf(self):
+        self.assertEqual(hlt.content_dict_from_pages(hlt.iter_pdf_pages(self.pdf)), hlt.read_pdf(self.pdf))
+
+    def test_iter_pdf_pages_parallel(self):
+        records = list(hlt.iter_pdf_pages(self.pdf, max_workers=2, pages_per_task=1))
+
+        self.assertEqual(records, list(hlt.iter_pdf_pages(self.pdf)))
+
+
 class TestReadText(unittest.TestCase):
     def test_read_text(self):
         # Simulate a text file using BytesIO
@@ -73,3 +177,328 @@ class TestReadText(unittest.TestCase):
         self.assertEqual(result["n_pages"], 1)
         self.assertEqual(result["n_characters"], len(sample_text))
         self.assertEqual(result["n_words"], 7)  
+
+
+class FakeReductionClient:
+    """Stand-in for the OpenAI client that returns the page text after a delay that shrinks with page order."""
+
+    def __init__(self, n_pages):
+        self.n_pages = n_pages
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, max_tokens, temperature, messages):
+        text = messages[-1]["content"].split("\n\n")[1]
+        time.sleep(0.01 * (self.n_pages - int(text.split()[-1])))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+class TestContentReduction(unittest.TestCase):
+    def setUp(self):
+        self.document_list = [SimpleNamespace(page_content=f"page {i}") for i in range(6)]
+
+    def test_content_reduction_serial(self):
+        client = FakeReductionClient(len(self.document_list))
+        result = hlt.content_reduction(client, self.document_list, "scope", "gpt-4o", progress_callback=lambda *_: None, cache=False)
+        self.assertEqual(result, "".join(f"page {i}" for i in range(6)))
+
+    def test_content_reduction_parallel_preserves_order(self):
+        client = FakeReductionClient(len(self.document_list))
+        progress = []
+
+        result = hlt.content_reduction(
+            client,
+            self.document_list,
+            "scope",
+            "gpt-4o",
+            max_workers=4,
+            progress_callback=lambda n_completed, n_total: progress.append((n_completed, n_total)),
+            cache=False
+        )
+
+        self.assertEqual(result, "".join(f"page {i}" for i in range(6)))
+        self.assertEqual(progress, [(i, 6) for i in range(1, 7)])
+
+    def test_parallel_content_reduction_reaches_tracked_sinks(self):
+        client = FakeReductionClient(len(self.document_list))
+
+        with hlt.track_calls(hlt.MetricsAggregator()) as sink:
+            hlt.content_reduction(
+                client, self.document_list, "scope", "gpt-4o", max_workers=4, progress_callback=lambda *_: None,
+                cache=False
+            )
+
+        self.assertEqual(sink.summary()["calls"], 6)
+
+    def test_content_reduction_uses_rate_limiter(self):
+        client = FakeReductionClient(len(self.document_list))
+        rate_limiter = Mock()
+        rate_limiter.for_model.return_value = rate_limiter
+
+        hlt.content_reduction(
+            client, self.document_list, "scope", "gpt-4o", max_workers=2, rate_limiter=rate_limiter,
+            progress_callback=lambda *_: None, cache=False
+        )
+
+        self.assertEqual(rate_limiter.acquire.call_count, 6)
+        rate_limiter.for_model.assert_called_with("gpt-4o")
+
+    def test_content_reduction_leaves_rate_limiting_to_a_limited_client(self):
+        client = FakeReductionClient(len(self.document_list))
+        client.rate_limiter = rate_limiter = Mock()
+
+        hlt.content_reduction(
+            client, self.document_list, "scope", "gpt-4o", max_workers=2, rate_limiter=rate_limiter,
+            progress_callback=lambda *_: None, cache=False
+        )
+
+        rate_limiter.acquire.assert_not_called()
+
+
+class FakeStreamingClient:
+    """Stand-in for the OpenAI client that streams a fixed response a word at a time."""
+
+    def __init__(self, text):
+        self.text = text
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, max_tokens, temperature, messages, stream=False, stream_options=None):
+        self.calls += 1
+        self.messages = messages
+        pieces = [f"{word} " for word in self.text.split()]
+
+        # the final chunk of a stream carries no choices when usage is included
+        chunks = [SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))]) for piece in pieces]
+        usage = SimpleNamespace(
+            prompt_tokens=100,
+            completion_tokens=len(pieces),
+            prompt_tokens_details=SimpleNamespace(cached_tokens=64)
+        )
+        return iter(chunks + [SimpleNamespace(choices=[], usage=usage)])
+
+
+class TestStreamPrompt(unittest.TestCase):
+    def test_stream_prompt_yields_pieces(self):
+        client = FakeStreamingClient("A streamed title")
+        pieces = list(hlt.stream_prompt(client, "Some content.", prompt_name="title", cache=False))
+
+        self.assertEqual(pieces, ["A ", "streamed ", "title "])
+
+    def test_stream_prompt_returns_assembled_response(self):
+        def consume():
+            return (yield from hlt.stream_prompt(FakeStreamingClient("A streamed title"), "Some content.", cache=False))
+
+        generator = consume()
+        with self.assertRaises(StopIteration) as stop:
+            while True:
+                next(generator)
+
+        self.assertEqual(stop.exception.value, "A streamed title ")
+
+    def test_stream_prompt_content_uses_cache(self):
+        cache = Mock()
+        cache.get.return_value = "cached response"
+        client = FakeStreamingClient("unused")
+
+        pieces = list(hlt.stream_prompt_content(client, "scope", "prompt", cache=cache))
+
+        self.assertEqual(pieces, ["cached response"])
+        self.assertEqual(client.calls, 0)
+
+    def test_stream_prompt_records_usage(self):
+        with hlt.track_calls(hlt.MetricsAggregator()) as sink:
+            list(hlt.stream_prompt(FakeStreamingClient("A streamed title"), "Some content.", cache=False))
+
+        summary = sink.summary()
+        self.assertEqual(summary["calls"], 1)
+        self.assertEqual(summary["cached_tokens"], 64)
+        self.assertEqual(summary["prompt_cache_hits"], 1)
+
+    def test_shared_prefix_layout(self):
+        client = FakeStreamingClient("A streamed title")
+        list(hlt.stream_prompt(client, "Some content.", cache=False, prompt_layout="shared_prefix"))
+
+        self.assertEqual([message["role"] for message in client.messages], ["system", "user", "user"])
+        self.assertIn("Some content.", client.messages[1]["content"])
+        self.assertNotIn("Some content.", client.messages[2]["content"])
+
+    def test_reduce_word_count_within_limit(self):
+        client = FakeStreamingClient("unused")
+
+        self.assertEqual(hlt.reduce_word_count(client, "short response", max_word_count=5), "short response")
+        self.assertEqual(client.calls, 0)
+
+
+class TestWordBudget(unittest.TestCase):
+    def test_tokens_per_word(self):
+        self.assertAlmostEqual(hlt.tokens_per_word(""), 4 / 3)
+        self.assertGreaterEqual(hlt.tokens_per_word("plain words in a sentence"), 1.0)
+
+    def test_word_budget_tokens(self):
+        self.assertEqual(hlt.word_budget_tokens(100, tokens_per_word=1.5, slack=1.0), 150)
+        self.assertLess(hlt.word_budget_tokens(100), 700)
+
+    def test_trim_to_word_count(self):
+        text = "One two three four. Five six seven. Eight nine ten eleven."
+
+        self.assertEqual(hlt.trim_to_word_count(text, 9, max_overshoot=0.5), "One two three four. Five six seven.")
+        self.assertEqual(hlt.trim_to_word_count(text, 11), text)
+
+    def test_trim_to_word_count_gives_up(self):
+        text = "One two three four. Five six seven. Eight nine ten eleven."
+
+        # too far over the limit to trim without losing content
+        self.assertIsNone(hlt.trim_to_word_count(text, 5))
+        # trimming would fall below the minimum word count
+        self.assertIsNone(hlt.trim_to_word_count(text, 9, min_word_count=8, max_overshoot=0.5))
+
+    def test_reduce_word_count_trims_locally(self):
+        client = FakeStreamingClient("unused")
+        response = "One two three four. Five six seven. Eight nine ten eleven."
+
+        result = hlt.reduce_word_count(client, response, max_word_count=9, min_word_count=5, max_overshoot=0.5)
+
+        self.assertEqual(result, "One two three four. Five six seven.")
+        self.assertEqual(client.calls, 0)
+
+
+class FakeTruncatingClient:
+    """Stand-in for the OpenAI client that cuts the response off when `max_tokens` is below `needed_tokens`."""
+
+    def __init__(self, needed_tokens):
+        self.needed_tokens = needed_tokens
+        self.max_tokens = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, max_tokens, temperature, messages, stream=False, stream_options=None):
+        self.max_tokens.append(max_tokens)
+        truncated = max_tokens < self.needed_tokens
+        text = "A sentence that was cut" if truncated else "A sentence that was finished."
+        finish_reason = "length" if truncated else "stop"
+
+        if stream:
+            return iter([SimpleNamespace(choices=[
+                SimpleNamespace(delta=SimpleNamespace(content=text), finish_reason=finish_reason)
+            ])])
+
+        return SimpleNamespace(choices=[
+            SimpleNamespace(message=SimpleNamespace(content=text), finish_reason=finish_reason)
+        ])
+
+
+class TestTokenLimitFallback(unittest.TestCase):
+    def test_generate_text_retries_cut_off_response(self):
+        client = FakeTruncatingClient(needed_tokens=300)
+
+        response = hlt.generate_text(client, "Some content.", prompt_name="impact", max_tokens=700,
+                                     max_word_count=10, min_word_count=0, word_budget=True, cache=False)
+
+        self.assertEqual(response, "A sentence that was finished.")
+        self.assertEqual(client.max_tokens[1], 700)
+        self.assertLess(client.max_tokens[0], 300)
+
+    def test_complete_response_is_not_retried(self):
+        client = FakeTruncatingClient(needed_tokens=10)
+
+        hlt.generate_text(client, "Some content.", prompt_name="impact", max_tokens=700, max_word_count=100,
+                          min_word_count=0, word_budget=True, cache=False)
+
+        self.assertEqual(len(client.max_tokens), 1)
+
+    def test_stream_returns_regenerated_response(self):
+        client = FakeTruncatingClient(needed_tokens=300)
+        stream = hlt.stream_prompt(client, "Some content.", prompt_name="impact", max_tokens=100, cache=False,
+                                   fallback_max_tokens=700)
+
+        pieces = []
+        while True:
+            try:
+                pieces.append(next(stream))
+            except StopIteration as stop:
+                response = stop.value
+                break
+
+        self.assertEqual(pieces, ["A sentence that was cut"])
+        self.assertEqual(response, "A sentence that was finished.")
+
+
+class TestChunkText(unittest.TestCase):
+    def setUp(self):
+        self.text = "\n\n".join(
+            " ".join(f"Sentence {p}.{k} has a few words in it." for k in range(10)) for p in range(5)
+        )
+
+    def test_chunk_text_bounded_and_lossless(self):
+        chunks = hlt.chunk_text(self.text, chunk_tokens=100)
+
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(chunk.n_tokens <= 100 for chunk in chunks))
+        self.assertEqual("".join(chunk.page_content for chunk in chunks), self.text)
+
+    def test_chunk_text_sentence_boundaries(self):
+        chunks = hlt.chunk_text(self.text, chunk_tokens=100)
+
+        for chunk in chunks:
+            self.assertTrue(chunk.page_content.rstrip().endswith("."))
+
+    def test_chunk_text_overlap(self):
+        chunks = hlt.chunk_text(self.text, chunk_tokens=100, overlap_tokens=50)
+        last_sentence = chunks[0].page_content.rstrip().split(". ")[-1]
+
+        self.assertIn(last_sentence, chunks[1].page_content)
+
+    def test_chunk_text_long_sentence(self):
+        chunks = hlt.chunk_text("word " * 1000, chunk_tokens=50)
+
+        self.assertTrue(all(chunk.n_tokens <= 50 for chunk in chunks))
+
+    def test_chunk_text_invalid_overlap(self):
+        with self.assertRaises(ValueError):
+            hlt.chunk_text(self.text, chunk_tokens=100, overlap_tokens=100)
+
+    def test_reduction_chunk_tokens(self):
+        self.assertEqual(hlt.reduction_chunk_tokens(4096), 1998)
+        self.assertEqual(hlt.reduction_chunk_tokens(150000), 4096)
+
+
+class TestBuildPromptParts(unittest.TestCase):
+    def test_inline_layout(self):
+        prefix, prompt = hlt.build_prompt_parts("Some content.", prompt_name="title")
+
+        self.assertIsNone(prefix)
+        self.assertEqual(prompt, hlt.build_prompt("Some content.", prompt_name="title"))
+
+    def test_shared_prefix_is_identical_across_sections(self):
+        title_prefix, title_prompt = hlt.build_prompt_parts("Some content.", "title", prompt_layout="shared_prefix")
+        impact_prefix, impact_prompt = hlt.build_prompt_parts("Some content.", "impact", prompt_layout="shared_prefix")
+
+        self.assertEqual(title_prefix, impact_prefix)
+        self.assertNotEqual(title_prompt, impact_prompt)
+
+    def test_shared_prefix_prompts_refer_to_the_prefix(self):
+        for prompt_name in hlt.prompt_queue:
+            if prompt_name in ("system", "reduce_wordcount"):
+                continue
+
+            prefix, prompt = hlt.build_prompt_parts("Some content.", prompt_name, additional_content="A Title",
+                                                    prompt_layout="shared_prefix")
+
+            # the prompt holds no empty input block; it points to the document sent before it
+            self.assertNotIn("```", prompt, prompt_name)
+            self.assertNotIn("TEXT:", prompt.replace("TEXT: " + hlt.prompts.EXAMPLE_TEXT_ONE, "")
+                                           .replace("TEXT: " + hlt.prompts.EXAMPLE_TEXT_TWO, ""), prompt_name)
+            self.assertIn("previous message", prompt, prompt_name)
+            self.assertIn("Some content.", prefix)
+
+    def test_shared_prefix_prompts_follow_prompt_queue(self):
+        prompt = hlt.shared_prefix_prompt(hlt.prompt_queue["funding"])
+
+        self.assertTrue(prompt.startswith(hlt.prompt_queue["funding"].split("TEXT:")[0]))
+        self.assertNotIn("{0}", prompt)
+
+        with self.assertRaises(ValueError):
+            hlt.shared_prefix_prompt("A prompt without an input block.")
+
+    def test_unknown_layout(self):
+        with self.assertRaises(ValueError):
+            hlt.build_prompt_parts("Some content.", prompt_layout="sideways")